@@ -0,0 +1,243 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Alarm.py
+  @brief TEL0144协议转换板温度阈值报警库。
+  @details REG_18B20_D1_ALARM开始的4个寄存器汇总了协议板上全部16个18B20传感器的温度阈值报警状态，读取它比读取温度便宜得多。
+  @n AlarmFirstPoller以较高频率只读取各协议板的报警标志，只有报警标志发生变化的协议板才立即升级为完整的温度读取，
+  @n 其余协议板的完整温度读取按较慢的后台周期进行。这样报警延迟约为每个协议板一个小数据包，同时总线负载保持在较低水平。
+  @n AlarmMonitor将32位报警标志一次性解码为16个传感器的状态，与上一次的状态比较，只在状态发生跳变(例如IN->ABOVE、BELOW->IN)
+  @n 且经过消抖确认后才调用订阅的回调函数。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+from DFRobot_18B20_Stream import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+class AlarmFirstPoller(object):
+  '''!
+    @brief 报警优先的多协议板轮询器
+  '''
+
+  def __init__(self, boards, alarm_interval_s = 0.1, full_interval_s = 10, stream = None, monitor = None):
+    '''!
+      @brief AlarmFirstPoller类参数初始化列表。
+      @param boards: DFRobot_18B20_RS485对象列表，对象需已调用begin初始化成功。
+      @param alarm_interval_s: 报警标志的轮询周期，单位秒，默认0.1s。
+      @param full_interval_s: 后台完整温度读取的周期，单位秒，默认10s。
+      @param stream: 用于完整温度读取的ReadingStream对象，为None时内部创建一个。
+      @param monitor: AlarmMonitor对象，每次读取到报警标志后都会交给它检测状态跳变，为None时不检测。
+    '''
+    self._boards = boards
+    self._monitor = monitor
+    self._alarm_interval = alarm_interval_s
+    self._full_interval = full_interval_s
+    self._stream = stream
+    if self._stream is None:
+      self._stream = ReadingStream(boards)
+    self._alarm = {}
+    self._full_due = {}
+    self._running = False
+    self._alarm_frames = 0
+    self._escalations = 0
+    self._full_reads = 0
+
+  def poll(self):
+    '''!
+      @brief 执行一次轮询：读取所有协议板的报警标志，报警标志变化或后台周期到期的协议板进行完整温度读取，非阻塞。
+      @return Reading列表，本次没有进行完整温度读取时返回空列表
+    '''
+    readings = []
+    for board in self._boards:
+      addr = board.get_device_address()
+      alarm = board.read_temperature_threshold_alarm_flag()
+      self._alarm_frames += 1
+      if alarm is None:
+        continue
+      if self._monitor is not None:
+        self._monitor.update(addr, alarm)
+      now = _monotonic()
+      changed = (addr in self._alarm) and (self._alarm[addr] != alarm)
+      self._alarm[addr] = alarm
+      if changed:
+        self._escalations += 1
+      elif now < self._full_due.get(addr, 0):
+        continue
+      self._full_due[addr] = now + self._full_interval
+      self._full_reads += 1
+      readings += self._stream.read_board(board, alarm)
+    return readings
+
+  def readings(self):
+    '''!
+      @brief 按报警轮询周期执行poll的生成器，只在有完整温度读取时产生Reading列表，周期按单调时钟对齐，不会累积漂移。
+    '''
+    self._running = True
+    start = _monotonic()
+    tick = 0
+    while self._running:
+      delay = start + tick*self._alarm_interval - _monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      readings = self.poll()
+      if len(readings):
+        yield readings
+      tick = max(tick + 1, int((_monotonic() - start) // self._alarm_interval) + 1)
+
+  def stop(self):
+    '''!
+      @brief 停止readings生成器。
+    '''
+    self._running = False
+
+  def get_alarm_flag(self, addr):
+    '''!
+      @brief 获取指定协议板最近一次读取到的报警标志，格式同get_temperature_threshold_alarm_flag。
+      @param addr: 协议板设备地址
+      @return 报警标志，未读取成功过时返回None
+    '''
+    return self._alarm.get(addr)
+
+  def get_count(self):
+    '''!
+      @brief 获取轮询器的统计数据。
+      @return 长度为3的整型列表:
+      @n      列表索引0:  报警标志读取次数
+      @n      列表索引1:  报警标志变化引起的完整读取次数
+      @n      列表索引2:  完整温度读取总次数
+    '''
+    return [self._alarm_frames, self._escalations, self._full_reads]
+
+
+class AlarmMonitor(object):
+  '''!
+    @brief 温度阈值报警状态跳变检测与事件回调
+  '''
+
+  def __init__(self, debounce = 1):
+    '''!
+      @brief AlarmMonitor类参数初始化列表。
+      @param debounce: 消抖次数，传感器的新状态需要连续出现该次数才会被确认为一次跳变，默认1(不消抖)。
+    '''
+    self._debounce = debounce
+    self._boards = {}
+    self._subscribers = {}
+    self._handle = 0
+
+  def subscribe(self, callback, addr = None, io = None, id = None):
+    '''!
+      @brief 订阅报警状态跳变事件。
+      @param callback: 回调函数，形式为callback(addr, io, id, old_state, new_state, timestamp)，
+      @n     状态为IN_THE_TEMPERATURE_THRESHOLD、BELOW_THE_LOWEST_TEMPERATURE_THRESHOLD或ABOVE_THE_HIGHEST_TEMPERATURE_THRESHOLD
+      @param addr: 只订阅该设备地址的协议板，None表示所有协议板
+      @param io: 只订阅该IO口(eD1~eD4)上的传感器，None表示所有IO口
+      @param id: 只订阅该序号(eID0~eID3)的传感器，None表示所有序号
+      @return 订阅句柄，用于unsubscribe
+    '''
+    self._handle += 1
+    self._subscribers[self._handle] = (callback, addr, io, id)
+    return self._handle
+
+  def unsubscribe(self, handle):
+    '''!
+      @brief 取消订阅。
+      @param handle: subscribe返回的订阅句柄
+    '''
+    self._subscribers.pop(handle, None)
+
+  def decode(self, alarm_flag):
+    '''!
+      @brief 将get_temperature_threshold_alarm_flag返回的32位报警标志一次性解码为16个传感器的状态掩码。
+      @param alarm_flag: 32位报警标志
+      @return 长度为2的整型列表:
+      @n      列表索引0:  16位高于最高温度阈值掩码，第(io - 1)*4 + id位为1表示该传感器高于最高温度阈值
+      @n      列表索引1:  16位低于最低温度阈值掩码，第(io - 1)*4 + id位为1表示该传感器低于最低温度阈值
+    '''
+    flags = (alarm_flag & 0x000F) | ((alarm_flag >> 4) & 0x00F0) | ((alarm_flag >> 8) & 0x0F00) | ((alarm_flag >> 12) & 0xF000)
+    above = ((alarm_flag >> 4) & 0x000F) | ((alarm_flag >> 8) & 0x00F0) | ((alarm_flag >> 12) & 0x0F00) | ((alarm_flag >> 16) & 0xF000)
+    return [flags & above, flags & ~above & 0xFFFF]
+
+  def update(self, addr, alarm_flag, timestamp = None):
+    '''!
+      @brief 输入一个协议板最新的报警标志，检测状态跳变并调用订阅的回调函数。
+      @param addr: 协议板设备地址
+      @param alarm_flag: get_temperature_threshold_alarm_flag返回的32位报警标志
+      @param timestamp: 报警标志的时间戳，None表示使用当前time.time()
+      @return 本次确认的跳变列表，每项为(addr, io, id, old_state, new_state)元组
+    '''
+    if timestamp is None:
+      timestamp = time.time()
+    state = self._boards.get(addr)
+    if state is None:
+      #稳定的高于阈值掩码、低于阈值掩码，以及各传感器待确认的状态和连续出现次数
+      state = [0, 0, [0]*16, [0]*16]
+      self._boards[addr] = state
+    above, below = self.decode(alarm_flag)
+    changed = (above ^ state[0]) | (below ^ state[1])
+    pending = state[3]
+    transitions = []
+    for slot in range(16):
+      if not (changed & (1 << slot)):
+        pending[slot] = 0
+    while changed:
+      bit = changed & -changed
+      changed ^= bit
+      slot = bit.bit_length() - 1
+      new_state = self._state(above, below, bit)
+      if (pending[slot] == 0) or (state[2][slot] != new_state):
+        state[2][slot] = new_state
+        pending[slot] = 0
+      pending[slot] += 1
+      if pending[slot] < self._debounce:
+        continue
+      pending[slot] = 0
+      old_state = self._state(state[0], state[1], bit)
+      state[0] = (state[0] & ~bit) | (above & bit)
+      state[1] = (state[1] & ~bit) | (below & bit)
+      transitions.append((addr, (slot >> 2) + 1, slot & 0x03, old_state, new_state))
+    for transition in transitions:
+      self._notify(transition, timestamp)
+    return transitions
+
+  def poll(self, board):
+    '''!
+      @brief 读取一个协议板的报警标志并检测状态跳变。
+      @param board: DFRobot_18B20_RS485对象
+      @return 同update，读取失败时返回空列表
+    '''
+    alarm = board.read_temperature_threshold_alarm_flag()
+    if alarm is None:
+      return []
+    return self.update(board.get_device_address(), alarm)
+
+  def get_state(self, addr, io, id):
+    '''!
+      @brief 获取指定传感器当前已确认的状态。
+      @return IN_THE_TEMPERATURE_THRESHOLD、BELOW_THE_LOWEST_TEMPERATURE_THRESHOLD或ABOVE_THE_HIGHEST_TEMPERATURE_THRESHOLD
+    '''
+    state = self._boards.get(addr)
+    if state is None:
+      return DFRobot_18B20_RS485.IN_THE_TEMPERATURE_THRESHOLD
+    return self._state(state[0], state[1], 1 << ((io - 1)*4 + id))
+
+  def _state(self, above, below, bit):
+    if above & bit:
+      return DFRobot_18B20_RS485.ABOVE_THE_HIGHEST_TEMPERATURE_THRESHOLD
+    if below & bit:
+      return DFRobot_18B20_RS485.BELOW_THE_LOWEST_TEMPERATURE_THRESHOLD
+    return DFRobot_18B20_RS485.IN_THE_TEMPERATURE_THRESHOLD
+
+  def _notify(self, transition, timestamp):
+    addr, io, id, old_state, new_state = transition
+    for handle in list(self._subscribers):
+      callback, s_addr, s_io, s_id = self._subscribers[handle]
+      if ((s_addr is not None) and (s_addr != addr)) or ((s_io is not None) and (s_io != io)) or ((s_id is not None) and (s_id != id)):
+        continue
+      callback(addr, io, id, old_state, new_state, timestamp)
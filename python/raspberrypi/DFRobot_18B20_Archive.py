@@ -0,0 +1,440 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Archive.py
+  @brief 18B20温度数据的列式归档文件库，用于在SD卡上长期保存数据。
+  @details 每天一个只追加写入的文件，数据按块写入，每块为一个协议板的一批采样周期(行)，块内按列存放:
+  @n 1. 时间戳列: 毫秒时间戳的二阶差分(delta-of-delta)，固定周期采样时几乎全部为0，每行1个字节；
+  @n 2. 每个传感器一列温度: 有符号原始值(单位1/16℃)的一阶差分，温度变化很少超过几个LSB，每行通常1个字节；
+  @n 差分值均为zigzag变长整数编码。查询时只解码所需传感器的列。
+  @n 每个块头记录协议板地址和块内首尾时间戳，读取者映射文件后按块头建立稀疏块索引，按时间范围查询时二分查找起始块。
+  @n 写入者在内存中缓存一批数据后一次写入一个块，降低SD卡的写入次数和CPU占用；未写完的块(例如断电)在下次打开时被截掉。
+  @n 每个协议板的缓存时间单独计算，由后台线程按截止时间写入，数据流停顿或某个协议板不再有数据时缓存也不会无限期保留。
+  @n 文件布局(小端): 64字节文件头(魔数"TEL0144A"、版本) + 若干块。
+  @n 块布局: 块头(魔数"T18B"、块长度uint32、行数uint32、首行时间戳int64毫秒、末行时间戳int64毫秒、协议板地址uint8、1字节保留、
+  @n 传感器位置掩码uint16、时间戳列长度uint32) + 每个传感器列的长度(uint32，按位置顺序) + 时间戳列 + 各传感器列。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+import mmap
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from DFRobot_18B20_Stream import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+## 归档文件的扩展名，文件名为"YYYYMMDD" + ARCHIVE_SUFFIX，日期为本地时间
+ARCHIVE_SUFFIX = ".t18"
+
+_MAGIC   = b"TEL0144A"
+_VERSION = 1
+_HEADER  = struct.Struct("<8sH")
+_HEADER_SIZE = 64
+_BLOCK_MAGIC = b"T18B"
+_BLOCK   = struct.Struct("<4sIIqqBxHI")
+_LENGTH  = struct.Struct("<I")
+_MISSING = -0x8000  #该行中传感器没有读数，18B20不会产生这个原始值
+
+def _put_varint(buf, v):
+  v = (v << 1) ^ (v >> 63)  #zigzag
+  while v >= 0x80:
+    buf.append((v & 0x7F) | 0x80)
+    v >>= 7
+  buf.append(v)
+
+def _decode_varints(data, count):
+  values = []
+  v = 0
+  shift = 0
+  for b in bytearray(data):
+    v |= (b & 0x7F) << shift
+    if b & 0x80:
+      shift += 7
+      continue
+    values.append((v >> 1) ^ -(v & 1))
+    v = 0
+    shift = 0
+    if len(values) == count:
+      break
+  return values
+
+def _scan_blocks(mm, start, end):
+  #从start开始遍历完整的块，返回(偏移, 块头)列表和最后一个完整块的结束位置
+  blocks = []
+  offset = start
+  while offset + _BLOCK.size <= end:
+    header = _BLOCK.unpack_from(mm, offset)
+    if (header[0] != _BLOCK_MAGIC) or (header[1] < _BLOCK.size) or (offset + header[1] > end):
+      break
+    blocks.append((offset, header))
+    offset += header[1]
+  return blocks, offset
+
+class ArchiveWriter(object):
+  '''!
+    @brief 归档文件的写入者，一个目录只能有一个写入者
+  '''
+
+  def __init__(self, directory, batch_rows = 60, max_delay_s = 300, sync = False):
+    '''!
+      @brief ArchiveWriter类参数初始化列表。
+      @param directory: 归档文件所在的目录，不存在时创建。
+      @param batch_rows: 每个协议板缓存的行数达到该值时写入一个块，默认60(每秒采样时每分钟写入一次)。
+      @param max_delay_s: 每个协议板的数据在内存中缓存的最长时间(从该协议板最旧的一行缓存时算起)，单位秒，默认300s，超过后即使行数不足也写入，
+      @n     大于0时启动一个后台线程按截止时间写入，0表示不限制。
+      @param sync: True: 每次写入块后调用fsync，断电时丢失的数据更少，但SD卡写入次数更多；False: 由系统决定何时写回。
+    '''
+    self._dir = directory
+    self._batch_rows = batch_rows
+    self._max_delay = max_delay_s
+    self._sync = sync
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    self._path = None
+    self._fd = None
+    self._buffers = {}
+    self._oldest = {}  #协议板地址: 最旧一行缓存时的单调时钟时刻
+    self._blocks = 0
+    self._bytes = 0
+    self._rows = 0
+    self._lock = threading.Lock()
+    self._closed = threading.Event()
+    self._timer = None
+    if max_delay_s > 0:
+      self._timer = threading.Thread(target = self._timer_loop)
+      self._timer.daemon = True
+      self._timer.start()
+
+  def get_path(self, timestamp):
+    '''!
+      @brief 获取一个时间戳所属的归档文件路径。
+      @param timestamp: time.time()时间戳
+    '''
+    return os.path.join(self._dir, time.strftime("%Y%m%d", time.localtime(timestamp)) + ARCHIVE_SUFFIX)
+
+  def add_block(self, addr, raws, timestamp = None, mask = 0xFFFF):
+    '''!
+      @brief 缓存一个协议板的一行数据，通常为一次get_temperature_raw()块读取的结果。
+      @param addr: 协议板设备地址
+      @param raws: 16个有符号原始温度值，单位1/16℃，为None(读取失败)时不缓存
+      @param timestamp: time.time()时间戳，None表示当前时刻，同一协议板的时间戳必须不减小
+      @param mask: 需要保存的传感器位置掩码，第(io - 1)*4 + id位为1表示保存，一般为scan()的返回值
+    '''
+    if raws is None:
+      return
+    if timestamp is None:
+      timestamp = time.time()
+    with self._lock:
+      self._add_row(addr, int(round(timestamp*1000)), dict((slot, raws[slot]) for slot in range(len(raws)) if mask & (1 << slot)))
+
+  def add_readings(self, readings):
+    '''!
+      @brief 缓存Reading列表，同一协议板时间戳相同的读数组成一行。
+      @param readings: Reading列表，例如ReadingStream的一个周期
+    '''
+    rows = {}
+    for r in readings:
+      key = (r.addr, int(round(r.timestamp*1000)))
+      row = rows.get(key)
+      if row is None:
+        row = {}
+        rows[key] = row
+      row[(r.io - 1)*4 + r.id] = r.raw
+    with self._lock:
+      for key in sorted(rows.keys(), key = lambda k: k[1]):
+        self._add_row(key[0], key[1], rows[key])
+
+  def consume(self, stream):
+    '''!
+      @brief 缓存数据并原样转发数据的生成器，可以串联在ReadingStream之后。
+      @param stream: 产生Reading或Reading列表的可迭代对象
+    '''
+    for item in stream:
+      if isinstance(item, Reading):
+        self.add_readings([item])
+      else:
+        self.add_readings(item)
+      yield item
+
+  def flush(self):
+    '''!
+      @brief 将所有协议板缓存的数据写入文件。
+    '''
+    with self._lock:
+      for addr in list(self._buffers.keys()):
+        self._flush_board(addr)
+
+  def poll(self):
+    '''!
+      @brief 将缓存时间达到max_delay_s的协议板数据写入文件。后台线程会按截止时间调用，一般不需要手动调用。
+    '''
+    if self._max_delay <= 0:
+      return
+    with self._lock:
+      now = _monotonic()
+      for addr in list(self._oldest.keys()):
+        if now - self._oldest[addr] >= self._max_delay:
+          self._flush_board(addr)
+
+  def close(self):
+    '''!
+      @brief 停止后台线程，写入缓存的数据并关闭文件。
+    '''
+    self._closed.set()
+    if self._timer is not None:
+      self._timer.join()
+      self._timer = None
+    self.flush()
+    with self._lock:
+      self._open(None)
+
+  def get_stats(self):
+    '''!
+      @brief 获取写入统计。
+      @return 长度为3的整型列表:
+      @n      列表索引0:  已写入的块数量
+      @n      列表索引1:  已写入的字节数
+      @n      列表索引2:  已写入的行数
+    '''
+    return [self._blocks, self._bytes, self._rows]
+
+  def _add_row(self, addr, t_ms, values):
+    if len(values) == 0:
+      return
+    buffer = self._buffers.get(addr)
+    if (buffer is not None) and (self.get_path(buffer[0][0]/1000.0) != self.get_path(t_ms/1000.0)):
+      self._flush_board(addr)  #跨天，旧的数据写入前一天的文件
+      buffer = None
+    if buffer is None:
+      buffer = []
+      self._buffers[addr] = buffer
+      self._oldest[addr] = _monotonic()
+    buffer.append((t_ms, values))
+    if len(buffer) >= self._batch_rows:
+      self._flush_board(addr)
+    elif (self._max_delay > 0) and (_monotonic() - self._oldest[addr] >= self._max_delay):
+      self._flush_board(addr)
+
+  def _timer_loop(self):
+    #在最早的截止时间醒来；之后新缓存的行截止时间都更晚，不需要提前唤醒
+    wait = self._max_delay
+    while not self._closed.wait(wait):
+      self.poll()
+      with self._lock:
+        oldest = min(self._oldest.values()) if len(self._oldest) else None
+      wait = self._max_delay
+      if oldest is not None:
+        wait = max(oldest + self._max_delay - _monotonic(), 0.01)
+
+  def _flush_board(self, addr):
+    rows = self._buffers.pop(addr, None)
+    self._oldest.pop(addr, None)
+    if not rows:
+      return
+    mask = 0
+    for t_ms, values in rows:
+      for slot in values:
+        mask |= 1 << slot
+    times = bytearray()
+    last = rows[0][0]
+    last_delta = 0
+    for t_ms, values in rows[1:]:
+      delta = t_ms - last
+      _put_varint(times, delta - last_delta)
+      last = t_ms
+      last_delta = delta
+    columns = []
+    for slot in range(16):
+      if not (mask & (1 << slot)):
+        continue
+      column = bytearray()
+      last = 0
+      for t_ms, values in rows:
+        v = values.get(slot, _MISSING)
+        _put_varint(column, v - last)
+        last = v
+      columns.append(column)
+    size = _BLOCK.size + _LENGTH.size*len(columns) + len(times) + sum(len(c) for c in columns)
+    block = bytearray(_BLOCK.pack(_BLOCK_MAGIC, size, len(rows), rows[0][0], rows[-1][0], addr, mask, len(times)))
+    for column in columns:
+      block += _LENGTH.pack(len(column))
+    block += times
+    for column in columns:
+      block += column
+    self._open(self.get_path(rows[0][0]/1000.0))
+    os.write(self._fd, bytes(block))
+    if self._sync:
+      os.fsync(self._fd)
+    self._blocks += 1
+    self._bytes += size
+    self._rows += len(rows)
+
+  def _open(self, path):
+    if path == self._path:
+      return
+    if self._fd is not None:
+      os.close(self._fd)
+      self._fd = None
+    self._path = path
+    if path is None:
+      return
+    self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    size = os.fstat(self._fd).st_size
+    end = _HEADER_SIZE
+    if size < _HEADER_SIZE:
+      os.ftruncate(self._fd, 0)
+      os.write(self._fd, _HEADER.pack(_MAGIC, _VERSION).ljust(_HEADER_SIZE, b"\0"))
+    else:
+      mm = mmap.mmap(self._fd, size, access = mmap.ACCESS_READ)
+      if _HEADER.unpack_from(mm, 0) != (_MAGIC, _VERSION):
+        print("archive file format error: %s" % path)
+      end = _scan_blocks(mm, _HEADER_SIZE, size)[1]
+      mm.close()
+      if end != size:
+        os.ftruncate(self._fd, end)  #截掉未写完的块
+    os.lseek(self._fd, end, os.SEEK_SET)
+
+
+class ArchiveReader(object):
+  '''!
+    @brief 归档文件的读取者，文件可以同时被ArchiveWriter追加写入
+  '''
+
+  def __init__(self, path):
+    '''!
+      @brief ArchiveReader类参数初始化列表，映射文件并建立块索引。
+      @param path: 归档文件路径
+    '''
+    self._fd = os.open(path, os.O_RDONLY)
+    self._mm = None
+    self._size = 0
+    self._end = _HEADER_SIZE
+    self._index = {}
+    self.refresh()
+
+  def close(self):
+    '''!
+      @brief 解除内存映射并关闭文件。
+    '''
+    if self._mm is not None:
+      self._mm.close()
+    os.close(self._fd)
+
+  def refresh(self):
+    '''!
+      @brief 重新映射文件并将写入者新追加的块加入索引。
+    '''
+    size = os.fstat(self._fd).st_size
+    if (size == self._size) or (size < _HEADER_SIZE):
+      return
+    if self._mm is not None:
+      self._mm.close()
+    self._mm = mmap.mmap(self._fd, size, access = mmap.ACCESS_READ)
+    self._size = size
+    if _HEADER.unpack_from(self._mm, 0) != (_MAGIC, _VERSION):
+      print("archive file format error.")
+      return
+    blocks, self._end = _scan_blocks(self._mm, self._end, size)
+    for offset, header in blocks:
+      index = self._index.get(header[5])
+      if index is None:
+        index = (array('d'), array('d'), array('d'))  #偏移, 首行时间戳, 末行时间戳；double可精确表示到2^53
+        self._index[header[5]] = index
+      index[0].append(offset)
+      index[1].append(header[3])
+      index[2].append(header[4])
+
+  def get_addresses(self):
+    '''!
+      @brief 获取文件中有数据的协议板地址列表。
+    '''
+    return sorted(self._index.keys())
+
+  def get_time_range(self, addr):
+    '''!
+      @brief 获取一个协议板数据的时间范围。
+      @param addr: 协议板设备地址
+      @return (首行时间戳, 末行时间戳)元组，time.time()时间戳，没有数据时返回None
+    '''
+    index = self._index.get(addr)
+    if index is None:
+      return None
+    return (index[1][0]/1000.0, max(index[2])/1000.0)
+
+  def query_raw(self, addr, io, id, start = None, end = None):
+    '''!
+      @brief 按时间范围查询一个传感器的原始数据。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @param start: 起始time.time()时间戳，None表示最早的数据
+      @param end: 结束time.time()时间戳(不包含)，None表示最新的数据
+      @return (times_ms, raws)元组，times_ms为毫秒时间戳array('d')，raws为有符号原始温度值array('h')，单位1/16℃
+    '''
+    times = array('d')
+    raws = array('h')
+    index = self._index.get(addr)
+    if index is None:
+      return (times, raws)
+    slot = (io - 1)*4 + id
+    start_ms = None if start is None else start*1000
+    end_ms = None if end is None else end*1000
+    #块按写入顺序排列，同一协议板的块首行时间戳不减小，二分查找第一个可能包含start的块
+    i = 0
+    if start_ms is not None:
+      i = max(bisect_left(index[1], start_ms) - 1, 0)
+    while i < len(index[0]):
+      if (end_ms is not None) and (index[1][i] >= end_ms):
+        break
+      if (start_ms is None) or (index[2][i] >= start_ms):
+        self._decode(int(index[0][i]), slot, start_ms, end_ms, times, raws)
+      i += 1
+    return (times, raws)
+
+  def query(self, addr, io, id, start = None, end = None):
+    '''!
+      @brief 按时间范围查询一个传感器的温度。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @param start: 起始time.time()时间戳，None表示最早的数据
+      @param end: 结束time.time()时间戳(不包含)，None表示最新的数据
+      @return (timestamp, temperature_c)元组列表
+    '''
+    times, raws = self.query_raw(addr, io, id, start, end)
+    return [(times[i]/1000.0, raws[i]/16.0) for i in range(len(times))]
+
+  def _decode(self, offset, slot, start_ms, end_ms, times, raws):
+    magic, size, rows, t_first, t_last, addr, mask, time_len = _BLOCK.unpack_from(self._mm, offset)
+    if not (mask & (1 << slot)):
+      return
+    count = bin(mask).count("1")
+    lengths = struct.unpack_from("<%dI" % count, self._mm, offset + _BLOCK.size)
+    target = bin(mask & ((1 << slot) - 1)).count("1")  #该传感器列在块内的序号
+    time_pos = offset + _BLOCK.size + _LENGTH.size*count
+    pos = time_pos + time_len + sum(lengths[:target])
+    dods = _decode_varints(self._mm[time_pos: time_pos + time_len], rows - 1)
+    deltas = _decode_varints(self._mm[pos: pos + lengths[target]], rows)
+    t = t_first
+    delta = 0
+    v = 0
+    for i in range(rows):
+      if i:
+        delta += dods[i - 1]
+        t += delta
+      v += deltas[i]
+      if (v == _MISSING) or ((start_ms is not None) and (t < start_ms)):
+        continue
+      if (end_ms is not None) and (t >= end_ms):
+        break
+      times.append(t)
+      raws.append(v)
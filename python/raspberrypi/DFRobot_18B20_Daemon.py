@@ -0,0 +1,444 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Daemon.py
+  @brief 独占RS485总线的守护进程及其客户端库。
+  @details 同一个串口同一时刻只能被一个进程安全地使用。BusDaemon独占总线并运行FleetPoller轮询循环，通过Unix域套接字
+  @n 向任意多个本地客户端提供最新的温度快照、按周期推送的订阅数据以及排队执行的配置写入。客户端的读取不会产生任何总线通信，
+  @n 每个周期的数据只编码一次，所有快照请求和订阅者共用同一份数据包。
+  @n 数据包格式: 类型(1字节) + 负载长度(4字节，大端) + 负载。读数记录为22字节: 时间戳(double) + 设备地址(1) + ROM码(8) +
+  @n IO口(1) + 序号(1) + 有符号原始温度值(int16，单位1/16℃) + 温度阈值状态(1)。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+import struct
+import socket
+import binascii
+import threading
+from collections import deque
+from DFRobot_18B20_Fleet import *
+from DFRobot_18B20_SharedTable import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+## 守护进程默认的Unix域套接字路径
+DAEMON_SOCKET_PATH = "/tmp/dfrobot_18b20.sock"
+
+_HEADER  = struct.Struct(">BI")
+_READING = struct.Struct(">dB8sBBhB")
+_CONFIG  = struct.Struct(">BBBBbbB")  #设备地址, IO口, 序号, 标志(bit0: 阈值, bit1: 精度), 上阈值, 下阈值, 精度
+_STATUS  = struct.Struct(">BB")       #设备地址, 状态(1: 成功, 0: 失败)
+
+def _recv_exact(conn, n, started = False, alive = None):
+  #数据包已经开始接收后，超时不能丢弃已收到的部分，继续等待直到alive()返回False
+  data = b""
+  while len(data) < n:
+    try:
+      chunk = conn.recv(n - len(data))
+    except socket.timeout:
+      if (alive is not None) and not alive():
+        return None
+      if started or len(data):
+        continue
+      raise
+    if not chunk:
+      return None
+    data += chunk
+  return data
+
+def _recv_message(conn, alive = None):
+  header = _recv_exact(conn, _HEADER.size, False, alive)
+  if header is None:
+    return None
+  msg, length = _HEADER.unpack(header)
+  payload = _recv_exact(conn, length, True, alive)
+  if payload is None:
+    return None
+  return [msg, payload]
+
+def _pack_message(msg, payload = b""):
+  return _HEADER.pack(msg, len(payload)) + payload
+
+def _pack_readings(readings):
+  return b"".join([_READING.pack(r.timestamp, r.addr, binascii.unhexlify(r.rom), r.io, r.id, r.raw, 0xFF if r.alarm is None else r.alarm) for r in readings])
+
+def _unpack_readings(payload):
+  readings = []
+  for i in range(0, len(payload) - _READING.size + 1, _READING.size):
+    timestamp, addr, rom, io, id, raw, alarm = _READING.unpack_from(payload, i)
+    if alarm == 0xFF:
+      alarm = None  #0xFF: 报警状态未知
+    readings.append(Reading(timestamp, addr, binascii.hexlify(rom).decode().upper(), io, id, raw/16.0, alarm, raw))
+  return readings
+
+
+class BusDaemon(object):
+  '''!
+    @brief 独占总线的轮询守护进程
+  '''
+  ## 客户端请求最新快照，应答为eMSG_SNAPSHOT，负载为读数记录
+  eMSG_SNAPSHOT    = 0x01
+  ## 客户端订阅，之后每个轮询周期推送一个eMSG_READINGS，负载为读数记录
+  eMSG_SUBSCRIBE   = 0x02
+  ## 客户端取消订阅
+  eMSG_UNSUBSCRIBE = 0x03
+  ## 客户端提交配置写入，负载为配置记录，执行后对每个协议板应答一个eMSG_STATUS
+  eMSG_CONFIG      = 0x04
+  ## 守护进程推送的周期读数
+  eMSG_READINGS    = 0x82
+  ## 配置写入的执行结果
+  eMSG_STATUS      = 0x84
+  ## 无法识别的请求
+  eMSG_ERROR       = 0xFF
+
+  ## 每个连接等待发送的最大消息数量，发送队列已满(客户端接收不及时)的连接被断开
+  MAX_PENDING_MESSAGES = 64
+
+  def __init__(self, boards, path = DAEMON_SOCKET_PATH, interval_s = 1.0, baud = 9600, port = "/dev/ttyAMA0", table = None):
+    '''!
+      @brief BusDaemon类参数初始化列表。
+      @param boards: 协议板列表，每项可以是DFRobot_18B20_RS485对象，也可以是设备地址(1~247)，含义同FleetPoller。
+      @param path: Unix域套接字路径，默认DAEMON_SOCKET_PATH。
+      @param interval_s: 每个协议板的目标读取周期，单位秒，默认1s。
+      @param baud: 用设备地址创建对象时使用的串口波特率，默认9600。
+      @param port: 用设备地址创建对象时打开的串口，默认为"/dev/ttyAMA0"。
+      @param table: SharedTableWriter对象，每个周期的读数同时写入共享表，供需要更低延迟的进程直接读取，None表示不写入。
+    '''
+    self._path = path
+    self._table = table
+    self._poller = FleetPoller(boards, interval_s, baud = baud, port = port)
+    self._boards = dict((board.get_device_address(), board) for board in self._poller.get_boards())
+    self._lock = threading.Lock()
+    self._snapshot = {}
+    self._snapshot_payload = b""
+    self._subscribers = []
+    self._senders = {}
+    self._configs = []
+    self._server = None
+    self._thread = None
+    self._running = False
+
+  def start(self):
+    '''!
+      @brief 在后台线程中启动轮询循环，并开始监听Unix域套接字。
+    '''
+    if os.path.exists(self._path):
+      os.unlink(self._path)
+    self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._server.bind(self._path)
+    self._server.listen(16)
+    self._running = True
+    self._thread = threading.Thread(target = self._poll_loop)
+    self._thread.daemon = True
+    self._thread.start()
+    t = threading.Thread(target = self._accept_loop)
+    t.daemon = True
+    t.start()
+
+  def serve_forever(self):
+    '''!
+      @brief 启动守护进程并阻塞，直到调用stop。
+    '''
+    self.start()
+    while self._running:
+      time.sleep(0.5)
+
+  def stop(self):
+    '''!
+      @brief 停止轮询循环，关闭套接字并删除套接字文件。
+    '''
+    self._running = False
+    self._poller.stop()
+    if self._thread is not None:
+      self._thread.join()
+    try:
+      self._server.close()
+    except Exception:
+      pass
+    if os.path.exists(self._path):
+      os.unlink(self._path)
+
+  def get_snapshot(self):
+    '''!
+      @brief 获取守护进程内的最新快照。
+      @return Reading列表，每个传感器最新的一个读数
+    '''
+    with self._lock:
+      return list(self._snapshot.values())
+
+  def get_poller(self):
+    '''!
+      @brief 获取守护进程使用的FleetPoller对象。
+    '''
+    return self._poller
+
+  def _poll_loop(self):
+    while self._running:
+      try:
+        for readings, report in self._poller.cycles():
+          self._apply_configs()
+          self._publish(readings)
+          if not self._running:
+            break
+      except Exception as e:
+        print("daemon poll error: %s"%e)
+        time.sleep(1)
+
+  def _publish(self, readings):
+    if (self._table is not None) and len(readings):
+      self._table.publish_readings(readings)
+    with self._lock:
+      for r in readings:
+        self._snapshot[(r.addr, r.io, r.id)] = r
+      self._snapshot_payload = _pack_readings(self._snapshot.values())
+      subscribers = list(self._subscribers)
+    if len(readings) and len(subscribers):
+      message = _pack_message(self.eMSG_READINGS, _pack_readings(readings))
+      for conn in subscribers:
+        if not self._send(conn, message):
+          self._drop(conn)
+
+  def _apply_configs(self):
+    with self._lock:
+      configs = self._configs
+      self._configs = []
+    for conn, addr, desired in configs:
+      board = self._boards.get(addr)
+      ret = (board is not None) and (board.apply_config(desired) == True)
+      #客户端在等待每个协议板的状态，状态无法放入发送队列时断开连接，使客户端立即得知失败
+      if not self._send(conn, _pack_message(self.eMSG_STATUS, _STATUS.pack(addr, 1 if ret else 0))):
+        self._drop(conn)
+
+  def _accept_loop(self):
+    while self._running:
+      try:
+        conn, _ = self._server.accept()
+      except Exception:
+        return
+      #接收超时用于检查停止标志，发送超时的连接被断开；发送由每个连接自己的发送线程完成，轮询循环只把消息放入发送队列
+      conn.settimeout(1.0)
+      sender = [deque(), threading.Condition(), True]  #待发送消息, 条件变量, 连接是否有效
+      with self._lock:
+        self._senders[conn] = sender
+      for target in (self._client_loop, self._send_loop):
+        t = threading.Thread(target = target, args = (conn,))
+        t.daemon = True
+        t.start()
+
+  def _client_loop(self, conn):
+    while self._running:
+      try:
+        message = _recv_message(conn, lambda: self._running)
+      except socket.timeout:
+        continue
+      except Exception:
+        message = None
+      if message is None:
+        break
+      msg, payload = message
+      if msg == self.eMSG_SNAPSHOT:
+        with self._lock:
+          payload = self._snapshot_payload
+        self._send(conn, _pack_message(self.eMSG_SNAPSHOT, payload))
+      elif msg == self.eMSG_SUBSCRIBE:
+        with self._lock:
+          if conn not in self._subscribers:
+            self._subscribers.append(conn)
+      elif msg == self.eMSG_UNSUBSCRIBE:
+        with self._lock:
+          if conn in self._subscribers:
+            self._subscribers.remove(conn)
+      elif msg == self.eMSG_CONFIG:
+        self._queue_config(conn, payload)
+      else:
+        self._send(conn, _pack_message(self.eMSG_ERROR))
+    self._drop(conn)
+
+  def _queue_config(self, conn, payload):
+    desired = {}
+    for i in range(0, len(payload) - _CONFIG.size + 1, _CONFIG.size):
+      addr, io, id, flags, th, tl, accuracy = _CONFIG.unpack_from(payload, i)
+      config = desired.setdefault(addr, {}).setdefault((io, id), {})
+      if flags & 0x01:
+        config["th"] = th
+        config["tl"] = tl
+      if flags & 0x02:
+        config["accuracy"] = accuracy
+    with self._lock:
+      for addr in desired:
+        self._configs.append((conn, addr, desired[addr]))
+
+  def _send(self, conn, message):
+    #不阻塞，发送队列已满时返回False
+    with self._lock:
+      sender = self._senders.get(conn)
+    if sender is None:
+      return False
+    with sender[1]:
+      if (not sender[2]) or (len(sender[0]) >= self.MAX_PENDING_MESSAGES):
+        return False
+      sender[0].append(message)
+      sender[1].notify()
+    return True
+
+  def _send_loop(self, conn):
+    with self._lock:
+      sender = self._senders.get(conn)
+    if sender is None:
+      return
+    messages, cond = sender[0], sender[1]
+    while True:
+      with cond:
+        while sender[2] and self._running and (len(messages) == 0):
+          cond.wait(1.0)
+        if (not sender[2]) or (not self._running):
+          break
+        message = messages.popleft()
+      try:
+        conn.sendall(message)
+      except Exception:
+        break
+    self._drop(conn)
+
+  def _drop(self, conn):
+    with self._lock:
+      if conn in self._subscribers:
+        self._subscribers.remove(conn)
+      sender = self._senders.pop(conn, None)
+    if sender is not None:
+      with sender[1]:
+        sender[2] = False
+        sender[1].notify()
+    try:
+      conn.close()
+    except Exception:
+      pass
+
+
+class DaemonClient(object):
+  '''!
+    @brief BusDaemon的客户端，读取数据不会产生总线通信
+  '''
+
+  def __init__(self, path = DAEMON_SOCKET_PATH, timeout = 5.0):
+    '''!
+      @brief DaemonClient类参数初始化列表，连接守护进程。
+      @param path: 守护进程的Unix域套接字路径，默认DAEMON_SOCKET_PATH。
+      @param timeout: 等待应答的超时时间，单位秒，默认5s。
+    '''
+    self._conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._conn.settimeout(timeout)
+    self._conn.connect(path)
+    self._running = False
+
+  def close(self):
+    '''!
+      @brief 断开与守护进程的连接。
+    '''
+    self._conn.close()
+
+  def get_snapshot(self):
+    '''!
+      @brief 获取守护进程中每个传感器最新的读数。
+      @return Reading列表，通信失败时返回None
+    '''
+    self._conn.sendall(_pack_message(BusDaemon.eMSG_SNAPSHOT))
+    payload = self._wait(BusDaemon.eMSG_SNAPSHOT)
+    if payload is None:
+      return None
+    return _unpack_readings(payload)
+
+  def apply_config(self, desired, timeout_s = 30.0):
+    '''!
+      @brief 提交配置写入，守护进程在下一个轮询周期之前调用对应协议板的apply_config执行，本函数阻塞直到全部执行完成或超时。
+      @param desired: 字典，键为协议板设备地址，值为该协议板的目标配置，格式同DFRobot_18B20_RS485.apply_config的desired参数，
+      @n     值为空字典的协议板没有需要写入的配置，不发送也不出现在返回值中
+      @n     例: {32: {(eD1, eID0): {"th": 30, "tl": 10, "accuracy": e18B20_ACCURACY_12_BIT}}}
+      @param timeout_s: 等待全部协议板执行完成的最长时间，单位秒，默认30s。
+      @return 字典，键为协议板设备地址，值为True(成功)或False(失败)，通信失败或超时时返回None
+    '''
+    payload = b""
+    sent = set()
+    for addr in desired:
+      if len(desired[addr]) == 0:
+        continue
+      sent.add(addr)
+      for (io, id), config in desired[addr].items():
+        flags = 0
+        if ("th" in config) and ("tl" in config):
+          flags |= 0x01
+        if "accuracy" in config:
+          flags |= 0x02
+        payload += _CONFIG.pack(addr, io, id, flags, config.get("th", 0), config.get("tl", 0), config.get("accuracy", 0))
+    result = {}
+    if len(sent) == 0:
+      return result
+    self._conn.sendall(_pack_message(BusDaemon.eMSG_CONFIG, payload))
+    deadline = _monotonic() + timeout_s
+    while len(result) < len(sent):
+      status = self._wait(BusDaemon.eMSG_STATUS, deadline)
+      if status is None:
+        return None
+      addr, ok = _STATUS.unpack(status)
+      result[addr] = (ok == 1)
+    return result
+
+  def readings(self):
+    '''!
+      @brief 订阅守护进程的读数，每个轮询周期产生一个Reading列表的生成器，调用stop或连接断开后退出。
+      @n     订阅后同一个连接只用于接收推送，其他请求请使用另一个DaemonClient对象。
+    '''
+    self._running = True
+    timeout = self._conn.gettimeout()
+    self._conn.sendall(_pack_message(BusDaemon.eMSG_SUBSCRIBE))
+    try:
+      while self._running:
+        try:
+          message = _recv_message(self._conn, lambda: self._running)
+        except socket.timeout:
+          continue
+        if message is None:
+          return
+        if message[0] == BusDaemon.eMSG_READINGS:
+          yield _unpack_readings(message[1])
+    finally:
+      #生成器被提前关闭或出现异常时也要取消订阅，否则守护进程会继续推送
+      self._running = False
+      try:
+        self._conn.settimeout(timeout)
+        self._conn.sendall(_pack_message(BusDaemon.eMSG_UNSUBSCRIBE))
+      except Exception:
+        pass
+
+  def stop(self):
+    '''!
+      @brief 停止readings生成器。
+    '''
+    self._running = False
+
+  def _wait(self, msg, deadline = None):
+    #deadline: 单调时钟的截止时间，None表示使用连接的超时时间；配置写入要等到下一个轮询周期才执行，等待时间可能超过连接的超时时间
+    timeout = self._conn.gettimeout()
+    try:
+      while True:
+        if deadline is not None:
+          remain = deadline - _monotonic()
+          if remain <= 0:
+            return None
+          self._conn.settimeout(remain)
+        message = _recv_message(self._conn)
+        if message is None:
+          return None
+        if message[0] == msg:
+          return message[1]
+    except socket.timeout:
+      return None
+    finally:
+      self._conn.settimeout(timeout)
@@ -0,0 +1,320 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Exporter.py
+  @brief 18B20温度读数的CSV/JSON Lines文件导出库。
+  @details ReadingExporter接收ReadingStream等产生的读数，在后台线程中批量序列化并写入文件，轮询线程只需将读数放入队列，
+  @n 磁盘写入变慢或卡顿不会推迟总线轮询；队列满时丢弃新读数并计数，而不是阻塞轮询线程。
+  @n 1. 序列化按输出字段预先生成一个%格式化模板，每个读数只做一次元组取值和一次格式化，不为每条记录构造字典；
+  @n 2. 序列化结果先在内存中缓存，达到缓存大小或刷新周期到期时才写入文件；
+  @n 3. 文件超过最大长度时轮转为path.1、path.2……，最多保留指定数量的旧文件。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+import threading
+from operator import itemgetter
+from DFRobot_18B20_Stream import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+#每个Reading字段的格式，所有字段都是数字或16进制字符串，JSON中不需要转义；alarm为None(状态未知)时CSV中输出空字段，JSON中输出null
+_FIELD_FORMATS = {
+  "timestamp":     "%.3f",
+  "addr":          "%d",
+  "rom":           "%s",
+  "io":            "%d",
+  "id":            "%d",
+  "temperature_c": "%.4f",
+  "alarm":         "%s",
+  "raw":           "%d",
+}
+
+class ReadingExporter(object):
+  '''!
+    @brief 读数文件导出器
+  '''
+  ## CSV格式，第一行为字段名
+  eFORMAT_CSV   = 0
+  ## JSON Lines格式，每行一个JSON对象
+  eFORMAT_JSONL = 1
+
+  def __init__(self, path, format = eFORMAT_CSV, fields = None, flush_interval_s = 1.0, buffer_size = 65536,
+               max_queue = 100000, max_bytes = 10*1024*1024, backup_count = 5):
+    '''!
+      @brief ReadingExporter类参数初始化列表。
+      @param path: 输出文件路径，已存在时追加写入。
+      @param format: 输出格式:
+      @n     eFORMAT_CSV   or 0:  CSV
+      @n     eFORMAT_JSONL or 1:  JSON Lines
+      @param fields: 输出的Reading字段名列表，None表示全部字段(timestamp, addr, rom, io, id, temperature_c, alarm, raw)，
+      @n     未知的字段名被忽略，没有任何有效字段时抛出ValueError。
+      @param flush_interval_s: 缓存数据写入文件的最长间隔，单位秒，默认1s。
+      @param buffer_size: 缓存的序列化数据达到该字节数时立即写入文件，默认65536。
+      @param max_queue: 等待后台线程处理的最大读数数量，超过时丢弃新读数，默认100000。
+      @param max_bytes: 文件超过该字节数时轮转，0表示不轮转，默认10MB。
+      @param backup_count: 轮转时保留的旧文件数量，默认5。
+    '''
+    self._path = path
+    self._format = format
+    self._flush_interval = flush_interval_s
+    self._buffer_size = buffer_size
+    self._max_queue = max_queue
+    self._max_bytes = max_bytes
+    self._backup_count = backup_count
+    if fields is None:
+      fields = Reading._fields
+    self._fields = [name for name in fields if name in _FIELD_FORMATS]
+    for name in fields:
+      if name not in _FIELD_FORMATS:
+        print("unknown field: %s" % name)
+    if len(self._fields) == 0:
+      #构造函数无法通过返回值报告错误，没有可输出的字段时导出器无法工作
+      raise ValueError("no valid field to export, fields must contain at least one of: %s" % ", ".join(Reading._fields))
+    self._compile()
+    self._queue = []
+    self._cond = threading.Condition()
+    self._thread = None
+    self._running = False
+    self._stopped = False  #stop后为True，再次start前放入的读数不会被写入
+    self._flush_requested = 0
+    self._flushed = 0
+    self._file = None
+    self._size = 0
+    self._exported = 0
+    self._dropped = 0
+    self._bytes = 0
+    self._rotations = 0
+    self._error = None
+
+  def start(self):
+    '''!
+      @brief 启动后台写入线程。
+    '''
+    if self._running:
+      return
+    self._running = True
+    self._stopped = False
+    self._error = None
+    self._thread = threading.Thread(target = self._worker)
+    self._thread.daemon = True
+    self._thread.start()
+
+  def stop(self):
+    '''!
+      @brief 停止后台写入线程，队列和缓存中剩余的读数全部写入后关闭文件。
+    '''
+    with self._cond:
+      self._running = False
+      self._stopped = True
+      self._cond.notify_all()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+  def put(self, item):
+    '''!
+      @brief 将读数放入导出队列，不阻塞，不访问磁盘。
+      @param item: Reading或Reading列表
+      @return 放入队列的读数数量，队列已满时剩余的读数被丢弃；后台线程已停止(stop或写入错误)后不再放入，全部计为丢弃
+    '''
+    if isinstance(item, Reading):
+      item = [item]
+    with self._cond:
+      if (self._error is not None) or self._stopped:
+        self._dropped += len(item)
+        return 0
+      n = min(len(item), max(self._max_queue - len(self._queue), 0))
+      self._queue.extend(item[:n])
+      self._dropped += len(item) - n
+      if len(self._queue) > self._buffer_size//64:
+        self._cond.notify()  #积压较多时提前唤醒后台线程
+    return n
+
+  def consume(self, stream):
+    '''!
+      @brief 导出数据并原样转发数据的生成器，可以串联在ReadingStream或DeadbandFilter之后。
+      @param stream: 产生Reading或Reading列表的可迭代对象
+    '''
+    for item in stream:
+      self.put(item)
+      yield item
+
+  def export(self, stream):
+    '''!
+      @brief 导出数据流直到数据流结束，未启动后台线程时自动启动。
+      @param stream: 产生Reading或Reading列表的可迭代对象
+    '''
+    self.start()
+    for item in stream:
+      self.put(item)
+
+  def flush(self, timeout = None):
+    '''!
+      @brief 等待调用前放入队列的读数全部写入文件。
+      @param timeout: 最长等待时间，单位秒，None表示一直等待。
+      @return True: 已全部写入，False: 超时、后台线程未运行或因写入错误停止
+    '''
+    deadline = None if timeout is None else _monotonic() + timeout
+    with self._cond:
+      if not self._running:
+        return False
+      self._flush_requested += 1
+      target = self._flush_requested
+      self._cond.notify_all()
+      while self._flushed < target:
+        if not self._running:
+          return False
+        wait = None
+        if deadline is not None:
+          wait = deadline - _monotonic()
+          if wait <= 0:
+            return False
+        self._cond.wait(wait)
+    return True
+
+  def get_stats(self):
+    '''!
+      @brief 获取导出统计。
+      @return 长度为5的列表:
+      @n      列表索引0:  已写入文件的读数数量
+      @n      列表索引1:  因队列已满或写入错误而丢弃的读数数量
+      @n      列表索引2:  已写入文件的字节数
+      @n      列表索引3:  文件轮转次数
+      @n      列表索引4:  使后台线程停止的错误(IOError/OSError对象)，没有错误时为None
+    '''
+    return [self._exported, self._dropped, self._bytes, self._rotations, self._error]
+
+  def _compile(self):
+    #按输出字段生成格式化模板和取值函数
+    index = [Reading._fields.index(name) for name in self._fields]
+    if len(index) == 1:
+      i = index[0]
+      values = lambda r: (r[i],)
+    else:
+      values = itemgetter(*index)
+    self._values = values
+    if "alarm" in self._fields:
+      #alarm用%s输出，整数与%d结果相同，只有None需要替换
+      k = self._fields.index("alarm")
+      unknown = "null" if self._format == self.eFORMAT_JSONL else ""
+      def values_alarm(r):
+        v = values(r)
+        if v[k] is None:
+          v = v[:k] + (unknown,) + v[k + 1:]
+        return v
+      self._values = values_alarm
+    if self._format == self.eFORMAT_JSONL:
+      items = []
+      for name in self._fields:
+        value = _FIELD_FORMATS[name]
+        if name == "rom":
+          value = '"%s"'
+        items.append('"%s": %s' % (name, value))
+      self._template = "{" + ", ".join(items) + "}\n"
+      self._header = ""
+    else:
+      self._template = ",".join([_FIELD_FORMATS[name] for name in self._fields]) + "\n"
+      self._header = ",".join(self._fields) + "\n"
+
+  def _serialize(self, readings):
+    template = self._template
+    values = self._values
+    return "".join([template % values(r) for r in readings])
+
+  def _worker(self):
+    try:
+      self._run()
+    except (IOError, OSError) as e:
+      print("export write error: %s" % e)
+      with self._cond:
+        self._error = e
+        self._running = False
+        self._dropped += len(self._queue)
+        self._queue = []
+        self._cond.notify_all()
+    finally:
+      try:
+        self._close()
+      except (IOError, OSError):
+        pass
+
+  def _run(self):
+    buffer = []
+    buffered = 0
+    count = 0
+    last_write = _monotonic()
+    while True:
+      with self._cond:
+        wait = self._flush_interval - (_monotonic() - last_write)
+        if self._running and (len(self._queue) == 0) and (self._flushed == self._flush_requested) and (wait > 0):
+          self._cond.wait(wait)
+        readings = self._queue
+        self._queue = []
+        running = self._running
+        flush_target = self._flush_requested
+      if len(readings):
+        data = self._serialize(readings)
+        buffer.append(data)
+        buffered += len(data)
+        count += len(readings)
+      now = _monotonic()
+      if (buffered >= self._buffer_size) or (now - last_write >= self._flush_interval) or (flush_target != self._flushed) or not running:
+        if buffered:
+          try:
+            self._write("".join(buffer))
+          except (IOError, OSError):
+            self._dropped += count
+            raise
+          self._exported += count
+          buffer = []
+          buffered = 0
+          count = 0
+        last_write = now
+        with self._cond:
+          self._flushed = flush_target
+          self._cond.notify_all()
+      if not running:
+        break
+
+  def _write(self, data):
+    #写入或轮转失败时抛出IOError/OSError，由_worker停止后台线程
+    if self._file is None:
+      self._open()
+    if (self._max_bytes > 0) and (self._size > 0) and (self._size + len(data) > self._max_bytes):
+      self._rotate()
+    self._file.write(data)
+    self._file.flush()
+    self._size += len(data)
+    self._bytes += len(data)
+
+  def _open(self):
+    self._file = open(self._path, "a")
+    self._size = os.path.getsize(self._path)
+    if (self._size == 0) and len(self._header):
+      self._file.write(self._header)
+      self._size = len(self._header)
+
+  def _rotate(self):
+    self._close()
+    if self._backup_count > 0:
+      for i in range(self._backup_count - 1, 0, -1):
+        src = "%s.%d" % (self._path, i)
+        if os.path.exists(src):
+          os.rename(src, "%s.%d" % (self._path, i + 1))
+      os.rename(self._path, self._path + ".1")
+    else:
+      os.remove(self._path)
+    self._rotations += 1
+    self._open()
+
+  def _close(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
@@ -0,0 +1,303 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Fleet.py
+  @brief 多个TEL0144协议转换板级联时的批量管理库。
+  @details 通过声明式的配置描述，一次性配置总线上所有TEL0144协议转换板上18B20传感器的温度阈值和精度：
+  @n 1. 所有协议板都需要配置的寄存器，取多数协议板的目标值通过广播地址(0x00)只发送一次；
+  @n 2. 与广播值不同的各协议板配置，合并成尽可能少的单播写多个保持寄存器数据包；
+  @n 3. 最后对每个协议板进行一次配置块读取校验，校验失败的寄存器会再单播改写一次。
+  @n FleetPoller在同一条总线上轮询大量协议板，每个周期按时间预算规划要执行的读取，优先读取逾期最久的协议板，
+  @n 跳过处于退避状态的无响应协议板，并报告每个周期的完成情况和各协议板的读取耗时。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+from collections import namedtuple
+from DFRobot_18B20_Stream import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+## 轮询周期报告: timestamp(周期开始的time.time()时间戳), duration_s(周期实际耗时), completed(读取成功的协议板地址列表),
+## failed(读取失败的协议板地址列表), deferred(已到期但超出时间预算、顺延到下个周期的协议板地址列表), backoff(处于退避状态被跳过的协议板地址列表)
+CycleReport = namedtuple("CycleReport", ["timestamp", "duration_s", "completed", "failed", "deferred", "backoff"])
+
+class FleetConfig(object):
+  '''!
+    @brief 多协议板声明式配置引擎
+    @details 配置描述(spec)为字典，包含以下可选项，优先级从低到高：
+    @n "default": 所有协议板上所有传感器的配置，例：{"th": 30, "tl": 10, "accuracy": 3}
+    @n "boards":  以协议板设备地址为键，值为字典，"default"项为该协议板上所有传感器的配置，(io, id)项为单个传感器的配置
+    @n "roms":    以18B20传感器的ROM码16进制字符串(get_rom_hex_string)为键，值为该传感器的配置
+    @n 每项配置的格式与DFRobot_18B20_RS485.apply_config相同，可包含"th"、"tl"、"accuracy"。
+  '''
+
+  def __init__(self, boards, broadcast = None):
+    '''!
+      @brief FleetConfig类参数初始化列表。
+      @param boards: DFRobot_18B20_RS485对象列表，对应总线上的所有协议转换板。
+      @param broadcast: 广播地址(0x00)的DFRobot_18B20_RS485对象，为None时所有配置都通过单播发送。
+      @n note: 广播包会被总线上所有从机处理，使用广播时boards必须包含总线上所有的TEL0144设备。
+    '''
+    self._boards = boards
+    self._broadcast = broadcast
+    self._failed = []
+    self._broadcast_frames = 0
+    self._unicast_frames = 0
+
+  def apply(self, spec, max_gap = DFRobot_18B20_RS485.DS18B20_CONFIG_REG_NUM):
+    '''!
+      @brief 将配置描述应用到总线上的所有协议转换板。
+      @param spec: 配置描述字典，格式见类说明。
+      @param max_gap: 单播时两段需改写的寄存器之间最多间隔多少个寄存器时合并为一个数据包，含义同DFRobot_18B20_RS485.apply_config。
+      @return 设置状态:
+      @n      True:  所有协议板设置并校验成功
+      @n      False: 参数错误或部分协议板设置失败，可通过get_failed_boards获取失败的协议板地址
+    '''
+    self._failed = []
+    self._broadcast_frames = 0
+    self._unicast_frames = 0
+    targets = self._resolve(spec)
+    if targets is None:
+      return False
+
+    shared = {}
+    if (self._broadcast is not None) and len(self._boards):
+      shared = self._shared_registers(targets)
+      for reg, vals in self._broadcast.plan_config_writes(shared, None, 0):
+        self._broadcast.queue_broadcast_holding_registers(reg, self._pack(vals))
+      self._broadcast_frames = self._broadcast.flush_broadcast()
+
+    pending = []
+    for board in self._boards:
+      target = targets[board.get_device_address()]
+      diff = {}
+      for reg in target:
+        if shared.get(reg) != target[reg]:
+          diff[reg] = target[reg]
+      if self._write(board, diff, None, 0) != True:
+        self._failed.append(board.get_device_address())
+      else:
+        pending.append(board)
+
+    for board in pending:
+      current = board.read_config_block()
+      if current is None:
+        self._failed.append(board.get_device_address())
+        continue
+      target = targets[board.get_device_address()]
+      if self._write(board, target, current, max_gap) != True:
+        self._failed.append(board.get_device_address())
+    return len(self._failed) == 0
+
+  def get_failed_boards(self):
+    '''!
+      @brief 获取上一次apply设置或校验失败的协议板设备地址列表。
+      @return 设备地址列表，空列表表示全部成功
+    '''
+    return self._failed
+
+  def get_frame_count(self):
+    '''!
+      @brief 获取上一次apply发送的写数据包数量。
+      @return 长度为2的整型列表:
+      @n      列表索引0:  广播数据包数量
+      @n      列表索引1:  单播数据包数量（不含校验读取）
+    '''
+    return [self._broadcast_frames, self._unicast_frames]
+
+  def _resolve(self, spec):
+    default = spec.get("default", {})
+    boards = spec.get("boards", {})
+    roms = spec.get("roms", {})
+    targets = {}
+    for board in self._boards:
+      addr = board.get_device_address()
+      board_spec = boards.get(addr, {})
+      desired = {}
+      for io in range(board.eD1, board.eD4 + 1):
+        for id in range(board.eID0, board.eID3 + 1):
+          item = {}
+          item.update(default)
+          item.update(board_spec.get("default", {}))
+          item.update(board_spec.get((io, id), {}))
+          if len(item):
+            desired[(io, id)] = item
+      if len(roms):
+        rom_list = board.get_all_18B20_rom()
+        for slot in range(board.DS18B20_CONFIGURATION_NUM):
+          rom = board.get_rom_hex_string(rom_list[slot])
+          if rom in roms:
+            key = ((slot >> 2) + 1, slot & 0x03)
+            item = desired.get(key, {}).copy()
+            item.update(roms[rom])
+            desired[key] = item
+      target = board.get_config_registers(desired)
+      if target is None:
+        print("board 0x%02X spec error."%addr)
+        return None
+      targets[addr] = target
+    return targets
+
+  def _shared_registers(self, targets):
+    counts = None
+    for addr in targets:
+      if counts is None:
+        counts = dict((reg, {}) for reg in targets[addr])
+      for reg in list(counts):
+        if reg not in targets[addr]:
+          del counts[reg]
+          continue
+        val = targets[addr][reg]
+        counts[reg][val] = counts[reg].get(val, 0) + 1
+    shared = {}
+    for reg in counts or {}:
+      shared[reg] = max(counts[reg], key = counts[reg].get)
+    return shared
+
+  def _write(self, board, target, current, max_gap):
+    for reg, vals in board.plan_config_writes(target, current, max_gap):
+      ret = board.write_holding_registers(board.get_device_address(), reg, self._pack(vals))
+      self._unicast_frames += 1
+      if ret != 0:
+        print("board 0x%02X write config error, reg=0x%04X ret=%d"%(board.get_device_address(), reg, ret))
+        return False
+      board.update_config_cache(reg, vals)
+    return True
+
+  def _pack(self, vals):
+    data = []
+    for val in vals:
+      data += [(val >> 8) & 0xFF, val & 0xFF]
+    return data
+
+
+class FleetPoller(object):
+  '''!
+    @brief 同一总线上多协议板的截止时间轮询调度器
+  '''
+
+  def __init__(self, boards, interval_s = 1.0, budget_s = None, baud = 9600, backoff_s = 1.0, max_backoff_s = 60.0, port = "/dev/ttyAMA0"):
+    '''!
+      @brief FleetPoller类参数初始化列表。
+      @param boards: 协议板列表，每项可以是DFRobot_18B20_RS485对象，也可以是设备地址(1~247)，设备地址会创建共用同一个串口的对象。
+      @param interval_s: 每个协议板的目标读取周期，单位秒，默认1s。
+      @param budget_s: 每个轮询周期的时间预算，单位秒，None表示与interval_s相同。
+      @param baud: 用设备地址创建对象时使用的串口波特率，默认9600。
+      @param backoff_s: 协议板读取失败后的初始退避时间，单位秒，连续失败时每次翻倍。
+      @param max_backoff_s: 最大退避时间，单位秒。
+      @param port: 用设备地址创建对象时打开的串口，默认为"/dev/ttyAMA0"。
+    '''
+    self._boards = []
+    bus = None
+    for board in boards:
+      if not isinstance(board, DFRobot_RTU):
+        board = DFRobot_18B20_RS485(board, baud, bus, port)
+      if bus is None:
+        bus = board
+      self._boards.append(board)
+    self._interval = interval_s
+    self._budget = budget_s
+    if self._budget is None:
+      self._budget = interval_s
+    self._backoff = backoff_s
+    self._max_backoff = max_backoff_s
+    self._stream = ReadingStream(self._boards)
+    now = _monotonic()
+    self._due = dict((board.get_device_address(), now) for board in self._boards)
+    self._backoff_until = {}
+    self._failures = {}
+    self._latency = {}
+    self._running = False
+
+  def poll_cycle(self):
+    '''!
+      @brief 规划并执行一个轮询周期：按逾期时间从长到短排列已到期的协议板，在时间预算内依次读取，非阻塞。
+      @return 长度为2的列表:
+      @n      列表索引0:  Reading列表
+      @n      列表索引1:  CycleReport周期报告
+    '''
+    timestamp = time.time()
+    start = _monotonic()
+    due = []
+    backoff = []
+    for board in self._boards:
+      addr = board.get_device_address()
+      if self._backoff_until.get(addr, 0) > start:
+        backoff.append(addr)
+      elif self._due[addr] <= start:
+        due.append(board)
+    due.sort(key = lambda board: self._due[board.get_device_address()])
+
+    readings = []
+    completed = []
+    failed = []
+    deferred = []
+    for board in due:
+      addr = board.get_device_address()
+      t = _monotonic()
+      if (len(completed) + len(failed)) and (t - start + self._latency.get(addr, 0) > self._budget):
+        deferred.append(addr)
+        continue
+      alarm = board.read_temperature_threshold_alarm_flag()
+      if alarm is None:
+        self._fail(addr)
+        failed.append(addr)
+        continue
+      board_readings = self._stream.read_board(board, alarm)
+      if (len(board_readings) == 0) and (self._stream.get_sensor_count(addr) != 0):
+        #有已连接的传感器却没有读数，说明温度块读取失败
+        self._fail(addr)
+        failed.append(addr)
+        continue
+      readings += board_readings
+      latency = _monotonic() - t
+      self._latency[addr] = latency if addr not in self._latency else self._latency[addr]*0.75 + latency*0.25
+      self._failures[addr] = 0
+      self._due[addr] = max(self._due[addr] + self._interval, t)
+      completed.append(addr)
+    return [readings, CycleReport(timestamp, _monotonic() - start, completed, failed, deferred, backoff)]
+
+  def cycles(self):
+    '''!
+      @brief 按interval_s周期执行poll_cycle的生成器，周期按单调时钟对齐，不会累积漂移，每个周期产生poll_cycle的返回值。
+    '''
+    self._running = True
+    start = _monotonic()
+    tick = 0
+    while self._running:
+      delay = start + tick*self._interval - _monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      yield self.poll_cycle()
+      tick = max(tick + 1, int((_monotonic() - start) // self._interval) + 1)
+
+  def stop(self):
+    '''!
+      @brief 停止cycles生成器。
+    '''
+    self._running = False
+
+  def get_boards(self):
+    '''!
+      @brief 获取轮询器管理的DFRobot_18B20_RS485对象列表。
+    '''
+    return self._boards
+
+  def get_latency_s(self, addr):
+    '''!
+      @brief 获取指定协议板读取耗时的平滑估计值，单位秒，未成功读取过时返回None。
+      @param addr: 协议板设备地址
+    '''
+    return self._latency.get(addr)
+
+  def _fail(self, addr):
+    self._failures[addr] = self._failures.get(addr, 0) + 1
+    backoff = min(self._backoff * (2 ** (self._failures[addr] - 1)), self._max_backoff)
+    self._backoff_until[addr] = _monotonic() + backoff
+    self._due[addr] = self._backoff_until[addr]
@@ -0,0 +1,237 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_History.py
+  @brief 18B20传感器温度历史数据的紧凑内存存储库。
+  @details 每个传感器一个固定容量的环形缓冲区，温度以有符号原始值(单位1/16℃)存放在array('h')中，时间戳以相对于存储创建时刻的
+  @n 时间差(单位time_unit_s，默认1ms，可表示约49天)存放在array('I')中，每个样本只占6个字节，而列表中的float对象每个要占用约32字节。
+  @n 追加样本为O(1)，缓冲区满后覆盖最旧的样本；按时间范围查询时二分查找起止位置，返回不复制数据的memoryview切片。
+  @n 样本可以直接来自get_temperature_raw的块读取结果，也可以来自ReadingStream等产生的Reading列表。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+from array import array
+from DFRobot_18B20_Stream import *
+
+try:
+  memoryview(array('h'))
+  _view = lambda a, start, end: memoryview(a)[start:end]
+except TypeError:
+  _view = lambda a, start, end: a[start:end]  #Python 2的array不支持memoryview，退化为复制
+
+class SensorHistory(object):
+  '''!
+    @brief 单个传感器的环形缓冲区
+  '''
+
+  def __init__(self, capacity):
+    '''!
+      @brief SensorHistory类参数初始化列表，缓冲区在创建时一次性分配。
+      @param capacity: 最多保存的样本数量。
+    '''
+    self.times = array('I', [0])*capacity
+    self.raws = array('h', [0])*capacity
+    self._capacity = capacity
+    self._head = 0
+    self._count = 0
+
+  def __len__(self):
+    return self._count
+
+  def append(self, t, raw):
+    '''!
+      @brief 追加一个样本，缓冲区已满时覆盖最旧的样本。
+      @param t: 时间差，单位为所属TemperatureHistory的time_unit_s，必须不小于上一个样本的时间差
+      @param raw: 有符号原始温度值，单位1/16℃
+    '''
+    self.times[self._head] = t
+    self.raws[self._head] = raw
+    self._head += 1
+    if self._head == self._capacity:
+      self._head = 0
+    if self._count < self._capacity:
+      self._count += 1
+
+  def segments(self, t_start = None, t_end = None):
+    '''!
+      @brief 查询时间差在[t_start, t_end)范围内的样本，不复制数据。
+      @param t_start: 起始时间差，None表示最旧的样本
+      @param t_end: 结束时间差(不包含)，None表示最新的样本
+      @return 按时间顺序排列的片段列表(环形缓冲区回绕时为2个片段)，每个片段为(times, raws)元组，两者都是memoryview切片
+      @n      注意：切片直接引用缓冲区，之后追加的样本覆盖旧样本时切片内容也会改变
+    '''
+    first = self._index(t_start) if t_start is not None else 0
+    last = self._index(t_end) if t_end is not None else self._count
+    if first >= last:
+      return []
+    start = (self._head - self._count) % self._capacity
+    a = start + first
+    b = start + last
+    if b <= self._capacity:
+      return [(_view(self.times, a, b), _view(self.raws, a, b))]
+    if a >= self._capacity:
+      a -= self._capacity
+      b -= self._capacity
+      return [(_view(self.times, a, b), _view(self.raws, a, b))]
+    return [(_view(self.times, a, self._capacity), _view(self.raws, a, self._capacity)),
+            (_view(self.times, 0, b - self._capacity), _view(self.raws, 0, b - self._capacity))]
+
+  def latest(self):
+    '''!
+      @brief 获取最新的样本。
+      @return (时间差, 原始温度值)元组，没有样本时返回None
+    '''
+    if self._count == 0:
+      return None
+    i = self._head - 1 if self._head else self._capacity - 1
+    return (self.times[i], self.raws[i])
+
+  def _index(self, t):
+    #第一个时间差不小于t的样本的逻辑位置(0为最旧的样本)
+    start = (self._head - self._count) % self._capacity
+    lo = 0
+    hi = self._count
+    while lo < hi:
+      mid = (lo + hi) >> 1
+      if self.times[(start + mid) % self._capacity] < t:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+
+class TemperatureHistory(object):
+  '''!
+    @brief 多传感器温度历史存储
+  '''
+
+  def __init__(self, capacity = 86400, time_unit_s = 0.001, base_time = None):
+    '''!
+      @brief TemperatureHistory类参数初始化列表。
+      @param capacity: 每个传感器最多保存的样本数量，默认86400(每秒一个样本保存24小时)。
+      @param time_unit_s: 时间差的单位，单位秒，默认0.001s，32位时间差可表示的最长时间为4294967295*time_unit_s。
+      @param base_time: 时间差的基准时刻(time.time()时间戳)，None表示当前时刻。
+    '''
+    self._capacity = capacity
+    self._unit = time_unit_s
+    self._base = time.time() if base_time is None else base_time
+    self._sensors = {}
+
+  def keys(self):
+    '''!
+      @brief 获取所有有历史数据的传感器键，键为ROM码16进制字符串或(addr, io, id)元组。
+    '''
+    return list(self._sensors.keys())
+
+  def get_sensor(self, key):
+    '''!
+      @brief 获取一个传感器的SensorHistory对象，用于直接访问缓冲区。
+      @param key: ROM码16进制字符串或(addr, io, id)元组
+      @return SensorHistory对象，没有该传感器时返回None
+    '''
+    return self._sensors.get(key)
+
+  def append(self, key, raw, timestamp = None):
+    '''!
+      @brief 追加一个传感器的样本。
+      @param key: ROM码16进制字符串或(addr, io, id)元组
+      @param raw: 有符号原始温度值，单位1/16℃
+      @param timestamp: time.time()时间戳，None表示当前时刻
+    '''
+    if timestamp is None:
+      timestamp = time.time()
+    sensor = self._sensors.get(key)
+    if sensor is None:
+      sensor = SensorHistory(self._capacity)
+      self._sensors[key] = sensor
+    sensor.append(self._to_delta(timestamp), raw)
+
+  def add_block(self, addr, raws, slot = 0, timestamp = None, mask = 0xFFFF):
+    '''!
+      @brief 直接追加一次块温度读取的结果，键为(addr, io, id)。
+      @param addr: 协议板设备地址
+      @param raws: get_temperature_raw(slot, count)的返回值，为None(读取失败)时不追加
+      @param slot: 块读取的起始位置，与get_temperature_raw的slot参数相同
+      @param timestamp: time.time()时间戳，None表示当前时刻
+      @param mask: 需要追加的传感器位置掩码，第(io - 1)*4 + id位为1表示追加，一般为scan()的返回值，默认全部追加
+    '''
+    if raws is None:
+      return
+    if timestamp is None:
+      timestamp = time.time()
+    t = self._to_delta(timestamp)
+    for i in range(len(raws)):
+      s = slot + i
+      if not (mask & (1 << s)):
+        continue
+      key = (addr, (s >> 2) + 1, s & 0x03)
+      sensor = self._sensors.get(key)
+      if sensor is None:
+        sensor = SensorHistory(self._capacity)
+        self._sensors[key] = sensor
+      sensor.append(t, raws[i])
+
+  def poll(self, board, mask = 0xFFFF):
+    '''!
+      @brief 对一个协议板进行一次块温度读取并追加结果，键为(addr, io, id)。
+      @param board: DFRobot_18B20_RS485对象
+      @param mask: 需要追加的传感器位置掩码，同add_block
+      @return 读取状态:
+      @n      True:  成功
+      @n      False: 读取失败
+    '''
+    raws = board.get_temperature_raw()
+    self.add_block(board.get_device_address(), raws, 0, None, mask)
+    return raws is not None
+
+  def add_readings(self, readings, by_rom = False):
+    '''!
+      @brief 追加Reading列表中的样本。
+      @param readings: Reading列表
+      @param by_rom: True: 以ROM码为键，传感器更换位置后历史仍然连续；False: 以(addr, io, id)为键
+    '''
+    for r in readings:
+      self.append(r.rom if by_rom else (r.addr, r.io, r.id), r.raw, r.timestamp)
+
+  def query(self, key, start = None, end = None):
+    '''!
+      @brief 按时间范围查询一个传感器的历史数据，不复制数据。
+      @param key: ROM码16进制字符串或(addr, io, id)元组
+      @param start: 起始time.time()时间戳，None表示最旧的样本
+      @param end: 结束time.time()时间戳(不包含)，None表示最新的样本
+      @return 片段列表，格式同SensorHistory.segments，时间差可用to_timestamp转换为时间戳，没有该传感器时返回空列表
+    '''
+    sensor = self._sensors.get(key)
+    if sensor is None:
+      return []
+    return sensor.segments(None if start is None else self._to_delta(start), None if end is None else self._to_delta(end))
+
+  def get(self, key, start = None, end = None):
+    '''!
+      @brief 按时间范围查询一个传感器的历史数据，返回复制的数据，方便直接使用。
+      @param key: ROM码16进制字符串或(addr, io, id)元组
+      @param start: 起始time.time()时间戳，None表示最旧的样本
+      @param end: 结束time.time()时间戳(不包含)，None表示最新的样本
+      @return (timestamp, temperature_c)元组列表
+    '''
+    samples = []
+    for times, raws in self.query(key, start, end):
+      samples += [(self.to_timestamp(times[i]), raws[i]/16.0) for i in range(len(times))]
+    return samples
+
+  def to_timestamp(self, t):
+    '''!
+      @brief 将时间差转换为time.time()时间戳。
+      @param t: 时间差
+    '''
+    return self._base + t*self._unit
+
+  def _to_delta(self, timestamp):
+    t = int(round((timestamp - self._base) / self._unit))
+    return min(max(t, 0), 0xFFFFFFFF)
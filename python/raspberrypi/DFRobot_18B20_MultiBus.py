@@ -0,0 +1,156 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_MultiBus.py
+  @brief 多条RS485总线并行轮询库。
+  @details 网关上接有多个USB转RS485适配器时，每个串口上都级联着各自的TEL0144协议转换板。MultiBusPoller为每个串口创建一个
+  @n FleetPoller并在独立的工作线程中运行（串口读写会释放GIL），各总线的读数合并到同一个按时间戳排序的输出队列中，
+  @n 网关的总吞吐量随总线数量近似线性增长。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+import heapq
+import threading
+from DFRobot_18B20_Fleet import *
+
+class MultiBusPoller(object):
+  '''!
+    @brief 每条总线一个工作线程的多总线轮询协调器
+  '''
+
+  def __init__(self, buses, interval_s = 1.0, baud = 9600, max_delay_s = None, max_pending = 10000):
+    '''!
+      @brief MultiBusPoller类参数初始化列表。
+      @param buses: 字典，键为串口(例如"/dev/ttyUSB0")，值为该总线上的协议板列表(设备地址或DFRobot_18B20_RS485对象，含义同FleetPoller)。
+      @param interval_s: 每个协议板的目标读取周期，单位秒，默认1s。
+      @param baud: 用设备地址创建对象时使用的串口波特率，默认9600。
+      @param max_delay_s: 读数在输出队列中等待其他总线追上的最长时间，单位秒，超过后即使顺序无法保证也会输出，None表示2倍interval_s。
+      @param max_pending: 输出队列的最大长度，超过时丢弃最早的读数，使用者处理不及时也不会阻塞总线轮询。
+    '''
+    self._interval = interval_s
+    self._max_delay = max_delay_s
+    if self._max_delay is None:
+      self._max_delay = 2*interval_s
+    self._max_pending = max_pending
+    self._pollers = {}
+    for port in buses:
+      self._pollers[port] = FleetPoller(buses[port], interval_s, baud = baud, port = port)
+    self._cond = threading.Condition()
+    self._heap = []
+    self._seq = 0
+    self._progress = dict((port, 0.0) for port in self._pollers)
+    self._reports = {}
+    self._dropped = 0
+    self._threads = []
+    self._running = False
+
+  def start(self):
+    '''!
+      @brief 为每条总线启动一个工作线程，开始轮询。
+    '''
+    if self._running:
+      return
+    self._running = True
+    self._threads = []
+    for port in self._pollers:
+      t = threading.Thread(target = self._worker, args = (port, self._pollers[port]))
+      t.daemon = True
+      t.start()
+      self._threads.append(t)
+
+  def stop(self):
+    '''!
+      @brief 停止所有工作线程，等待它们完成当前周期后退出。
+    '''
+    self._running = False
+    for port in self._pollers:
+      self._pollers[port].stop()
+    for t in self._threads:
+      t.join()
+    with self._cond:
+      self._cond.notify_all()
+
+  def get(self, timeout = None):
+    '''!
+      @brief 按时间戳顺序从输出队列中取出一个读数。
+      @param timeout: 最长等待时间，单位秒，None表示一直等待直到停止。
+      @return Reading对象，超时或已停止且队列为空时返回None
+    '''
+    deadline = None
+    if timeout is not None:
+      deadline = time.time() + timeout
+    with self._cond:
+      while True:
+        if len(self._heap) and (self._releasable(self._heap[0][0]) or (not self._running)):
+          return heapq.heappop(self._heap)[2]
+        if (not self._running) and (len(self._heap) == 0):
+          return None
+        wait = self._max_delay
+        if len(self._heap):
+          wait = max(self._heap[0][0] + self._max_delay - time.time(), 0.001)
+        if deadline is not None:
+          if time.time() >= deadline:
+            return None
+          wait = min(wait, deadline - time.time())
+        self._cond.wait(wait)
+
+  def readings(self):
+    '''!
+      @brief 按时间戳顺序产生所有总线读数的生成器，调用stop后输出完剩余的读数即退出。
+    '''
+    while True:
+      reading = self.get()
+      if reading is None:
+        return
+      yield reading
+
+  def get_report(self, port):
+    '''!
+      @brief 获取指定总线最近一个轮询周期的CycleReport报告，还没有完成过周期时返回None。
+      @param port: 串口
+    '''
+    return self._reports.get(port)
+
+  def get_dropped(self):
+    '''!
+      @brief 获取因输出队列已满而丢弃的读数数量。
+    '''
+    return self._dropped
+
+  def get_poller(self, port):
+    '''!
+      @brief 获取指定总线的FleetPoller对象，可用于访问该总线上的DFRobot_18B20_RS485对象。
+      @param port: 串口
+    '''
+    return self._pollers[port]
+
+  def _releasable(self, timestamp):
+    if timestamp <= min(self._progress.values()):
+      return True
+    return time.time() - timestamp >= self._max_delay
+
+  def _worker(self, port, poller):
+    while self._running:
+      try:
+        for readings, report in poller.cycles():
+          with self._cond:
+            for reading in readings:
+              self._seq += 1
+              heapq.heappush(self._heap, (reading.timestamp, self._seq, reading))
+            while len(self._heap) > self._max_pending:
+              heapq.heappop(self._heap)
+              self._dropped += 1
+            self._progress[port] = time.time()
+            self._reports[port] = report
+            self._cond.notify_all()
+          if not self._running:
+            break
+      except Exception as e:
+        print("bus %s error: %s"%(port, e))
+        time.sleep(self._interval)
@@ -68,6 +68,8 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
   DS18B20_CONNECTED_TO_EACH_IO_MAX_NUM = 4 
   ## 协议转换板上可配置8个18B20传感器
   DS18B20_CONFIGURATION_NUM = 16 
+  ## 温度阈值和精度配置寄存器块(REG_18B20_D1_NUM0_TH_TL ~ REG_18B20_D1_NUM0_ACCURACY + 15)的长度：32个寄存器
+  DS18B20_CONFIG_REG_NUM    = 32
   ## in 在温度阈值范围内
   IN_THE_TEMPERATURE_THRESHOLD            = 0 
   ## below 低于最低温度阈值
@@ -143,7 +145,7 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
   ## 批量配置中，协议板上所有的18B20传感器需要配置
   eBatch_ID_ALL = 0x0F  
 
-  def __init__(self, addr, baud = 9600):
+  def __init__(self, addr, baud = 9600, bus = None, port = "/dev/ttyAMA0"):
     '''!
       @brief DFRobot_18B20_RS485类参数初始化列表。
       @param addr: TEL0144设备的设备地址(1~247)或广播地址(0)。主机要和TEL0144从机设备通信，需要知道从机设备的串口通信配置和设备地址，主机使用广播地址将发送广播包，
@@ -164,9 +166,20 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       @n note: 树莓派主机要和TEL0144设备从机通信，则它们的串口通信配置必须一致，TEL0144设备的出厂串口通信配置为：9600波特率，8位数据位，无校验位，1位停止位，
       @n 用户必须知道TEL0144设备的串口通信配置，如果忘记了TEL0144设备的地址，可以通过初始化一个广播地址类对象将地址设置为1~247范围内的地址，或者通过scan_modbus_id.py
       @n 例程来扫描TEL0144的地址，这些配置成功的前提是用户必须知道TEL0144设备的串口通信配置。
+      @param bus: 共享串口的另一个DFRobot_RTU或DFRobot_18B20_RS485对象，总线上级联多个设备时，多个对象可以共用同一个串口，为None时打开新的串口。
+      @param port: bus为None时打开的串口，默认为"/dev/ttyAMA0"，使用USB转RS485适配器时可以是"/dev/ttyUSB0"等。
     '''
     self._addr = addr
-    DFRobot_RTU.__init__(self, baud, 8, 'N', 1)
+    self._config_cache = None
+    self._config_cache_enable = False
+    self._config_cache_interval = 0
+    self._config_cache_time = 0
+    DFRobot_RTU.__init__(self, baud, 8, 'N', 1, bus, port)
+    #寄存器缓存的默认有效期：设备标识和串口配置永不过期，ROM码和阈值/精度配置60s，温度、报警标志和连接状态0.1s
+    for reg, size, ttl in [(self.REG_PID, 6, None), (self.REG_18B20_D1_NUM0_ROM, 64, 60), (self.REG_18B20_D1_NUM0_TH_TL, self.DS18B20_CONFIG_REG_NUM, 60),
+                           (self.REG_18B20_D1_NUM0_TEMP, 16, 0.1), (self.REG_18B20_D1_ALARM, 4, 0.1), (self.REG_D1_CONNECTED_FLAG, 4, 0.1)]:
+      if reg not in self._bus["cache_ttl"]:
+        self.set_cache_ttl_s(reg, size, ttl)
 
   def begin(self):
     '''!
@@ -175,7 +188,8 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       @n       0: sucess
       @n      -1: failed
     '''
-    time.sleep(1)
+    if self._addr != 0:
+      time.sleep(1)
     self.set_timout_time_s(0.5)
     if self._addr > 0xF7:
       print("Invaild Device addr.")
@@ -299,13 +313,24 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       @n 16位返回值的b8~b11,  对应D3 IO口上序号id0~id3位置上连接的18B20传感器状态，0->未连接传感器， 1->有传感器连接
       @n 16位返回值的b12~b15, 对应D4 IO口上序号id0~id3位置上连接的18B20传感器状态，0->未连接传感器， 1->有传感器连接
     '''
+    state = self.read_18B20_connected_state()
+    if state is None:
+      state = 0
+    return state
+
+  def read_18B20_connected_state(self):
+    '''!
+      @brief 扫描各IO口上18B20传感器的连接状态，与scan相同，但能区分读取失败和没有连接传感器。
+      @return 读取成功返回16位连接状态，格式同scan；读取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
     l = self.read_holding_registers(self._addr, self.REG_D1_CONNECTED_FLAG, 4)
-    state = 0
-    if (l[0] == 0) and (len(l) == 9):
-      state = (l[1] & l[2]) & 0x0F         
-      state |= ((l[3] & l[4]) & 0x0F) << 4
-      state |= ((l[5] & l[6]) & 0x0F) << 8
-      state |= ((l[7] & l[8]) & 0x0F) << 12
+    if (l[0] != 0) or (len(l) != 9):
+      return None
+    state = (l[1] & l[2]) & 0x0F         
+    state |= ((l[3] & l[4]) & 0x0F) << 4
+    state |= ((l[5] & l[6]) & 0x0F) << 8
+    state |= ((l[7] & l[8]) & 0x0F) << 12
     return state
 
   def set_device_address(self, new_addr):
@@ -343,6 +368,193 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     '''
     return self._addr
 
+  def enable_config_cache(self, verify_interval_s = 0):
+    '''!
+      @brief 开启配置缓存。开启后，通过一次块读取(REG_18B20_D1_NUM0_TH_TL开始的32个寄存器)将所有18B20传感器的温度阈值和精度配置缓存到内存中，
+      @n     get_temperature_threshold和get_18B20_accuracy将直接从缓存中返回，不再占用总线。set_temperature_threshold、set_18B20_accuracy
+      @n     以及批量设置函数设置成功后会同步更新缓存。
+      @param verify_interval_s: 缓存重新校验的周期，单位秒，超过该时间后，下一次读取会重新从设备读取整个配置块，0表示不重新校验。
+      @return 开启状态:
+      @n      True:  开启成功
+      @n      False: 开启失败（广播地址类对象无法读取配置，或读取配置块失败）
+      @attention 广播地址（0x00）无法获取任何数据，不能开启配置缓存
+    '''
+    if self._addr == 0:
+      print("broadcast address can not cache configuration.")
+      return False
+    self._config_cache_interval = verify_interval_s
+    self._config_cache_enable = True
+    if self.refresh_config_cache() != True:
+      self._config_cache_enable = False
+      return False
+    return True
+
+  def disable_config_cache(self):
+    '''!
+      @brief 关闭配置缓存，之后温度阈值和精度的读取将重新直接访问设备。
+    '''
+    self._config_cache_enable = False
+    self._config_cache = None
+
+  def refresh_config_cache(self):
+    '''!
+      @brief 从设备重新读取整个温度阈值和精度配置块，更新配置缓存。
+      @return 读取状态:
+      @n      True:  更新成功
+      @n      False: 更新失败，原有缓存保持不变
+    '''
+    block = self.read_config_block()
+    if block is None:
+      return False
+    self._config_cache = block
+    self._config_cache_time = time.time()
+    return True
+
+  def apply_config(self, desired, max_gap = DS18B20_CONFIG_REG_NUM):
+    '''!
+      @brief 按目标配置批量配置18B20传感器的温度阈值和精度。先与设备当前配置（开启了配置缓存时使用缓存，否则进行一次块读取）比较，
+      @n     只改写发生变化的寄存器，并将REG_18B20_D1_NUM0_TH_TL和REG_18B20_D1_NUM0_ACCURACY两段寄存器中变化的部分合并成尽可能少的
+      @n     写多个保持寄存器(0x10)数据包发送。
+      @param desired: 目标配置字典，键为(io, id)元组，值为字典，可包含以下项，未给出的项保持不变:
+      @n     "th":       温度的上阈值，范围-55~125℃，必须和"tl"同时给出
+      @n     "tl":       温度的下阈值，范围-55~125℃，必须满足th > tl
+      @n     "accuracy": 精度设置，范围0~3(e18B20_ACCURACY_9_BIT ~ e18B20_ACCURACY_12_BIT)
+      @n     例: {(eD1, eID0): {"th": 30, "tl": 10, "accuracy": e18B20_ACCURACY_12_BIT}, (eD2, eID3): {"accuracy": e18B20_ACCURACY_9_BIT}}
+      @param max_gap: 两段变化的寄存器之间最多间隔多少个未变化的寄存器时，用当前值填充间隔并合并为一个数据包发送，默认32，即配置块内全部合并。
+      @n     广播地址类对象无法读取当前配置，只会合并相邻的寄存器。
+      @return 设置状态:
+      @n      True:  设置成功（包括没有需要改写的寄存器）
+      @n      False: 参数错误、读取当前配置失败或设置失败
+    '''
+    target = self.get_config_registers(desired)
+    if target is None:
+      return False
+    #读取、比较和写入期间持有总线锁，避免其他线程在两者之间修改配置
+    self.lock_bus()
+    try:
+      current = None
+      if self._addr != 0:
+        if self._config_cache_enable:
+          self._read_config_register(self.REG_18B20_D1_NUM0_TH_TL)
+          current = self._config_cache
+        if current is None:
+          current = self.read_config_block()
+        if current is None:
+          print("read configuration error.")
+          return False
+      for reg, vals in self.plan_config_writes(target, current, max_gap):
+        data = []
+        for val in vals:
+          data += [(val >> 8) & 0xFF, val & 0xFF]
+        ret = self.write_holding_registers(self._addr, reg, data)
+        if ret != 0:
+          print("apply config error, reg=0x%04X ret=%d"%(reg, ret))
+          return False
+        self.update_config_cache(reg, vals)
+      return True
+    finally:
+      self.unlock_bus()
+
+  def read_config_block(self):
+    '''!
+      @brief 通过一次块读取获取REG_18B20_D1_NUM0_TH_TL开始的整个温度阈值和精度配置块(32个寄存器)，不经过配置缓存。
+      @n     开启了配置缓存时，读取成功后同步更新缓存。
+      @return 读取成功返回长度为32的整型列表，列表索引0~15为各位置的温度阈值寄存器(高8位th，低8位tl)，16~31为各位置的精度寄存器，
+      @n      位置为(io - 1)*4 + id；读取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    l = self.read_holding_registers(self._addr, self.REG_18B20_D1_NUM0_TH_TL, self.DS18B20_CONFIG_REG_NUM)
+    if (l[0] != 0) or (len(l) != (1 + self.DS18B20_CONFIG_REG_NUM*2)):
+      return None
+    block = [((l[1 + 2*i] << 8) | l[2 + 2*i]) & 0xFFFF for i in range(self.DS18B20_CONFIG_REG_NUM)]
+    if self._config_cache is not None:
+      self._config_cache = block[:]
+      self._config_cache_time = time.time()
+    return block
+
+  def get_config_registers(self, desired):
+    '''!
+      @brief 将目标配置转换为需要写入的配置寄存器，只检查参数，不访问总线。
+      @param desired: 目标配置字典，格式同apply_config。
+      @return 字典，键为寄存器地址，值为16位寄存器值；参数错误时返回None
+    '''
+    target = {}
+    for key in desired:
+      io, id = key
+      if (io < self.eD1) or (io > self.eD4) or (id < self.eID0) or (id > self.eID3):
+        print("io or id is out of range: io=%d, id=%d"%(io, id))
+        return None
+      item = desired[key]
+      slot = (io - 1)*4 + id
+      if ("th" in item) or ("tl" in item):
+        th = item.get("th")
+        tl = item.get("tl")
+        if (th is None) or (tl is None) or (th > 125) or (tl < -55) or (th <= tl):
+          print("th, tl params error: th(-55~125)=%s, tl(-55~125)=%s"%(th, tl))
+          return None
+        target[self.REG_18B20_D1_NUM0_TH_TL + slot] = (((th + 256) & 0xFF) << 8) | ((tl + 256) & 0xFF)
+      if "accuracy" in item:
+        if (item["accuracy"] < self.e18B20_ACCURACY_9_BIT) or (item["accuracy"] > self.e18B20_ACCURACY_12_BIT):
+          print("accuracy out of range(0~3): %d"%item["accuracy"])
+          return None
+        target[self.REG_18B20_D1_NUM0_ACCURACY + slot] = item["accuracy"]
+    return target
+
+  def plan_config_writes(self, target, current, max_gap):
+    '''!
+      @brief 比较目标寄存器值与当前配置，将需要改写的寄存器合并为写多个保持寄存器(0x10)数据包，只计算，不访问总线。
+      @param target: 目标寄存器字典，一般为get_config_registers的返回值。
+      @param current: read_config_block返回的当前配置块，None表示当前配置未知，此时target中的寄存器全部改写，且只合并相邻的寄存器。
+      @param max_gap: 两段需改写的寄存器之间最多间隔多少个未变化的寄存器时，用current中的值填充间隔并合并为一个数据包。
+      @return (起始寄存器地址, 寄存器值列表)元组的列表，每个元组对应一个数据包
+    '''
+    base = self.REG_18B20_D1_NUM0_TH_TL
+    if current is None:
+      changed = sorted(target)
+    else:
+      changed = [reg for reg in sorted(target) if current[reg - base] != target[reg]]
+    frames = []
+    for reg in changed:
+      if len(frames):
+        start, vals = frames[-1]
+        gap = reg - (start + len(vals))
+        if (gap == 0) or ((current is not None) and (gap <= max_gap)):
+          vals += [current[r - base] for r in range(start + len(vals), reg)]
+          vals.append(target[reg])
+          continue
+      frames.append((reg, [target[reg]]))
+    return frames
+
+  def update_config_cache(self, reg, vals):
+    '''!
+      @brief 绕过本对象的设置函数改写了配置寄存器(例如直接调用write_holding_registers或广播)后，同步更新配置缓存；未开启配置缓存时不做任何操作。
+      @param reg: 起始寄存器地址，配置块(REG_18B20_D1_NUM0_TH_TL ~ REG_18B20_D1_NUM0_ACCURACY + 15)以外的寄存器被忽略
+      @param vals: 写入的16位寄存器值列表
+    '''
+    if self._config_cache is None:
+      return
+    i = 0
+    while i < len(vals):
+      offset = reg + i - self.REG_18B20_D1_NUM0_TH_TL
+      if (offset >= 0) and (offset < self.DS18B20_CONFIG_REG_NUM):
+        self._config_cache[offset] = vals[i] & 0xFFFF
+      i += 1
+
+  def read_temperature_threshold_alarm_flag(self):
+    '''!
+      @brief 获取温度阈值报警状态，与get_temperature_threshold_alarm_flag相同，但能区分读取失败和没有报警。
+      @return 读取成功返回32位报警状态，格式同get_temperature_threshold_alarm_flag；读取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    temp = self.read_holding_registers(self._addr, self.REG_18B20_D1_ALARM, 4)
+    if temp[0] != 0 or len(temp) != 9:
+      return None
+    state =  (temp[1] & 0x0F) | (temp[2] << 4)
+    state |= (((temp[3] & 0x0F) | (temp[4] << 4)) << 8)
+    state |= (((temp[5] & 0x0F) | (temp[6] << 4)) << 16)
+    state |= (((temp[7] & 0x0F) | (temp[8] << 4)) << 24)
+    return state
+
   def batch_set_18b20_accuracy(self, batch_io, batch_id, accuracy):
     '''!
       @brief 批量设置18B20温度传感器的精度，如果不修改，默认精度为e18B20_ACCURACY_12_BIT，掉电保存，配置不丢失。
@@ -401,20 +613,21 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       if(batch_io & (1 << i)):
         j = 0
         while j <= self.DS18B20_CONNECTED_TO_EACH_IO_MAX_NUM:
-          if (j < self.DS18B20_CONNECTED_TO_EACH_IO_MAX_NUM) and (batch_id & (1 << i)):
+          if (j < self.DS18B20_CONNECTED_TO_EACH_IO_MAX_NUM) and (batch_id & (1 << j)):
             if size == 0:
-              id = i
+              id = j
             temp[size] = 0x00
             temp[size + 1] = accuracy & 0xFF
             size += 2
           else:
             if size != 0:
               ret = self.write_holding_registers(self._addr, self.REG_18B20_D1_NUM0_ACCURACY + 4*i + id, temp[:size])
-              size = 0
               if ret != 0:
                 print("batch_id = ",bin(batch_id),"i - 1 = %d"%(i-1))
                 print("Set Accuracy Error.")
                 return False
+              self.update_config_cache(self.REG_18B20_D1_NUM0_ACCURACY + 4*i + id, [accuracy & 0xFF]*(size >> 1))
+              size = 0
           j += 1
       i += 1
     return True
@@ -451,6 +664,7 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     if ret != 0:
       print("set accuracy error.")
       return False
+    self.update_config_cache(self.REG_18B20_D1_NUM0_ACCURACY + (io - 1)*4 + id, [accuracy])
     return True
   
   def get_18B20_accuracy(self, io, id):
@@ -480,7 +694,7 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     if id < self.eID0 and id > self.eID3:
       print("id is out of range(0~3):id=%d"%id)
       return 0xFFFF
-    accuracy = self.read_holding_register(self._addr, self.REG_18B20_D1_NUM0_ACCURACY + (io - 1)*4 +id)
+    accuracy = self._read_config_register(self.REG_18B20_D1_NUM0_ACCURACY + (io - 1)*4 +id)
     return accuracy
 
   def batch_set_18b20_temperature_threshold(self, batch_io, batch_id, th, tl):
@@ -551,11 +765,12 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
           else:
             if size != 0:
               ret = self.write_holding_registers(self._addr, self.REG_18B20_D1_NUM0_TH_TL + 4*i + id, temp[:size])
-              size = 0
               if ret != 0:
                 print("batch_id = ",bin(batch_id),"i = %d, j=%d ret=%d"%(i,j, ret))
                 print("Set batch threshold Error.")
                 return False
+              self.update_config_cache(self.REG_18B20_D1_NUM0_TH_TL + 4*i + id, [(th << 8) | tl]*(size >> 1))
+              size = 0
           j += 1
       i += 1
     return True
@@ -591,14 +806,15 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       return False
     
     if th < 0:
-      th = 256 - th
+      th = 256 + th
     if tl < 0:
-      tl = 256 - tl
+      tl = 256 + tl
     val = (th << 8) | tl
     ret = self.write_holding_register(self._addr, self.REG_18B20_D1_NUM0_TH_TL + (io - 1)*4 + id, val)
     if ret != 0:
       print("Set threshold failed,ret=%d"%ret)
       return False
+    self.update_config_cache(self.REG_18B20_D1_NUM0_TH_TL + (io - 1)*4 + id, [val])
     return True
 
   def get_temperature_threshold(self, io, id):
@@ -624,7 +840,7 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     if id < self.eID0 and id > self.eID3:
       print("id is out of range(0~3):id=%d"%id)
       return False
-    val = self.read_holding_register(self._addr, self.REG_18B20_D1_NUM0_TH_TL + (io - 1)*4 + id)
+    val = self._read_config_register(self.REG_18B20_D1_NUM0_TH_TL + (io - 1)*4 + id)
     
     th = (val >> 8) & 0xFF
     tl = val  & 0xFF
@@ -661,14 +877,9 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       @n 32位返回值中b24~b31， 表示D4引脚上连接的18B20传感器发生阈值报警的状态，其中b0~b3分别代表IO引脚上序号id0~id3是否发生温度阈值报警，0->未发生，1->发生，b4~b5分别代表该IO引脚上的传感器如果发生了阈值报警，发生的是什么情况的报警，0->低于最低阈值报警,1->1高于最高温度阈值报警;
       @attention 广播地址（0x00）无法获取任何数据，只能设置
     '''
-    state = 0
-    temp = self.read_holding_registers(self._addr, self.REG_18B20_D1_ALARM, 4)
-    if temp[0] == 0 and len(temp) == 9:
-      state =  (temp[1] & 0x0F) | (temp[2] << 4)
-      state |= (((temp[3] & 0x0F) | (temp[4] << 4)) << 8)
-      state |= (((temp[5] & 0x0F) | (temp[6] << 4)) << 16)
-      state |= (((temp[7] & 0x0F) | (temp[8] << 4)) << 24)
-
+    state = self.read_temperature_threshold_alarm_flag()
+    if state is None:
+      state = 0
     return state
 
   def parse_threshold_alarm_flag(self, io, id, alarm_flag):
@@ -765,8 +976,49 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
       print("id is out of range(0~3):id=%d"%id)
       return 0
     val = self.read_holding_register(self._addr, self.REG_18B20_D1_NUM0_TEMP + 4*(io - 1) + id)
+    if val & 0x8000:
+      val -= 0x10000
     return val/16.0
-  
+
+  def get_temperature_raw(self, slot = 0, count = DS18B20_CONFIGURATION_NUM):
+    '''!
+      @brief 通过一次块读取获取连续多个位置的18B20传感器的原始温度值。
+      @param slot: 起始位置，范围0~15，位置 = (io - 1)*4 + id，例：D2口上id为1的传感器位置为5
+      @param count: 读取的传感器数量，范围1~16，slot + count不能超过16，默认读取全部16个位置
+      @return 长度为count的整型列表，每项为有符号的原始温度值，单位1/16℃，除以16.0即为摄氏度；获取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    if (slot < 0) or (count < 1) or (slot + count > self.DS18B20_CONFIGURATION_NUM):
+      print("slot or count is out of range: slot=%d, count=%d"%(slot, count))
+      return None
+    l = self.read_holding_registers(self._addr, self.REG_18B20_D1_NUM0_TEMP + slot, count)
+    if (l[0] != 0) or (len(l) != 1 + count*2):
+      return None
+    vals = []
+    i = 0
+    while i < count:
+      val = (l[1 + 2*i] << 8) | l[2 + 2*i]
+      if val & 0x8000:
+        val -= 0x10000
+      vals.append(val)
+      i += 1
+    return vals
+
+  def get_all_18B20_accuracy(self):
+    '''!
+      @brief 获取协议板上全部16个位置的18B20传感器的精度配置，开启了配置缓存时直接从缓存返回，否则通过一次块读取获取。
+      @return 长度为16的整型列表，索引为(io - 1)*4 + id，每项为精度配置(e18B20_ACCURACY_9_BIT ~ e18B20_ACCURACY_12_BIT)；获取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    if self._config_cache_enable:
+      self._read_config_register(self.REG_18B20_D1_NUM0_ACCURACY)
+      if self._config_cache is not None:
+        return self._config_cache[self.DS18B20_CONFIGURATION_NUM:]
+    l = self.read_holding_registers(self._addr, self.REG_18B20_D1_NUM0_ACCURACY, self.DS18B20_CONFIGURATION_NUM)
+    if (l[0] != 0) or (len(l) != 1 + self.DS18B20_CONFIGURATION_NUM*2):
+      return None
+    return [((l[1 + 2*i] << 8) | l[2 + 2*i]) & 0xFFFF for i in range(self.DS18B20_CONFIGURATION_NUM)]
+
   def get_18B20_rom(self, io, id):
     '''!
       @brief 获取指定18B20传感器的ROM码
@@ -792,7 +1044,30 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     if ret[0] == 0:
       return ret[1:]
     return [0]*8
-  
+
+  def get_all_18B20_rom(self):
+    '''!
+      @brief 通过一次块读取(REG_18B20_D1_NUM0_ROM开始的64个寄存器)获取协议板上全部16个位置的18B20传感器的ROM码
+      @return 长度为16的列表，索引为(io - 1)*4 + id，每项为长度为8的ROM码列表，全为0代表获取失败或该位置未被分配给18B20传感器
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    roms = self.read_all_18B20_rom()
+    if roms is None:
+      return [[0]*8 for i in range(self.DS18B20_CONFIGURATION_NUM)]
+    return roms
+
+  def read_all_18B20_rom(self):
+    '''!
+      @brief 获取协议板上全部16个位置的18B20传感器的ROM码，与get_all_18B20_rom相同，但能区分读取失败和未分配的位置。
+      @return 读取成功返回长度为16的列表，格式同get_all_18B20_rom；读取失败返回None
+      @attention 广播地址（0x00）无法获取任何数据，只能设置
+    '''
+    size = self.DS18B20_CONFIGURATION_NUM*self.DS18B20_ROM_BYTES
+    ret = self.read_holding_registers(self._addr, self.REG_18B20_D1_NUM0_ROM, size >> 1)
+    if (ret[0] != 0) or (len(ret) != size + 1):
+      return None
+    return [ret[1 + i*8: 9 + i*8] for i in range(self.DS18B20_CONFIGURATION_NUM)]
+
   def get_rom_hex_string(self,rom):
     '''!
       @brief 将获取到的8字节的ROM码转换为16进制表示的字符串，例：8字节的ROM号为0x28 0xAA 0xAD 0x38 0x54 0x14 0x01 0x6A转化为
@@ -839,3 +1114,11 @@ class DFRobot_18B20_RS485(DFRobot_RTU):
     return False
 
 
+
+  def _read_config_register(self, reg):
+    if self._config_cache_enable:
+      if (self._config_cache is None) or ((self._config_cache_interval > 0) and (time.time() - self._config_cache_time > self._config_cache_interval)):
+        self.refresh_config_cache()
+      if self._config_cache is not None:
+        return self._config_cache[reg - self.REG_18B20_D1_NUM0_TH_TL]
+    return self.read_holding_register(self._addr, reg)
@@ -0,0 +1,140 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Scheduler.py
+  @brief 按18B20传感器精度调度的温度采样库。
+  @details 18B20传感器完成一次温度转换的时间取决于精度配置：9位约93.75ms，10位约187.5ms，11位约375ms，12位约750ms，
+  @n 比转换时间更快地读取温度只会重复读到相同的值，浪费总线时间。调度器根据REG_18B20_D1_NUM0_ACCURACY中每个传感器的精度配置，
+  @n 计算每个传感器下一次产生新数据的时间，并将同一时刻到期的传感器合并成尽可能少的块读取。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+from DFRobot_18B20_RS485 import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+class SampleScheduler(object):
+  '''!
+    @brief 单个TEL0144协议转换板的精度感知采样调度器
+  '''
+  ## 各精度配置(e18B20_ACCURACY_9_BIT ~ e18B20_ACCURACY_12_BIT)对应的最大温度转换时间，单位秒
+  CONVERSION_TIME_S = [0.09375, 0.1875, 0.375, 0.75]
+
+  def __init__(self, board, slots = None, max_gap = 2, group_window_s = 0.02):
+    '''!
+      @brief SampleScheduler类参数初始化列表。
+      @param board: DFRobot_18B20_RS485对象。
+      @param slots: 需要采样的传感器位置列表，位置 = (io - 1)*4 + id，为None时使用scan()检测到已连接的传感器。
+      @param max_gap: 两个到期的传感器位置之间最多间隔多少个位置时合并为一次块读取，默认2。
+      @param group_window_s: 在该时间窗口内即将到期的传感器会和当前到期的传感器一起读取，单位秒，默认0.02s。
+    '''
+    self._board = board
+    self._slots = slots
+    self._max_gap = max_gap
+    self._window = group_window_s
+    self._period = [self.CONVERSION_TIME_S[3]]*board.DS18B20_CONFIGURATION_NUM
+    self._due = {}
+    self._frames = 0
+
+  def begin(self):
+    '''!
+      @brief 读取传感器的连接状态和精度配置，初始化每个传感器的采样周期，所有传感器立即到期。
+      @return 初始化状态:
+      @n      True:  成功
+      @n      False: 读取精度配置失败
+    '''
+    if self._slots is None:
+      state = self._board.scan()
+      self._slots = [slot for slot in range(self._board.DS18B20_CONFIGURATION_NUM) if state & (1 << slot)]
+    if self.refresh_accuracy() != True:
+      return False
+    now = _monotonic()
+    self._due = dict((slot, now) for slot in self._slots)
+    return True
+
+  def refresh_accuracy(self):
+    '''!
+      @brief 重新读取传感器的精度配置，更新采样周期，精度被修改后需调用该函数。
+      @return 读取状态:
+      @n      True:  成功
+      @n      False: 失败，采样周期保持不变
+    '''
+    accuracy = self._board.get_all_18B20_accuracy()
+    if accuracy is None:
+      return False
+    self._period = [self.CONVERSION_TIME_S[a & 0x03] for a in accuracy]
+    return True
+
+  def get_period_s(self, slot):
+    '''!
+      @brief 获取指定位置传感器的采样周期，单位秒。
+      @param slot: 传感器位置，范围0~15
+      @return 采样周期
+    '''
+    return self._period[slot]
+
+  def next_due(self):
+    '''!
+      @brief 获取最早到期的传感器的到期时间(time.monotonic时钟)，没有需要采样的传感器时返回None。
+    '''
+    if len(self._due) == 0:
+      return None
+    return min(self._due.values())
+
+  def poll(self):
+    '''!
+      @brief 读取当前所有到期的传感器，到期的传感器会被合并成尽可能少的块读取，非阻塞。
+      @return 列表，每项为(slot, raw)元组，raw为有符号原始温度值，单位1/16℃，除以16.0即为摄氏度；没有到期的传感器时返回空列表
+    '''
+    now = _monotonic()
+    due = sorted(slot for slot in self._due if self._due[slot] <= now + self._window)
+    readings = []
+    for start, count in self._plan_reads(due):
+      vals = self._board.get_temperature_raw(start, count)
+      self._frames += 1
+      for slot in due:
+        if (slot < start) or (slot >= start + count):
+          continue
+        period = self._period[slot]
+        self._due[slot] += period
+        if self._due[slot] <= now:
+          self._due[slot] = now + period
+        if vals is not None:
+          readings.append((slot, vals[slot - start]))
+    return readings
+
+  def wait_and_poll(self):
+    '''!
+      @brief 阻塞直到最早的传感器到期，然后读取所有到期的传感器。
+      @return 同poll
+    '''
+    due = self.next_due()
+    if due is None:
+      return []
+    delay = due - _monotonic()
+    if delay > 0:
+      time.sleep(delay)
+    return self.poll()
+
+  def get_frame_count(self):
+    '''!
+      @brief 获取调度器已发送的块读取数量。
+    '''
+    return self._frames
+
+  def _plan_reads(self, due):
+    reads = []
+    for slot in due:
+      if len(reads):
+        start, count = reads[-1]
+        if slot - (start + count) <= self._max_gap:
+          reads[-1] = (start, slot - start + 1)
+          continue
+      reads.append((slot, 1))
+    return reads
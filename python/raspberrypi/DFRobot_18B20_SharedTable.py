@@ -0,0 +1,180 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_SharedTable.py
+  @brief 基于共享内存的最新温度值表。
+  @details 轮询进程将每个协议板最新的数据写入固定布局的内存映射文件，其他进程直接映射同一个文件读取，读取过程只访问内存，
+  @n 没有锁也没有系统调用，适合高频率的控制循环。每条记录使用顺序锁(seqlock)保护：写入前序号加1(奇数表示正在写入)，写入后再加1，
+  @n 读取者在读取前后序号相同且为偶数时得到一致的数据，否则重试。
+  @n 文件布局: 64字节文件头(魔数"TEL0144T"、版本、记录长度、记录数量) + 248条64字节记录，第n条记录对应设备地址为n的协议板。
+  @n 记录布局(小端): 序号(uint64) + 时间戳(double) + 报警标志(uint32，同REG_18B20_D1_ALARM) + 连接状态(uint16，同REG_D1_CONNECTED_FLAG)
+  @n + 设备地址(uint8) + 3字节保留 + 16个有符号原始温度值(int16，单位1/16℃，顺序同REG_18B20_D1_NUM0_TEMP，位置 = (io - 1)*4 + id) + 6字节保留。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+import mmap
+import struct
+from collections import namedtuple
+from DFRobot_18B20_Stream import *
+
+## 共享表默认的文件路径，/dev/shm位于内存中
+SHARED_TABLE_PATH = "/dev/shm/dfrobot_18b20_table"
+
+## 协议板快照: seq(记录序号，每次更新加2), timestamp(time.time()时间戳), addr(协议板设备地址), alarm(32位报警标志),
+## connected(16位传感器连接状态), raws(16个有符号原始温度值，单位1/16℃)
+BoardSnapshot = namedtuple("BoardSnapshot", ["seq", "timestamp", "addr", "alarm", "connected", "raws"])
+
+_MAGIC   = b"TEL0144T"
+_VERSION = 1
+_HEADER  = struct.Struct("<8sHHI")
+_SEQ     = struct.Struct("<Q")
+_RECORD  = struct.Struct("<QdIHB3x16h6x")
+_BODY    = struct.Struct("<dIHB3x16h6x")
+_HEADER_SIZE  = 64
+_RECORD_COUNT = 248
+
+class SharedTableWriter(object):
+  '''!
+    @brief 共享表的写入者，一个共享表文件只能有一个写入者
+  '''
+
+  def __init__(self, path = SHARED_TABLE_PATH):
+    '''!
+      @brief SharedTableWriter类参数初始化列表，创建或打开共享表文件并映射到内存。
+      @param path: 共享表文件路径，默认SHARED_TABLE_PATH。
+    '''
+    size = _HEADER_SIZE + _RECORD.size*_RECORD_COUNT
+    self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if os.fstat(self._fd).st_size != size:
+      os.ftruncate(self._fd, size)
+    self._mm = mmap.mmap(self._fd, size)
+    _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, _RECORD.size, _RECORD_COUNT)
+
+  def close(self):
+    '''!
+      @brief 解除内存映射并关闭文件，文件保留，读取者仍可读取最后的数据。
+    '''
+    self._mm.close()
+    os.close(self._fd)
+
+  def publish(self, addr, raws, alarm, connected, timestamp = None):
+    '''!
+      @brief 更新一个协议板的记录。
+      @param addr: 协议板设备地址，范围1~247
+      @param raws: 16个有符号原始温度值，单位1/16℃，get_temperature_raw的返回值
+      @param alarm: 32位报警标志，get_temperature_threshold_alarm_flag的返回值
+      @param connected: 16位传感器连接状态，scan的返回值
+      @param timestamp: 数据的时间戳，None表示使用当前time.time()
+    '''
+    if timestamp is None:
+      timestamp = time.time()
+    offset = _HEADER_SIZE + addr*_RECORD.size
+    seq = _SEQ.unpack_from(self._mm, offset)[0]
+    if seq & 1:
+      seq += 1  #上一个写入者在写入中途退出
+    _SEQ.pack_into(self._mm, offset, seq + 1)
+    _BODY.pack_into(self._mm, offset + _SEQ.size, timestamp, alarm & 0xFFFFFFFF, connected & 0xFFFF, addr, *raws)
+    _SEQ.pack_into(self._mm, offset, seq + 2)
+
+  def publish_readings(self, readings):
+    '''!
+      @brief 用ReadingStream、FleetPoller等产生的Reading列表更新对应协议板的记录，报警标志和连接状态由读数重新组合，
+      @n     没有读数的传感器位置温度值为0且连接状态为0，alarm为None(状态未知)的读数不置报警位。
+      @param readings: Reading列表
+    '''
+    boards = {}
+    for r in readings:
+      board = boards.get(r.addr)
+      if board is None:
+        board = [r.timestamp, 0, 0, [0]*16]
+        boards[r.addr] = board
+      slot = (r.io - 1)*4 + r.id
+      board[0] = max(board[0], r.timestamp)
+      if r.alarm == DFRobot_18B20_RS485.BELOW_THE_LOWEST_TEMPERATURE_THRESHOLD:
+        board[1] |= 1 << (8*(r.io - 1) + r.id)
+      elif r.alarm == DFRobot_18B20_RS485.ABOVE_THE_HIGHEST_TEMPERATURE_THRESHOLD:
+        board[1] |= 0x11 << (8*(r.io - 1) + r.id)
+      board[2] |= 1 << slot
+      board[3][slot] = r.raw
+    for addr in boards:
+      timestamp, alarm, connected, raws = boards[addr]
+      self.publish(addr, raws, alarm, connected, timestamp)
+
+
+class SharedTableReader(object):
+  '''!
+    @brief 共享表的读取者，可以在任意多个进程中使用
+  '''
+  ## 读取时写入者正在更新记录的最大重试次数，超过后认为写入者已在写入中途退出
+  MAX_RETRY = 1000
+
+  def __init__(self, path = SHARED_TABLE_PATH):
+    '''!
+      @brief SharedTableReader类参数初始化列表，只读映射共享表文件，文件需已由SharedTableWriter创建。
+      @param path: 共享表文件路径，默认SHARED_TABLE_PATH。
+    '''
+    self._fd = os.open(path, os.O_RDONLY)
+    size = os.fstat(self._fd).st_size
+    self._mm = mmap.mmap(self._fd, size, access = mmap.ACCESS_READ)
+    magic, version, record_size, count = _HEADER.unpack_from(self._mm, 0)
+    if (magic != _MAGIC) or (version != _VERSION) or (record_size != _RECORD.size):
+      print("shared table format error.")
+      count = 0
+    self._count = count
+
+  def close(self):
+    '''!
+      @brief 解除内存映射并关闭文件。
+    '''
+    self._mm.close()
+    os.close(self._fd)
+
+  def get(self, addr):
+    '''!
+      @brief 读取一个协议板的一致快照。
+      @param addr: 协议板设备地址，范围1~247
+      @return BoardSnapshot对象，该协议板从未被写入或写入者在写入中途退出时返回None
+    '''
+    if (addr < 1) or (addr >= self._count):
+      return None
+    offset = _HEADER_SIZE + addr*_RECORD.size
+    for i in range(self.MAX_RETRY):
+      record = _RECORD.unpack_from(self._mm, offset)
+      seq = record[0]
+      if (seq & 1) or (_SEQ.unpack_from(self._mm, offset)[0] != seq):
+        continue
+      if seq == 0:
+        return None
+      return BoardSnapshot(seq, record[1], record[4], record[2], record[3], record[5:])
+    return None
+
+  def get_temperature_c(self, addr, io, id):
+    '''!
+      @brief 读取一个传感器最新的温度。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @return 温度，单位摄氏度，协议板从未被写入或传感器未连接时返回None
+    '''
+    snapshot = self.get(addr)
+    slot = (io - 1)*4 + id
+    if (snapshot is None) or not (snapshot.connected & (1 << slot)):
+      return None
+    return snapshot.raws[slot]/16.0
+
+  def get_seq(self, addr):
+    '''!
+      @brief 只读取一个协议板记录的序号，可用于低开销地判断记录是否有更新。
+      @param addr: 协议板设备地址
+      @return 序号，写入者正在更新时为奇数
+    '''
+    if (addr < 1) or (addr >= self._count):
+      return 0
+    return _SEQ.unpack_from(self._mm, _HEADER_SIZE + addr*_RECORD.size)[0]
@@ -0,0 +1,324 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Stats.py
+  @brief 18B20传感器滚动窗口统计库。
+  @details 由读数流增量维护每个传感器在多个时间窗口(默认1分钟、1小时、24小时)内的最小值、最大值、平均值、标准差和变化率，
+  @n 每个样本的更新代价与窗口长度无关，读取统计值为O(1)，不需要每个周期重新遍历历史数据。
+  @n 1. 平均值和方差用Welford算法增量更新，样本移出窗口时做反向更新；
+  @n 2. 最小值和最大值各用一个单调队列维护，队首即为窗口内的最值，每个样本最多入队出队各一次；
+  @n 3. 一个协议板的16个传感器位置共用按位置索引的紧凑数组，一次块温度读取的结果一次调用更新完成；
+  @n 4. 每个传感器的样本只在一个环形缓冲区中保存一份，所有窗口共用。缓冲区从较小的容量开始，最旧的样本仍在最长的窗口内时才成倍扩大，
+  @n    容量由实际采样间隔和最长的窗口决定，例如每10秒一个样本的24小时窗口只需要约8640个样本；
+  @n 5. 与DFRobot_18B20_History相同，时间戳以相对于基准时刻的时间差(单位time_unit_s，默认1ms，可表示约49天)存放在array('I')中，
+  @n    每个样本只占6个字节。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+import math
+from array import array
+from collections import deque, namedtuple
+from DFRobot_18B20_Stream import *
+
+## 窗口统计值: count(窗口内的样本数量), min_c/max_c/mean_c(摄氏度), stddev_c(样本标准差，摄氏度，少于2个样本时为0),
+## rate_c_per_s(窗口内最旧样本到最新样本的平均变化率，摄氏度/秒，时间跨度为0时为0)
+SensorStats = namedtuple("SensorStats", ["count", "min_c", "max_c", "mean_c", "stddev_c", "rate_c_per_s"])
+
+## 默认的统计窗口，单位秒: 1分钟、1小时、24小时
+DEFAULT_WINDOWS_S = (60, 3600, 86400)
+
+_INITIAL_CAPACITY = 64
+
+class BoardStats(object):
+  '''!
+    @brief 一个协议板16个传感器位置的滚动窗口统计
+  '''
+
+  def __init__(self, windows_s = DEFAULT_WINDOWS_S, capacity = 86400, time_unit_s = 0.001, base_time = None):
+    '''!
+      @brief BoardStats类参数初始化列表。
+      @param windows_s: 统计窗口长度的列表，单位秒，默认DEFAULT_WINDOWS_S。
+      @param capacity: 每个传感器位置最多保存的样本数量，默认86400(每秒一个样本覆盖24小时)。缓冲区在某个传感器位置收到第一个样本时
+      @n     以较小的容量分配，只在最旧的样本仍在最长的窗口内时扩大，不超过capacity。
+      @n     样本速率较高导致缓冲区在样本移出最长窗口之前就被覆盖时，被覆盖的样本提前移出所有窗口，此时长窗口只统计最近capacity个样本。
+      @param time_unit_s: 时间差的单位，单位秒，默认0.001s，32位时间差可表示的最长时间为4294967295*time_unit_s。
+      @param base_time: 时间差的基准时刻(time.time()时间戳)，早于基准时刻的时间戳按基准时刻处理，None表示第一个样本的时间戳。
+    '''
+    self._windows = list(windows_s)
+    self._capacity = capacity
+    self._unit = time_unit_s
+    self._base = base_time
+    self._window_units = [int(round(w / time_unit_s)) for w in self._windows]
+    self._longest = max(self._window_units) if len(self._window_units) else 0
+    size = 16*len(self._windows)
+    #以下数组按 窗口序号*16 + 传感器位置 索引
+    self._tail = array('d', [0])*size   #窗口内最旧样本的序号，用double保存以免32位平台上溢出
+    self._mean = array('d', [0])*size
+    self._m2 = array('d', [0])*size
+    self._mins = [deque() for i in range(size)]
+    self._maxs = [deque() for i in range(size)]
+    #以下按传感器位置索引
+    self._head = array('d', [0])*16     #下一个样本的序号
+    self._times = [None]*16
+    self._raws = [None]*16
+
+  def get_windows(self):
+    '''!
+      @brief 获取统计窗口长度的列表，单位秒。
+    '''
+    return list(self._windows)
+
+  def update(self, raws, timestamp = None, slot = 0, mask = 0xFFFF):
+    '''!
+      @brief 用一次块温度读取的结果更新统计。
+      @param raws: get_temperature_raw(slot, count)的返回值，为None(读取失败)时不更新
+      @param timestamp: time.time()时间戳，None表示当前时刻，同一传感器位置的时间戳必须不减小
+      @param slot: 块读取的起始位置，与get_temperature_raw的slot参数相同
+      @param mask: 需要更新的传感器位置掩码，第(io - 1)*4 + id位为1表示更新，一般为scan()的返回值，默认全部更新
+    '''
+    if raws is None:
+      return
+    if timestamp is None:
+      timestamp = time.time()
+    for i in range(len(raws)):
+      s = slot + i
+      if mask & (1 << s):
+        self.add(s, raws[i], timestamp)
+
+  def add(self, slot, raw, timestamp):
+    '''!
+      @brief 追加一个传感器位置的样本。
+      @param slot: 传感器位置，(io - 1)*4 + id
+      @param raw: 有符号原始温度值，单位1/16℃
+      @param timestamp: time.time()时间戳，必须不小于该位置上一个样本的时间戳
+    '''
+    if self._base is None:
+      self._base = timestamp
+    t = int(round((timestamp - self._base) / self._unit))
+    t = min(max(t, 0), 0xFFFFFFFF)
+    times = self._times[slot]
+    raws = self._raws[slot]
+    if times is None:
+      times = array('I', [0])*min(_INITIAL_CAPACITY, self._capacity)
+      raws = array('h', [0])*len(times)
+      self._times[slot] = times
+      self._raws[slot] = raws
+    cap = len(times)
+    seq = int(self._head[slot])
+    if (seq >= cap) and (cap < self._capacity):
+      #最旧的样本仍在最长的窗口内时扩大缓冲区，而不是覆盖它
+      if times[seq % cap] > t - self._longest:
+        times, raws = self._grow(slot, seq)
+        cap = len(times)
+    if seq >= cap:
+      #环形缓冲区已满，即将被覆盖的样本先移出仍包含它的窗口
+      old = seq - cap
+      for k in range(slot, len(self._tail), 16):
+        if int(self._tail[k]) <= old:
+          self._remove(k, raws[old % cap], seq)
+    p = seq % cap
+    times[p] = t
+    raws[p] = raw
+    self._head[slot] = seq + 1
+    for w in range(len(self._windows)):
+      k = w*16 + slot
+      #移出窗口外的样本
+      limit = t - self._window_units[w]
+      tail = int(self._tail[k])
+      while (tail < seq) and (times[tail % cap] <= limit):
+        self._remove(k, raws[tail % cap], seq)
+        tail += 1
+      #Welford增量更新
+      n = seq + 1 - tail
+      delta = raw - self._mean[k]
+      self._mean[k] += delta/n
+      self._m2[k] += delta*(raw - self._mean[k])
+      #单调队列，mins从队首到队尾递增，maxs递减
+      mins = self._mins[k]
+      while len(mins) and (raws[mins[-1] % cap] >= raw):
+        mins.pop()
+      mins.append(seq)
+      maxs = self._maxs[k]
+      while len(maxs) and (raws[maxs[-1] % cap] <= raw):
+        maxs.pop()
+      maxs.append(seq)
+
+  def get(self, slot, window = 0):
+    '''!
+      @brief 获取一个传感器位置在一个窗口内的统计值，统计值截止到该位置最新的样本。
+      @param slot: 传感器位置，(io - 1)*4 + id
+      @param window: 窗口在windows_s中的序号，默认0
+      @return SensorStats对象，该位置还没有样本时返回None
+    '''
+    seq = int(self._head[slot])
+    if seq == 0:
+      return None
+    k = window*16 + slot
+    times = self._times[slot]
+    raws = self._raws[slot]
+    cap = len(times)
+    tail = int(self._tail[k])
+    n = seq - tail
+    stddev = math.sqrt(max(self._m2[k], 0)/(n - 1)) if n > 1 else 0.0
+    span = (times[(seq - 1) % cap] - times[tail % cap])*self._unit
+    rate = (raws[(seq - 1) % cap] - raws[tail % cap])/16.0/span if span > 0 else 0.0
+    return SensorStats(n, raws[self._mins[k][0] % cap]/16.0, raws[self._maxs[k][0] % cap]/16.0, self._mean[k]/16.0, stddev/16.0, rate)
+
+  def get_board(self, window = 0):
+    '''!
+      @brief 获取全部16个传感器位置在一个窗口内的统计值。
+      @param window: 窗口在windows_s中的序号，默认0
+      @return 长度为16的列表，按位置(io - 1)*4 + id排列，没有样本的位置为None
+    '''
+    return [self.get(slot, window) for slot in range(16)]
+
+  def _grow(self, slot, seq):
+    #容量翻倍(不超过capacity)，样本按序号重新放置，序号不变，窗口和单调队列不受影响
+    times = self._times[slot]
+    raws = self._raws[slot]
+    cap = len(times)
+    new_cap = min(cap*2, self._capacity)
+    new_times = array('I', [0])*new_cap
+    new_raws = array('h', [0])*new_cap
+    for s in range(max(seq - cap, 0), seq):
+      new_times[s % new_cap] = times[s % cap]
+      new_raws[s % new_cap] = raws[s % cap]
+    self._times[slot] = new_times
+    self._raws[slot] = new_raws
+    return new_times, new_raws
+
+  def _remove(self, k, raw, seq):
+    #将窗口k中最旧的样本移出，seq为新样本的序号(新样本尚未计入)
+    tail = int(self._tail[k])
+    n = seq - tail - 1
+    if n <= 0:
+      self._mean[k] = 0
+      self._m2[k] = 0
+    else:
+      delta = raw - self._mean[k]
+      self._mean[k] -= delta/n
+      self._m2[k] -= delta*(raw - self._mean[k])
+    self._tail[k] = tail + 1
+    mins = self._mins[k]
+    if len(mins) and (mins[0] <= tail):
+      mins.popleft()
+    maxs = self._maxs[k]
+    if len(maxs) and (maxs[0] <= tail):
+      maxs.popleft()
+
+
+class StatsEngine(object):
+  '''!
+    @brief 多协议板的滚动窗口统计引擎，由块温度读取或Reading数据流驱动
+  '''
+
+  def __init__(self, windows_s = DEFAULT_WINDOWS_S, capacity = 86400, time_unit_s = 0.001, base_time = None):
+    '''!
+      @brief StatsEngine类参数初始化列表。
+      @param windows_s: 统计窗口长度的列表，单位秒，默认DEFAULT_WINDOWS_S。
+      @param capacity: 每个传感器最多保存的样本数量，同BoardStats。
+      @param time_unit_s: 时间差的单位，同BoardStats。
+      @param base_time: 时间差的基准时刻(time.time()时间戳)，同BoardStats，None时每个协议板以其第一个样本的时间戳为基准。
+    '''
+    self._windows = list(windows_s)
+    self._capacity = capacity
+    self._unit = time_unit_s
+    self._base = base_time
+    self._boards = {}
+
+  def get_board_stats(self, addr):
+    '''!
+      @brief 获取一个协议板的BoardStats对象，不存在时创建。
+      @param addr: 协议板设备地址
+    '''
+    stats = self._boards.get(addr)
+    if stats is None:
+      stats = BoardStats(self._windows, self._capacity, self._unit, self._base)
+      self._boards[addr] = stats
+    return stats
+
+  def add_block(self, addr, raws, slot = 0, timestamp = None, mask = 0xFFFF):
+    '''!
+      @brief 用一次块温度读取的结果更新统计，参数同BoardStats.update。
+      @param addr: 协议板设备地址
+    '''
+    self.get_board_stats(addr).update(raws, timestamp, slot, mask)
+
+  def poll(self, board, mask = 0xFFFF):
+    '''!
+      @brief 对一个协议板进行一次块温度读取并更新统计。
+      @param board: DFRobot_18B20_RS485对象
+      @param mask: 需要更新的传感器位置掩码，同BoardStats.update
+      @return 读取状态:
+      @n      True:  成功
+      @n      False: 读取失败
+    '''
+    raws = board.get_temperature_raw()
+    self.add_block(board.get_device_address(), raws, 0, None, mask)
+    return raws is not None
+
+  def add_readings(self, readings):
+    '''!
+      @brief 用Reading列表更新统计。
+      @param readings: Reading列表
+    '''
+    for r in readings:
+      self.get_board_stats(r.addr).add((r.io - 1)*4 + r.id, r.raw, r.timestamp)
+
+  def consume(self, stream):
+    '''!
+      @brief 更新统计并原样转发数据的生成器，可以串联在ReadingStream或DeadbandFilter之后。
+      @param stream: 产生Reading或Reading列表的可迭代对象
+    '''
+    for item in stream:
+      if isinstance(item, Reading):
+        self.add_readings([item])
+      else:
+        self.add_readings(item)
+      yield item
+
+  def get(self, addr, io, id, window_s = None):
+    '''!
+      @brief 获取一个传感器在一个窗口内的统计值。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @param window_s: 窗口长度，单位秒，必须是windows_s中的一个，None表示windows_s中的第一个
+      @return SensorStats对象，没有该传感器的样本或窗口不存在时返回None
+    '''
+    stats = self._boards.get(addr)
+    window = self._window_index(window_s)
+    if (stats is None) or (window is None):
+      return None
+    return stats.get((io - 1)*4 + id, window)
+
+  def get_all(self, window_s = None):
+    '''!
+      @brief 获取所有传感器在一个窗口内的统计值。
+      @param window_s: 窗口长度，单位秒，同get
+      @return 字典，键为(addr, io, id)，值为SensorStats对象
+    '''
+    window = self._window_index(window_s)
+    result = {}
+    if window is None:
+      return result
+    for addr in self._boards:
+      board = self._boards[addr].get_board(window)
+      for slot in range(16):
+        if board[slot] is not None:
+          result[(addr, (slot >> 2) + 1, slot & 0x03)] = board[slot]
+    return result
+
+  def _window_index(self, window_s):
+    if window_s is None:
+      return 0
+    if window_s not in self._windows:
+      print("window %s s is not configured." % window_s)
+      return None
+    return self._windows.index(window_s)
@@ -0,0 +1,271 @@
+# -*- coding:utf-8 -*-
+'''
+  @file DFRobot_18B20_Stream.py
+  @brief TEL0144协议转换板温度数据流库。
+  @details 以生成器的方式按固定周期产生带时间戳的温度读数，每个协议板每个周期只需一次报警标志读取和一次温度块读取。
+  @n 1. 周期按time.monotonic时钟对齐，不会随读取耗时累积漂移；
+  @n 2. 只有使用者取下一个数据时才会访问总线，使用者处理不及时时跳过错过的周期，不会积压读取；
+  @n 3. 可以按周期批量产生(每个周期一个列表)，也可以逐个读数产生(每次只缓存一个协议板的数据)；
+  @n 4. DeadbandFilter只输出温度变化超过死区、报警状态变化或超过最大静默时间的读数，减少下游的数据量。
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author      [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @url https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import time
+from array import array
+from collections import namedtuple
+from DFRobot_18B20_RS485 import *
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+## 温度读数: timestamp(time.time()时间戳), addr(协议板设备地址), rom(ROM码16进制字符串), io(eD1~eD4), id(eID0~eID3),
+## temperature_c(摄氏度), alarm(IN_THE_TEMPERATURE_THRESHOLD等温度阈值状态，本周期报警标志读取失败时为None，表示状态未知), raw(有符号原始温度值，单位1/16℃)
+Reading = namedtuple("Reading", ["timestamp", "addr", "rom", "io", "id", "temperature_c", "alarm", "raw"])
+
+class ReadingStream(object):
+  '''!
+    @brief 多协议板温度读数生成器
+  '''
+  ## 每个周期产生一个包含所有读数的列表
+  eBATCH_CYCLE   = 0
+  ## 每次产生一个读数
+  eBATCH_READING = 1
+
+  def __init__(self, boards, interval_s = 1.0, batch = eBATCH_CYCLE, rescan_interval_s = 60):
+    '''!
+      @brief ReadingStream类参数初始化列表。
+      @param boards: DFRobot_18B20_RS485对象列表，对象需已调用begin初始化成功。
+      @param interval_s: 采样周期，单位秒，默认1s。
+      @param batch: 产生数据的方式:
+      @n     eBATCH_CYCLE   or 0:  每个周期产生一个Reading列表
+      @n     eBATCH_READING or 1:  每次产生一个Reading
+      @param rescan_interval_s: 重新扫描传感器连接状态和ROM码的周期，单位秒，0表示只在开始时扫描一次。
+    '''
+    self._boards = boards
+    self._interval = interval_s
+    self._batch = batch
+    self._rescan_interval = rescan_interval_s
+    self._sensors = {}
+    self._scan_time = {}
+    self._running = False
+    self._skipped = 0
+
+  def __iter__(self):
+    if self._batch == self.eBATCH_READING:
+      return self.readings()
+    return self.cycles()
+
+  def cycles(self):
+    '''!
+      @brief 按周期产生读数的生成器，每个周期产生一个Reading列表。
+    '''
+    for board_readings in self._run(True):
+      yield board_readings
+
+  def readings(self):
+    '''!
+      @brief 逐个产生读数的生成器，每次产生一个Reading。
+    '''
+    for board_readings in self._run(False):
+      for reading in board_readings:
+        yield reading
+
+  def stop(self):
+    '''!
+      @brief 停止数据流，生成器在当前周期结束后退出。
+    '''
+    self._running = False
+
+  def get_skipped_cycles(self):
+    '''!
+      @brief 获取因使用者处理不及时而跳过的周期数。
+    '''
+    return self._skipped
+
+  def get_sensor_count(self, addr):
+    '''!
+      @brief 获取上一次扫描到的协议板已连接传感器数量。
+      @param addr: 协议板设备地址
+      @return 传感器数量，该协议板尚未扫描成功时返回None
+    '''
+    sensors = self._sensors.get(addr)
+    if sensors is None:
+      return None
+    return len(sensors)
+
+  def read_board(self, board, alarm = None):
+    '''!
+      @brief 立即读取一个协议板上所有已连接传感器的读数，一次报警标志读取加一次温度块读取。
+      @param board: DFRobot_18B20_RS485对象
+      @param alarm: 已经读取到的报警标志(read_temperature_threshold_alarm_flag的返回值)，为None时重新读取
+      @return Reading列表，首次扫描或温度读取失败时返回空列表；只有报警标志读取失败时仍返回读数，其alarm为None
+    '''
+    addr = board.get_device_address()
+    now = _monotonic()
+    if (addr not in self._sensors) or ((self._rescan_interval > 0) and (now - self._scan_time[addr] >= self._rescan_interval)):
+      self._scan(board)
+    sensors = self._sensors.get(addr)
+    if not sensors:
+      return []
+    start = sensors[0][0]
+    count = sensors[-1][0] - start + 1
+    if alarm is None:
+      alarm = board.read_temperature_threshold_alarm_flag()
+    raws = board.get_temperature_raw(start, count)
+    if raws is None:
+      return []
+    timestamp = time.time()
+    readings = []
+    for slot, rom in sensors:
+      io = (slot >> 2) + 1
+      id = slot & 0x03
+      raw = raws[slot - start]
+      state = None if alarm is None else board.parse_threshold_alarm_flag(io, id, alarm)
+      readings.append(Reading(timestamp, addr, rom, io, id, raw/16.0, state, raw))
+    return readings
+
+  def _scan(self, board):
+    addr = board.get_device_address()
+    state = board.read_18B20_connected_state()
+    roms = None if state is None else board.read_all_18B20_rom()
+    if roms is None:
+      #扫描失败时不更新扫描时间，下一次read_board立即重新扫描，已有的传感器列表继续使用
+      return
+    self._sensors[addr] = [(slot, board.get_rom_hex_string(roms[slot])) for slot in range(board.DS18B20_CONFIGURATION_NUM) if state & (1 << slot)]
+    self._scan_time[addr] = _monotonic()
+
+  def _run(self, whole_cycle):
+    self._running = True
+    start = _monotonic()
+    tick = 0
+    while self._running:
+      delay = start + tick*self._interval - _monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      if whole_cycle:
+        cycle = []
+        for board in self._boards:
+          cycle += self.read_board(board)
+        yield cycle
+      else:
+        for board in self._boards:
+          yield self.read_board(board)
+      late = int((_monotonic() - start) // self._interval) + 1
+      if late > tick + 1:
+        self._skipped += late - tick - 1
+        tick = late
+      else:
+        tick += 1
+
+
+class DeadbandFilter(object):
+  '''!
+    @brief 温度数据流的死区过滤器，每个传感器的上次输出状态保存在按传感器位置索引的紧凑数组中
+  '''
+
+  def __init__(self, deadband_c = 0.0625, heartbeat_s = 300):
+    '''!
+      @brief DeadbandFilter类参数初始化列表。
+      @param deadband_c: 默认死区，单位摄氏度，与上次输出值的差值不超过死区的读数不输出，默认0.0625℃(1个最小分辨率)，
+      @n     超出0~4095.9375℃范围时限制在范围内。
+      @param heartbeat_s: 默认最大静默时间，单位秒，距上次输出超过该时间的读数一定输出，0表示不限制。
+    '''
+    self._deadband = self._to_raw(deadband_c)
+    self._heartbeat = heartbeat_s
+    self._index = {}
+    self._last_raw = array('h')
+    self._last_alarm = array('B')
+    self._last_time = array('d')
+    self._slot_deadband = array('H')
+    self._slot_heartbeat = array('d')
+    self._passed = 0
+    self._dropped = 0
+
+  def set_deadband(self, addr, io, id, deadband_c):
+    '''!
+      @brief 设置单个传感器的死区。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @param deadband_c: 死区，单位摄氏度，超出0~4095.9375℃范围时限制在范围内
+    '''
+    self._slot_deadband[self._slot(addr, io, id)] = self._to_raw(deadband_c)
+
+  def set_heartbeat(self, addr, io, id, heartbeat_s):
+    '''!
+      @brief 设置单个传感器的最大静默时间。
+      @param addr: 协议板设备地址
+      @param io: eD1~eD4
+      @param id: eID0~eID3
+      @param heartbeat_s: 最大静默时间，单位秒，0表示不限制
+    '''
+    self._slot_heartbeat[self._slot(addr, io, id)] = heartbeat_s
+
+  def accept(self, reading):
+    '''!
+      @brief 判断一个读数是否需要输出，需要输出时同时更新该传感器的上次输出状态。
+      @param reading: Reading对象
+      @return True: 需要输出，False: 过滤掉
+    '''
+    i = self._slot(reading.addr, reading.io, reading.id)
+    heartbeat = self._slot_heartbeat[i]
+    alarm = 0xFE if reading.alarm is None else reading.alarm  #0xFE: 报警状态未知
+    if (alarm == self._last_alarm[i]) and (abs(reading.raw - self._last_raw[i]) <= self._slot_deadband[i]):
+      if (heartbeat <= 0) or (reading.timestamp - self._last_time[i] < heartbeat):
+        self._dropped += 1
+        return False
+    self._last_raw[i] = reading.raw
+    self._last_alarm[i] = alarm
+    self._last_time[i] = reading.timestamp
+    self._passed += 1
+    return True
+
+  def filter(self, stream):
+    '''!
+      @brief 过滤数据流的生成器。
+      @param stream: ReadingStream或其他产生Reading或Reading列表的可迭代对象
+      @n     输入为Reading时，只产生需要输出的Reading；输入为Reading列表时，产生过滤后的列表，全部被过滤的周期不产生数据
+    '''
+    for item in stream:
+      if isinstance(item, Reading):
+        if self.accept(item):
+          yield item
+      else:
+        batch = [reading for reading in item if self.accept(reading)]
+        if len(batch):
+          yield batch
+
+  def get_count(self):
+    '''!
+      @brief 获取过滤器的统计数据。
+      @return 长度为2的整型列表:
+      @n      列表索引0:  已输出的读数数量
+      @n      列表索引1:  已过滤掉的读数数量
+    '''
+    return [self._passed, self._dropped]
+
+  def _to_raw(self, deadband_c):
+    #死区保存在array('H')中，单位1/16℃
+    raw = int(round(deadband_c*16))
+    if (raw < 0) or (raw > 0xFFFF):
+      print("deadband out of range(0~4095.9375): %s"%deadband_c)
+      raw = min(max(raw, 0), 0xFFFF)
+    return raw
+
+  def _slot(self, addr, io, id):
+    key = (addr, io, id)
+    i = self._index.get(key)
+    if i is None:
+      i = len(self._last_raw)
+      self._index[key] = i
+      self._last_raw.append(0)
+      self._last_alarm.append(0xFF) #0xFF: 该传感器尚未输出过读数
+      self._last_time.append(0)
+      self._slot_deadband.append(self._deadband)
+      self._slot_heartbeat.append(self._heartbeat)
+    return i
@@ -14,6 +14,53 @@
 import sys
 import serial
 import time
+import heapq
+import threading
+from collections import OrderedDict
+from DFRobot_RTU_Decoder import *
+
+class _BusLock(object):
+  '''
+    @brief Reentrant fair lock of one bus. Waiters are served by priority first, then in arrival order.
+  '''
+  def __init__(self):
+    self._cond = threading.Condition(threading.Lock())
+    self._owner = None
+    self._depth = 0
+    self._waiters = []
+    self._ticket = 0
+    self.stats = [0, 0, 0.0, 0.0]  #acquisitions, contended acquisitions, total wait time, max wait time
+
+  def acquire(self, priority):
+    me = threading.current_thread()
+    with self._cond:
+      if self._owner is me:
+        self._depth += 1
+        return
+      self._ticket += 1
+      entry = (priority, self._ticket)
+      heapq.heappush(self._waiters, entry)
+      t = time.time()
+      contended = False
+      while (self._owner is not None) or (self._waiters[0] != entry):
+        contended = True
+        self._cond.wait()
+      heapq.heappop(self._waiters)
+      self._owner = me
+      self._depth = 1
+      wait = time.time() - t
+      self.stats[0] += 1
+      if contended:
+        self.stats[1] += 1
+      self.stats[2] += wait
+      self.stats[3] = max(self.stats[3], wait)
+
+  def release(self):
+    with self._cond:
+      self._depth -= 1
+      if self._depth == 0:
+        self._owner = None
+        self._cond.notify_all()
 
 class DFRobot_RTU(object):
   
@@ -38,16 +85,46 @@ class DFRobot_RTU(object):
   eCMD_WRITE_MULTI_COILS    = 0x0F
   eCMD_WRITE_MULTI_HOLDING  = 0x10
 
-  def __init__(self, baud, bits, parity, stopbit):
+  eSLAVE_CLOSED             = 0
+  eSLAVE_OPEN               = 1
+  eSLAVE_HALF_OPEN          = 2
+
+  ePRIORITY_HIGH            = 0
+  ePRIORITY_NORMAL          = 1
+  ePRIORITY_LOW             = 2
+
+  def __init__(self, baud, bits, parity, stopbit, bus = None, port = "/dev/ttyAMA0"):
     '''
       @brief Serial initialization.
       @param baud:  The UART baudrate of raspberry pi
       @param bits:  The UART data bits of raspberry pi
       @param parity:  The UART parity bits of raspberry pi
       @param stopbit:  The UART stopbit bits of raspberry pi.
+      @param bus:  Another DFRobot_RTU object whose serial port will be shared, so that many objects can address
+      @n           different slaves on one bus. None to open a new serial port.
+      @param port:  The serial port to open when bus is None, default "/dev/ttyAMA0". A serial-like object (with write, read,
+      @n            inWaiting and baudrate) is used as is, e.g. to talk to a simulated slave.
     '''
-    self._ser = serial.Serial("/dev/ttyAMA0",baud, bits, parity, stopbit)
+    if bus is None:
+      if hasattr(port, "write"):
+        self._ser = port
+      else:
+        self._ser = serial.Serial(port,baud, bits, parity, stopbit)
+      self._bus = {"breaker": None, "slaves": {}, "slave_callback": None, "lock": _BusLock(),
+                   "flights": None, "flight_lock": threading.Lock(), "flight_stats": [0, 0],
+                   "cache": None, "cache_size": 0, "cache_ttl": {}, "cache_default_ttl": 0, "cache_lock": threading.Lock(), "cache_stats": [0, 0, 0, 0],
+                   "cache_gen": 0,
+                   "capture": None, "echo": False}
+    else:
+      self._ser = bus._ser
+      self._bus = bus._bus
     self._timeout = 0.1 #0.1s
+    self._char_bits = 1 + bits + (0 if parity == 'N' else 1) + stopbit
+    self._broadcast_delay = 0.02 #0.02s
+    self._broadcast_queue = []
+    self._priority = self.ePRIORITY_NORMAL
+    self._decoder = RTUDecoder()
+    self._tx = []
   
   def set_timout_time_s(self, timeout = 0.1):
     '''
@@ -56,6 +133,255 @@ class DFRobot_RTU(object):
     '''
     self._timeout = timeout
 
+  def set_echo(self, echo = False):
+    '''
+      @brief Tell whether the RS485 adapter echoes every sent frame back to the receiver, as some half-duplex adapters do.
+      @n     The echo is then skipped before the response is decoded. It applies to all objects sharing the serial port.
+      @param echo:  True: the adapter echoes sent frames, False: it does not, default False.
+    '''
+    self._bus["echo"] = echo
+
+  def set_broadcast_delay_s(self, delay = 0.02):
+    '''
+      @brief Set the time the slaves need to process a broadcast packet, unit s. Broadcast packets are not answered, so after
+      @n     sending one the master only waits for the frame to leave the wire, the 3.5 character silent interval and this delay.
+      @param delay:  slave processing delay, unit s, default 0.02s.
+    '''
+    self._broadcast_delay = delay
+
+  def queue_broadcast_holding_registers(self, reg, data):
+    '''
+      @brief Queue a write multiple holding register broadcast packet, it will be sent by flush_broadcast.
+      @param reg: Write the start address of the holding register.
+      @param data: The list of storage holding Registers' value which will be write.
+    '''
+    size = len(data) >> 1
+    l = [(reg >> 8)&0xFF, (reg & 0xFF), ((size >> 8) & 0xFF), (size & 0xFF), size*2] + data
+    self._broadcast_queue.append(self._packed(0, self.eCMD_WRITE_MULTI_HOLDING, l))
+
+  def flush_broadcast(self):
+    '''
+      @brief Send all queued broadcast packets back to back, only waiting the minimum turnaround between them.
+      @return The number of broadcast packets sent.
+    '''
+    n = len(self._broadcast_queue)
+    self.lock_bus()
+    try:
+      for l in self._broadcast_queue:
+        self._send_package(l)
+        if self._bus["cache"] is not None:
+          self._cache_invalidate(0, (l[2] << 8) | l[3], (l[4] << 8) | l[5])
+    finally:
+      self.unlock_bus()
+    self._broadcast_queue = []
+    return n
+
+  def set_priority(self, priority = ePRIORITY_NORMAL):
+    '''
+      @brief Set the bus priority of the transactions of this object. Every transaction holds the bus lock shared by all
+      @n     objects on the same serial port; when several threads are waiting, the lock goes to the highest priority first
+      @n     and to the earliest waiter among equal priorities, so e.g. a web handler can jump ahead of a background poller.
+      @param priority: ePRIORITY_HIGH, ePRIORITY_NORMAL or ePRIORITY_LOW, default ePRIORITY_NORMAL.
+    '''
+    self._priority = priority
+
+  def lock_bus(self, priority = None):
+    '''
+      @brief Acquire the bus lock, so that several transactions run back to back without other threads in between.
+      @n     The lock is reentrant, every lock_bus must be paired with an unlock_bus.
+      @param priority: Priority used while waiting for the lock, None to use the priority set by set_priority.
+    '''
+    if priority is None:
+      priority = self._priority
+    self._bus["lock"].acquire(priority)
+
+  def unlock_bus(self):
+    '''
+      @brief Release the bus lock acquired by lock_bus.
+    '''
+    self._bus["lock"].release()
+
+  def get_lock_stats(self):
+    '''
+      @brief Get the bus lock contention statistics, shared by all objects on the same serial port.
+      @return list: format as follow:
+      @n      list[0]: Number of lock acquisitions.
+      @n      list[1]: Number of acquisitions which had to wait for another thread.
+      @n      list[2]: Total wait time, unit s.
+      @n      list[3]: Maximum wait time, unit s.
+    '''
+    return list(self._bus["lock"].stats)
+
+  def enable_circuit_breaker(self, threshold = 3, backoff_s = 1.0, max_backoff_s = 60.0):
+    '''
+      @brief Enable the circuit breaker for every slave on this bus. After threshold consecutive receive failures
+      @n     (timeout or CRC error) a slave is marked open-circuit and its calls fail immediately with eRTU_RECV_ERROR,
+      @n     without touching the bus. Once its backoff expires, the next call first re-probes it with a single
+      @n     one-register read; on success the slave is closed again, otherwise the backoff doubles up to max_backoff_s.
+      @param threshold: Number of consecutive failures which opens the circuit, default 3.
+      @param backoff_s: Initial backoff time, unit s, default 1s.
+      @param max_backoff_s: Maximum backoff time, unit s, default 60s.
+    '''
+    self._bus["breaker"] = [threshold, backoff_s, max_backoff_s]
+
+  def disable_circuit_breaker(self):
+    '''
+      @brief Disable the circuit breaker and forget the state of every slave.
+    '''
+    self._bus["breaker"] = None
+    self._bus["slaves"].clear()
+
+  def set_slave_state_callback(self, callback):
+    '''
+      @brief Set the function called when a slave changes circuit breaker state.
+      @param callback: callback(id, old_state, new_state), states are eSLAVE_CLOSED, eSLAVE_OPEN or eSLAVE_HALF_OPEN.
+      @n     None to remove the callback.
+    '''
+    self._bus["slave_callback"] = callback
+
+  def get_slave_state(self, id):
+    '''
+      @brief Get the circuit breaker state of a slave.
+      @param id:  modbus device ID. Range: 0x01 ~ 0xF7(1~247).
+      @return eSLAVE_CLOSED: the slave is healthy, eSLAVE_OPEN: calls fail immediately, eSLAVE_HALF_OPEN: being re-probed.
+    '''
+    slave = self._bus["slaves"].get(id)
+    if slave is None:
+      return self.eSLAVE_CLOSED
+    return slave[0]
+
+  def enable_single_flight(self):
+    '''
+      @brief Enable read coalescing for every object on this bus. While a read holding/input registers request is waiting
+      @n     for the bus, any other thread asking for the same or a contained register range of the same slave and function
+      @n     code waits for that request and gets its slice of the response, instead of sending another packet. Partially
+      @n     overlapping ranges are not merged, they are sent as separate requests. Once the request is sent, new callers start
+      @n     their own request, so every caller gets a response sent after it asked.
+    '''
+    with self._bus["flight_lock"]:
+      if self._bus["flights"] is None:
+        self._bus["flights"] = {}
+
+  def disable_single_flight(self):
+    '''
+      @brief Disable read coalescing, requests already in flight still deliver their response to their waiters.
+    '''
+    with self._bus["flight_lock"]:
+      self._bus["flights"] = None
+
+  def get_single_flight_stats(self):
+    '''
+      @brief Get the read coalescing statistics, shared by all objects on the same serial port.
+      @return list: format as follow:
+      @n      list[0]: Number of reads sent to the bus.
+      @n      list[1]: Number of reads served by a read already in flight.
+    '''
+    return list(self._bus["flight_stats"])
+
+  def enable_register_cache(self, max_registers = 1024, default_ttl_s = 0):
+    '''
+      @brief Enable the holding register cache for every object on this bus. Reads of holding registers which have a TTL
+      @n     (see set_cache_ttl_s) are served from the cache without bus traffic while every register of the range is cached
+      @n     and not expired. Writes to holding registers invalidate the cached registers they overlap, a broadcast write
+      @n     invalidates them for every slave.
+      @param max_registers: Maximum number of cached registers, the least recently used ones are evicted, default 1024.
+      @param default_ttl_s: Time to live of the registers without a TTL set by set_cache_ttl_s, unit s, default 0 (not cached).
+    '''
+    with self._bus["cache_lock"]:
+      if self._bus["cache"] is None:
+        self._bus["cache"] = OrderedDict()
+      self._bus["cache_size"] = max_registers
+      self._bus["cache_default_ttl"] = default_ttl_s
+
+  def disable_register_cache(self):
+    '''
+      @brief Disable the holding register cache and drop every cached register.
+    '''
+    with self._bus["cache_lock"]:
+      self._bus["cache"] = None
+
+  def set_cache_ttl_s(self, reg, size, ttl):
+    '''
+      @brief Set how long a range of holding registers stays valid in the cache, for every slave on this bus.
+      @param reg: The start address of the holding registers.
+      @param size: Number of holding registers.
+      @param ttl: Time to live, unit s. None means the registers never expire (they only change by writes from this master),
+      @n     0 means the registers are never cached.
+    '''
+    with self._bus["cache_lock"]:
+      for r in range(reg, reg + size):
+        self._bus["cache_ttl"][r] = ttl
+
+  def clear_register_cache(self, id = None):
+    '''
+      @brief Drop cached registers.
+      @param id:  modbus device ID whose registers are dropped, None to drop the registers of every slave.
+    '''
+    with self._bus["cache_lock"]:
+      cache = self._bus["cache"]
+      if cache is None:
+        return
+      self._bus["cache_gen"] += 1
+      if id is None:
+        cache.clear()
+        return
+      for key in [key for key in cache if key[0] == id]:
+        del cache[key]
+
+  def get_cache_stats(self):
+    '''
+      @brief Get the holding register cache statistics, shared by all objects on the same serial port.
+      @return list: format as follow:
+      @n      list[0]: Number of reads served from the cache.
+      @n      list[1]: Number of reads of cacheable registers which had to go to the bus.
+      @n      list[2]: Number of registers evicted because the cache was full.
+      @n      list[3]: Number of registers invalidated by writes.
+    '''
+    return list(self._bus["cache_stats"])
+
+  def enable_capture(self, capture):
+    '''
+      @brief Record every frame sent and received on this bus, for all objects sharing the serial port.
+      @param capture: A FrameCapture object (see DFRobot_RTU_Capture.py), or any object with tx(data) and rx(data, flags)
+      @n     and end(timeout) methods.
+    '''
+    self._bus["capture"] = capture
+
+  def disable_capture(self):
+    '''
+      @brief Stop recording frames.
+    '''
+    self._bus["capture"] = None
+
+  def raw_transaction(self, id, cmd, data):
+    '''
+      @brief Send a request with any function code and return the whole response frame, e.g. to forward requests from
+      @n     another master. The transaction goes through the bus lock and the circuit breaker, but not the register cache
+      @n     or read coalescing.
+      @param id:  modbus device ID. Range: 0x00 ~ 0xF7(0~247), 0x00 is broadcasr address, which all slaves will process broadcast packets, 
+      @n          but will not answer.
+      @param cmd: Function code.
+      @param data: The request bytes after the function code, without CRC.
+      @return list: format as follow:
+      @n      list[0]: Exception code, same as read_holding_registers.
+      @n      list[1:]: The response frame: id, function code, data and CRC, only present when list[0] is 0 or a slave exception code.
+    '''
+    if id > 0xF7:
+      return [self.eRTU_ID_ERROR]
+    val = None
+    if cmd in (self.eCMD_READ_COILS, self.eCMD_READ_DISCRETE, self.eCMD_READ_HOLDING, self.eCMD_READ_INPUT,
+               self.eCMD_WRITE_COILS, self.eCMD_WRITE_HOLDING, self.eCMD_WRITE_MULTI_COILS, self.eCMD_WRITE_MULTI_HOLDING):
+      if len(data) < 4:
+        return [self.eRTU_ID_ERROR]
+      qty = ((data[2] << 8) | data[3]) & 0xFFFF
+      if (cmd == self.eCMD_READ_COILS) or (cmd == self.eCMD_READ_DISCRETE):
+        val = (qty + 7) // 8
+      elif (cmd == self.eCMD_READ_HOLDING) or (cmd == self.eCMD_READ_INPUT):
+        val = qty*2
+      else:
+        val = ((data[0] << 8) | data[1]) & 0xFFFF
+    return self._transaction(id, cmd, list(data), val)
+
   def read_coils_register(self, id, reg):
     '''
       @brief Read a coils Register.
@@ -71,9 +397,7 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return 0
-    l = self._packed(id, self.eCMD_READ_COILS, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_COILS,1)
+    l = self._transaction(id, self.eCMD_READ_COILS, l, 1)
     if (l[0] == 0) and len(l) == 7:
       if (l[4] & 0x01) != 0:
           val = True
@@ -94,9 +418,7 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return 0
-    l = self._packed(id, self.eCMD_READ_DISCRETE, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_DISCRETE,1)
+    l = self._transaction(id, self.eCMD_READ_DISCRETE, l, 1)
     if (l[0] == 0) and len(l) == 7:
       if (l[4] & 0x01) != 0:
           val = True
@@ -114,10 +436,14 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return 0
-    l = self._packed(id, self.eCMD_READ_HOLDING, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_HOLDING,2)
+    if self._bus["cache"] is not None:
+      cached = self._cache_get(id, reg, 1)
+      if cached is not None:
+        return ((cached[1] << 8) | cached[2]) & 0xFFFF
+    gen = self._bus["cache_gen"]
+    l = self._transaction(id, self.eCMD_READ_HOLDING, l, 2)
     if (l[0] == 0) and len(l) == 8:
+      self._cache_put(id, reg, l[4:6], gen)
       l[0] = ((l[4] << 8) | l[5]) & 0xFFFF
     else:
       l[0] = 0
@@ -135,9 +461,7 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return 0
-    l = self._packed(id, self.eCMD_READ_INPUT, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_INPUT,2)
+    l = self._transaction(id, self.eCMD_READ_INPUT, l, 2)
     if (l[0] == 0) and len(l) == 8:
       l[0] = ((l[4] << 8) | l[5]) & 0xFFFF
     else:
@@ -171,9 +495,7 @@ class DFRobot_RTU(object):
     if(id > 0xF7):
       print("device addr error.")
       return 0
-    l = self._packed(id, self.eCMD_WRITE_COILS, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_WRITE_COILS,reg)
+    l = self._transaction(id, self.eCMD_WRITE_COILS, l, reg)
     return l[0]
       
 
@@ -200,9 +522,7 @@ class DFRobot_RTU(object):
     if(id > 0xF7):
       print("device addr error.")
       return 0
-    l = self._packed(id, self.eCMD_WRITE_HOLDING, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_WRITE_HOLDING,reg)
+    l = self._transaction(id, self.eCMD_WRITE_HOLDING, l, reg)
     return l[0]
       
   def read_coils_registers(self, id, reg, reg_num):
@@ -233,9 +553,7 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return [self.eRTU_ID_ERROR]
-    l = self._packed(id, self.eCMD_READ_COILS, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_COILS,length)
+    l = self._transaction(id, self.eCMD_READ_COILS, l, length)
     if ((l[0] == 0) and (len(l) == (5+length+1))):
       la = [l[0]] + l[4: len(l)-2]
       return la
@@ -269,9 +587,7 @@ class DFRobot_RTU(object):
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return [self.eRTU_ID_ERROR]
-    l = self._packed(id, self.eCMD_READ_DISCRETE, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_DISCRETE,length)
+    l = self._transaction(id, self.eCMD_READ_DISCRETE, l, length)
     if ((l[0] == 0) and (len(l) == (5+length+1))):
       la = [l[0]] + l[4: len(l)-2]
       return la
@@ -297,19 +613,16 @@ class DFRobot_RTU(object):
       @n               11 or eRTU_ID_ERROR: Broadcasr address or error ID
       @n      list[1:]: The value list of the holding register.
     '''
-    l = [(reg >> 8)&0xFF, (reg & 0xFF), (size >> 8) & 0xFF, size & 0xFF]
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return [self.eRTU_ID_ERROR]
-    l = self._packed(id, self.eCMD_READ_HOLDING, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_HOLDING,size*2)
-    #lin = ['%02X' % i for i in l]
-    #print(" ".join(lin))
-    if (l[0] == 0) and (len(l) == (5+size*2+1)):
-      la = [l[0]] + l[4: len(l)-2]
-      return la
-    return [l[0]]
+    if self._bus["cache"] is not None:
+      cached = self._cache_get(id, reg, size)
+      if cached is not None:
+        return cached
+    if self._bus["flights"] is not None:
+      return self._single_flight_read(id, self.eCMD_READ_HOLDING, reg, size)
+    return self._read_registers(id, self.eCMD_READ_HOLDING, reg, size)
 
   def read_input_registers(self, id, reg, size):
     '''
@@ -331,19 +644,12 @@ class DFRobot_RTU(object):
       @n               11 or eRTU_ID_ERROR: Broadcasr address or error ID
       @n      list[1:]: The value list of the input register.
     '''
-    l = [(reg >> 8)&0xFF, (reg & 0xFF), (size >> 8) & 0xFF, size & 0xFF]
     if (id < 1) or (id > 0xF7):
       print("device addr error.(1~247) %d"%id)
       return [self.eRTU_ID_ERROR]
-    l = self._packed(id, self.eCMD_READ_INPUT, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_READ_INPUT,size*2)
-    #lin = ['%02X' % i for i in l]
-    #print(" ".join(lin))
-    if (l[0] == 0) and (len(l) == (5+size*2+1)):
-      la = [l[0]] + l[4: len(l)-2]
-      return la
-    return [l[0]]
+    if self._bus["flights"] is not None:
+      return self._single_flight_read(id, self.eCMD_READ_INPUT, reg, size)
+    return self._read_registers(id, self.eCMD_READ_INPUT, reg, size)
     
   def write_coils_registers(self, id, reg, reg_num, data):
     '''
@@ -374,9 +680,7 @@ class DFRobot_RTU(object):
     if(id > 0xF7):
       print("device addr error.")
       return 0
-    l = self._packed(id, self.eCMD_WRITE_MULTI_COILS, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_WRITE_MULTI_COILS,reg)
+    l = self._transaction(id, self.eCMD_WRITE_MULTI_COILS, l, reg)
     if (l[0] == 0) and len(l) == 9:
       val = ((l[5] << 8) | l[6]) & 0xFFFF
     return l[0]
@@ -404,13 +708,195 @@ class DFRobot_RTU(object):
     if(id > 0xF7):
       print("device addr error.")
       return 0
-    l = self._packed(id, self.eCMD_WRITE_MULTI_HOLDING, l)
-    self._send_package(l)
-    l = self.recv_and_parse_package(id, self.eCMD_WRITE_MULTI_HOLDING,reg)
+    l = self._transaction(id, self.eCMD_WRITE_MULTI_HOLDING, l, reg)
     if (l[0] == 0) and len(l) == 9:
       val = ((l[5] << 8) | l[6]) & 0xFFFF
     return l[0]
       
+  def _read_registers(self, id, cmd, reg, size, sending = None):
+    l = [(reg >> 8)&0xFF, (reg & 0xFF), (size >> 8) & 0xFF, size & 0xFF]
+    gen = self._bus["cache_gen"]
+    l = self._transaction(id, cmd, l, size*2, sending)
+    #lin = ['%02X' % i for i in l]
+    #print(" ".join(lin))
+    if (l[0] == 0) and (len(l) == (5+size*2+1)):
+      la = [l[0]] + l[4: len(l)-2]
+      if cmd == self.eCMD_READ_HOLDING:
+        self._cache_put(id, reg, la[1:], gen)
+      return la
+    return [l[0]]
+
+  def _cache_get(self, id, reg, size):
+    with self._bus["cache_lock"]:
+      cache = self._bus["cache"]
+      if cache is None:
+        return None
+      ttl = self._bus["cache_ttl"]
+      default = self._bus["cache_default_ttl"]
+      now = time.time()
+      l = [0]
+      for r in range(reg, reg + size):
+        if ttl.get(r, default) == 0:
+          return None
+        entry = cache.get((id, r))
+        if (entry is None) or (entry[0] < now):
+          self._bus["cache_stats"][1] += 1
+          return None
+        l += entry[1:]
+      for r in range(reg, reg + size):
+        cache[(id, r)] = cache.pop((id, r))
+      self._bus["cache_stats"][0] += 1
+      return l
+
+  def _cache_put(self, id, reg, data, gen):
+    #gen: cache_gen read before the transaction; a write invalidated the cache since, so the data may be older than it
+    with self._bus["cache_lock"]:
+      cache = self._bus["cache"]
+      if (cache is None) or (gen != self._bus["cache_gen"]):
+        return
+      ttl = self._bus["cache_ttl"]
+      default = self._bus["cache_default_ttl"]
+      now = time.time()
+      for i in range(len(data) >> 1):
+        t = ttl.get(reg + i, default)
+        if t == 0:
+          continue
+        expire = float("inf") if t is None else now + t
+        r = reg + i
+        cache.pop((id, r), None)
+        cache[(id, r)] = (expire, data[2*i], data[2*i + 1])
+      while len(cache) > self._bus["cache_size"]:
+        cache.popitem(last = False)
+        self._bus["cache_stats"][2] += 1
+
+  def _cache_invalidate(self, id, reg, size):
+    with self._bus["cache_lock"]:
+      cache = self._bus["cache"]
+      if cache is None:
+        return
+      self._bus["cache_gen"] += 1
+      if id == 0:
+        keys = [key for key in cache if reg <= key[1] < reg + size]
+      else:
+        keys = [(id, r) for r in range(reg, reg + size) if (id, r) in cache]
+      for key in keys:
+        del cache[key]
+      self._bus["cache_stats"][3] += len(keys)
+
+  def _single_flight_read(self, id, cmd, reg, size):
+    key = (id, cmd)
+    with self._bus["flight_lock"]:
+      flights = self._bus["flights"]
+      flight = None
+      if flights is not None:
+        for f in flights.get(key, []):
+          if (f[0] <= reg) and (reg + size <= f[0] + f[1]):
+            flight = f
+            break
+      if flight is not None:
+        self._bus["flight_stats"][1] += 1
+      else:
+        self._bus["flight_stats"][0] += 1
+        leader = [reg, size, threading.Event(), None]  #start register, number, done event, response
+        if flights is not None:
+          flights.setdefault(key, []).append(leader)
+    if flight is not None:
+      flight[2].wait()
+      l = flight[3]
+      if l[0] != 0:
+        return [l[0]]
+      offset = 1 + (reg - flight[0])*2
+      return [0] + l[offset: offset + size*2]
+    #close the flight to new followers once the request is on the wire: a later caller may need a write which lands after it
+    def close():
+      with self._bus["flight_lock"]:
+        if (flights is not None) and (leader in flights.get(key, [])):
+          flights[key].remove(leader)
+          if len(flights[key]) == 0:
+            del flights[key]
+    l = [self.eRTU_RECV_ERROR]
+    try:
+      l = self._read_registers(id, cmd, reg, size, close)
+    finally:
+      leader[3] = l
+      close()
+      leader[2].set()
+    return l
+
+  def _transaction(self, id, cmd, l, val, sending = None):
+    write = None
+    if (cmd == self.eCMD_WRITE_HOLDING) or (cmd == self.eCMD_WRITE_MULTI_HOLDING):
+      write = ((l[0] << 8) | l[1], 1 if cmd == self.eCMD_WRITE_HOLDING else ((l[2] << 8) | l[3]))
+    l = self._packed(id, cmd, l)
+    self.lock_bus()
+    try:
+      if (id != 0) and (self._bus["breaker"] is not None) and (self._breaker_allow(id) != True):
+        return [self.eRTU_RECV_ERROR]
+      if sending is not None:
+        sending()
+      self._send_package(l)
+      l = self._recv(id, cmd, val)
+      #invalidate once the slave has applied the write, still holding the bus: the slave may have applied it even without
+      #a valid response, and a read which completed before can no longer fill the cache (see cache_gen)
+      if (write is not None) and (self._bus["cache"] is not None):
+        self._cache_invalidate(id, write[0], write[1])
+      if (id != 0) and (self._bus["breaker"] is not None):
+        self._breaker_record(id, l[0] != self.eRTU_RECV_ERROR)
+    finally:
+      self.unlock_bus()
+    return l
+
+  def _recv(self, id, cmd, val):
+    l = self.recv_and_parse_package(id, cmd, val)
+    if self._bus["capture"] is not None:
+      self._bus["capture"].end(l[0] == self.eRTU_RECV_ERROR)
+    return l
+
+  def _read(self, n):
+    data = self._ser.read(n)
+    if self._bus["capture"] is not None:
+      self._bus["capture"].rx(data)
+    return data
+
+  def _breaker_allow(self, id):
+    slave = self._bus["slaves"].get(id)
+    if (slave is None) or (slave[0] == self.eSLAVE_CLOSED):
+      return True
+    if time.time() < slave[3]:
+      return False
+    self._set_slave_state(id, slave, self.eSLAVE_HALF_OPEN)
+    self._send_package(self._packed(id, self.eCMD_READ_HOLDING, [0x00, 0x00, 0x00, 0x01]))
+    l = self._recv(id, self.eCMD_READ_HOLDING, 2)
+    self._breaker_record(id, l[0] != self.eRTU_RECV_ERROR)
+    return slave[0] == self.eSLAVE_CLOSED
+
+  def _breaker_record(self, id, ok):
+    threshold, backoff_s, max_backoff_s = self._bus["breaker"]
+    slave = self._bus["slaves"].get(id)
+    if slave is None:
+      if ok:
+        return
+      slave = [self.eSLAVE_CLOSED, 0, backoff_s, 0]  #state, consecutive failures, backoff, retry time
+      self._bus["slaves"][id] = slave
+    if ok:
+      slave[1] = 0
+      slave[2] = backoff_s
+      self._set_slave_state(id, slave, self.eSLAVE_CLOSED)
+      return
+    slave[1] += 1
+    if slave[0] == self.eSLAVE_HALF_OPEN:
+      slave[2] = min(slave[2]*2, max_backoff_s)
+    elif slave[1] < threshold:
+      return
+    slave[3] = time.time() + slave[2]
+    self._set_slave_state(id, slave, self.eSLAVE_OPEN)
+
+  def _set_slave_state(self, id, slave, state):
+    old = slave[0]
+    slave[0] = state
+    if (old != state) and (self._bus["slave_callback"] is not None):
+      self._bus["slave_callback"](id, old, state)
+
   def _calculate_crc(self, data):
     crc = 0xFFFF
     length = len(data)
@@ -435,7 +921,9 @@ class DFRobot_RTU(object):
   def _clear_recv_buffer(self):
     remain = self._ser.inWaiting()
     while remain:
-      self._ser.read(remain)
+      data = self._ser.read(remain)
+      if self._bus["capture"] is not None:
+        self._bus["capture"].rx(data, True)
       remain = self._ser.inWaiting()
 
   def _packed(self, id, cmd, l):
@@ -459,8 +947,20 @@ class DFRobot_RTU(object):
   def _send_package(self, l):
     self._clear_recv_buffer()
     if len(l):
+      if self._bus["capture"] is not None:
+        self._bus["capture"].tx(l)
+      self._tx = l
       self._ser.write(l)
-      time.sleep(self._timeout)
+      #no wait after a unicast frame: recv_and_parse_package waits up to _timeout and returns as soon as the response is complete
+      if l[0] == 0:
+        time.sleep(self._broadcast_turnaround_s(len(l)))
+
+  def _broadcast_turnaround_s(self, length):
+    char_time = float(self._char_bits) / self._ser.baudrate
+    silent = 3.5 * char_time
+    if self._ser.baudrate > 19200:
+      silent = 0.00175
+    return length * char_time + silent + self._broadcast_delay
 
   def recv_and_parse_package(self, id, cmd, val):
     package = [self.eRTU_ID_ERROR]
@@ -468,74 +968,30 @@ class DFRobot_RTU(object):
       return [0]
     if (id < 1) or (id > 0xF7):
       return package
-    head = [0]*4
-    index = 0
+    echo = self._tx if self._bus["echo"] else None
+    self._decoder.expect(id, cmd, val, echo)
     t = time.time()
-    remain = 0
-    while remain < 4:
-      if self._ser.inWaiting():
-        data = self._ser.read(1)
-        try: 
-          head[index] = ord(data)
-        except:
-          head[index] = data
-        #print("%d = %02X"%(index, head[index]))
-        index += 1
-        if (index == 1) and (head[0] != id):
-          index = 0
-        elif (index == 2) and ((head[1] & 0x7F) != cmd):
-          index = 0
-        remain = index
-        t = time.time()
-      if time.time() - t > self._timeout:
+    while True:
+      remain = self._ser.inWaiting()
+      timeout = False
+      if remain:
+        data = self._read(remain)
+      elif time.time() - t > self._timeout:
         #print("time out.")
-        return [self.eRTU_RECV_ERROR]
-      if(index == 4):
-        if head[1] & 0x80:
-          index = 5
-        else:
-          if head[1] < 4:
-            if head[2] != (val & 0xFF):
-              index = 0
-              remain = 0
-            else:
-              index = 5 + head[2]
-          else:
-            if (((head[2] << 8) | head[3]) & 0xFFFF) != val:
-              index = 0
-              remain = 0
-            else:
-              index = 8
-        if index > 0:
-          package = [0]*(index + 1)
-          package[1:5] = head
-          remain = index - 4
-          index = 5
-          t = time.time()
-          while remain > 0:
-            if self._ser.inWaiting():
-              data = self._ser.read(1)
-              try: 
-                package[index] = ord(data)
-              except:
-                package[index] = data
-              index += 1
-              remain -= 1
-              t = time.time()
-            if(time.time() - t >self._timeout):
-              print("time out1.")
-              return [self.eRTU_RECV_ERROR]
-          crc = ((package[len(package) - 2] << 8) | package[len(package) - 1]) & 0xFFFF
-          if crc != self._calculate_crc(package[1:len(package) - 2]):
-            print("CRC ERROR")
-            return [self.eRTU_RECV_ERROR]
+        data = b""
+        timeout = True
+      else:
+        continue
+      for event, frame in self._decoder.feed(data, timeout):
+        if event == RTUDecoder.eEVENT_FRAME:
+          package = [0] + list(bytearray(frame))
           if package[2] & 0x80:
             package[0] = package[3]
-          else:
-            package[0] = 0
           #lin = ['%02X' % i for i in package]
           #print(" ".join(lin))
           return package
-
-
-
+        if event == RTUDecoder.eEVENT_CRC_ERROR:
+          print("CRC ERROR")
+      if timeout:
+        return [self.eRTU_RECV_ERROR]
+      t = time.time()
@@ -0,0 +1,293 @@
+# -*- coding:utf-8 -*-
+
+'''
+  @file DFRobot_RTU_Capture.py
+  @brief Raw Modbus RTU frame capture for DFRobot_RTU.
+  @n FrameCapture records every frame sent and received on a bus with a monotonic nanosecond timestamp into a file of
+  @n fixed size records, written through a memory-mapped ring: recording a frame is two struct packs into memory, and once
+  @n the ring is full the oldest records are overwritten, so a capture can run for days in bounded disk space.
+  @n CaptureReader iterates a capture lazily, as frames or decoded into request/response transactions.
+  @n File layout (little endian): 64 bytes header (magic "RTUCAP01", record size, capacity, number of records written)
+  @n followed by capacity records of: timestamp ns (uint64), frame length (uint16), direction (uint8), flags (uint8),
+  @n 256 bytes of frame data.
+
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @https://github.com/DFRobot/DFRobot_RTU
+'''
+import sys
+import os
+import time
+import mmap
+import struct
+from collections import namedtuple
+from DFRobot_RTU import *
+
+if hasattr(time, "monotonic_ns"):
+  _monotonic_ns = time.monotonic_ns
+else:
+  _monotonic = getattr(time, "monotonic", time.time)
+  _monotonic_ns = lambda: int(_monotonic()*1000000000)
+
+## Frame: index(record number since the capture was created), timestamp_ns(monotonic ns, when the first byte was read for
+## received frames), direction(eDIR_TX or eDIR_RX), flags(eFLAG_*), data(frame bytes)
+Frame = namedtuple("Frame", ["index", "timestamp_ns", "direction", "flags", "data"])
+
+## Transaction: timestamp_ns(of the request), id, cmd, request(Frame), response(Frame or None), latency_ns(from sending the
+## request to reading the first response byte, None without response), status(0: success, or DFRobot_RTU exception code:
+## 1~4 slave exception, eRTU_EXCEPTION_CRC_ERROR, eRTU_RECV_ERROR no response)
+Transaction = namedtuple("Transaction", ["timestamp_ns", "id", "cmd", "request", "response", "latency_ns", "status"])
+
+_MAGIC  = b"RTUCAP01"
+_HEADER = struct.Struct("<8sIIQ")
+_RECORD = struct.Struct("<QHBB256s")
+_COUNT  = struct.Struct("<Q")
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 16
+
+class FrameCapture(object):
+  '''Enum constant'''
+  eDIR_TX = 0
+  eDIR_RX = 1
+
+  eFLAG_DISCARDED = 0x01   #bytes found in the receive buffer before a request and thrown away
+  eFLAG_TIMEOUT   = 0x02   #the transaction ended with a receive timeout, an empty record if nothing was received
+
+  def __init__(self, path, capacity = 65536):
+    '''
+      @brief Create a new capture file, an existing file is overwritten.
+      @param path:  The capture file path.
+      @param capacity:  Number of records of the ring, default 65536 (about 17MB).
+    '''
+    self._capacity = capacity
+    size = _HEADER_SIZE + _RECORD.size*capacity
+    self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.ftruncate(self._fd, size)
+    self._mm = mmap.mmap(self._fd, size)
+    _HEADER.pack_into(self._mm, 0, _MAGIC, _RECORD.size, capacity, 0)
+    self._count = 0
+    self._rx = bytearray()
+    self._rx_time = 0
+
+  def close(self):
+    '''
+      @brief Flush the received bytes not yet recorded and close the capture file.
+    '''
+    self._flush_rx(0)
+    self._mm.flush()
+    self._mm.close()
+    os.close(self._fd)
+
+  def get_count(self):
+    '''
+      @brief Get the number of records written, including the ones already overwritten in the ring.
+    '''
+    return self._count
+
+  def tx(self, data):
+    '''
+      @brief Record a frame about to be sent.
+      @param data:  The frame bytes.
+    '''
+    self._flush_rx(0)
+    self._write(_monotonic_ns(), self.eDIR_TX, 0, bytearray(data))
+
+  def rx(self, data, discarded = False):
+    '''
+      @brief Record received bytes, they are collected into one frame until end or the next tx.
+      @param data:  The received bytes.
+      @param discarded:  True for stale bytes thrown away before a request, they are recorded at once with eFLAG_DISCARDED.
+    '''
+    if discarded:
+      self._flush_rx(0)
+      self._write(_monotonic_ns(), self.eDIR_RX, self.eFLAG_DISCARDED, bytearray(data))
+      return
+    if len(self._rx) == 0:
+      self._rx_time = _monotonic_ns()
+    self._rx += bytearray(data)
+
+  def end(self, timeout = False):
+    '''
+      @brief Record the end of a transaction.
+      @param timeout:  True if the transaction ended with a receive timeout.
+    '''
+    flags = self.eFLAG_TIMEOUT if timeout else 0
+    if timeout and (len(self._rx) == 0):
+      self._write(_monotonic_ns(), self.eDIR_RX, flags, bytearray())
+      return
+    self._flush_rx(flags)
+
+  def _flush_rx(self, flags):
+    if len(self._rx):
+      self._write(self._rx_time, self.eDIR_RX, flags, self._rx)
+      self._rx = bytearray()
+
+  def _write(self, timestamp, direction, flags, data):
+    offset = _HEADER_SIZE + (self._count % self._capacity)*_RECORD.size
+    _RECORD.pack_into(self._mm, offset, timestamp, min(len(data), 256), direction, flags, bytes(data[:256]))
+    self._count += 1
+    _COUNT.pack_into(self._mm, _COUNT_OFFSET, self._count)
+
+
+class CaptureReader(object):
+  def __init__(self, path):
+    '''
+      @brief Open a capture file for reading, it may still be written by a FrameCapture.
+      @param path:  The capture file path.
+    '''
+    self._fd = os.open(path, os.O_RDONLY)
+    self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size, access = mmap.ACCESS_READ)
+    magic, record_size, self._capacity, count = _HEADER.unpack_from(self._mm, 0)
+    if (magic != _MAGIC) or (record_size != _RECORD.size):
+      print("capture file format error.")
+      self._capacity = 0
+
+  def close(self):
+    '''
+      @brief Close the capture file.
+    '''
+    self._mm.close()
+    os.close(self._fd)
+
+  def get_range(self):
+    '''
+      @brief Get the record numbers still in the ring.
+      @return (first, end) tuple, records first ~ end - 1 can be read.
+    '''
+    if self._capacity == 0:
+      return (0, 0)
+    count = _COUNT.unpack_from(self._mm, _COUNT_OFFSET)[0]
+    return (max(0, count - self._capacity), count)
+
+  def frames(self, start = None):
+    '''
+      @brief Generator of the recorded frames, oldest first. Records are decoded only when they are reached.
+      @param start:  The first record number, None for the oldest record still in the ring.
+    '''
+    first, end = self.get_range()
+    if (start is None) or (start < first):
+      start = first
+    for index in range(start, end):
+      timestamp, length, direction, flags, data = _RECORD.unpack_from(self._mm, _HEADER_SIZE + (index % self._capacity)*_RECORD.size)
+      yield Frame(index, timestamp, direction, flags, data[:length])
+
+  def transactions(self, start = None):
+    '''
+      @brief Generator of the recorded transactions, each request frame paired with the response frame which follows it.
+      @n     Requests to the broadcast address have no response and status 0.
+      @param start:  The first record number, None for the oldest record still in the ring.
+    '''
+    request = None
+    for frame in self.frames(start):
+      if frame.direction == FrameCapture.eDIR_TX:
+        if request is not None:
+          yield self._decode(request, None)
+        request = frame
+      elif frame.flags & FrameCapture.eFLAG_DISCARDED:
+        continue
+      elif request is not None:
+        yield self._decode(request, frame)
+        request = None
+    if request is not None:
+      yield self._decode(request, None)
+
+  def _decode(self, request, response):
+    data = bytearray(request.data)
+    id = data[0] if len(data) else 0
+    cmd = data[1] if len(data) > 1 else 0
+    if response is None:
+      status = 0 if id == 0 else DFRobot_RTU.eRTU_RECV_ERROR
+      return Transaction(request.timestamp_ns, id, cmd, request, None, None, status)
+    latency = response.timestamp_ns - request.timestamp_ns
+    if len(response.data) == 0:
+      latency = None
+    status = DFRobot_RTU.eRTU_RECV_ERROR
+    #the echo of a write single coil/register request looks exactly like its response, it is only skipped for the others
+    decoder = RTUDecoder()
+    decoder.expect_request(data, (cmd != DFRobot_RTU.eCMD_WRITE_COILS) and (cmd != DFRobot_RTU.eCMD_WRITE_HOLDING))
+    for event, frame in decoder.feed(response.data, True):
+      if event == RTUDecoder.eEVENT_FRAME:
+        frame = bytearray(frame)
+        status = frame[2] if frame[1] & 0x80 else 0
+        break
+      if event == RTUDecoder.eEVENT_CRC_ERROR:
+        status = DFRobot_RTU.eRTU_EXCEPTION_CRC_ERROR
+        break
+    return Transaction(request.timestamp_ns, id, cmd, request, response, latency, status)
+
+
+class ReplaySerial(object):
+  '''
+    @brief Serial-like object which answers the requests of DFRobot_RTU with the responses recorded in a capture, pass it
+    @n     as the port of DFRobot_RTU. Each request is matched by its exact bytes against the recorded requests and gets
+    @n     the recorded responses to that request in order, starting again from the first one once they are used up.
+    @n     Timeouts, CRC errors and stale bytes are replayed as they were recorded.
+  '''
+  def __init__(self, path, realtime = True, baudrate = 9600):
+    '''
+      @brief Replay initialization, the whole capture is indexed once.
+      @param path:  The capture file path.
+      @param realtime:  True: a response becomes readable after its recorded latency, False: responses are readable at once,
+      @n                together with a short receive timeout (set_timout_time_s(0.001)) the capture replays as fast as possible.
+      @param baudrate:  The baudrate reported to DFRobot_RTU, default 9600.
+    '''
+    self.baudrate = baudrate
+    self._realtime = realtime
+    self._responses = {}
+    self._next = {}
+    self._rx = bytearray()
+    self._rx_time = 0
+    self._stats = [0, 0]
+    reader = CaptureReader(path)
+    last = None
+    request = None
+    for frame in reader.frames():
+      if frame.direction == FrameCapture.eDIR_TX:
+        request = bytes(frame.data)
+        last = [0, b"", b""]  #latency ns, response, stale bytes which followed it
+        self._responses.setdefault(request, []).append(last)
+        tx_time = frame.timestamp_ns
+      elif frame.flags & FrameCapture.eFLAG_DISCARDED:
+        if last is not None:
+          last[2] += bytes(frame.data)
+      elif (last is not None) and (len(last[1]) == 0):
+        last[0] = frame.timestamp_ns - tx_time
+        last[1] = bytes(frame.data)
+    reader.close()
+
+  def get_stats(self):
+    '''
+      @brief Get the replay statistics.
+      @return list: format as follow:
+      @n      list[0]: Number of requests answered from the capture.
+      @n      list[1]: Number of requests not found in the capture, they get no response.
+    '''
+    return list(self._stats)
+
+  def inWaiting(self):
+    if self._realtime and (len(self._rx) != 0) and (_monotonic_ns() < self._rx_time):
+      return 0
+    return len(self._rx)
+
+  def read(self, n = 1):
+    n = min(n, self.inWaiting())
+    data = bytes(self._rx[:n])
+    del self._rx[:n]
+    return data
+
+  def write(self, data):
+    request = bytes(bytearray(data))
+    responses = self._responses.get(request)
+    if responses is None:
+      self._stats[1] += 1
+      return len(data)
+    self._stats[0] += 1
+    i = self._next.get(request, 0)
+    self._next[request] = (i + 1) % len(responses)
+    latency, response, stale = responses[i]
+    self._rx = bytearray(response + stale)
+    self._rx_time = _monotonic_ns() + latency
+    return len(data)
@@ -0,0 +1,235 @@
+# -*- coding:utf-8 -*-
+
+'''
+  @file DFRobot_RTU_Decoder.py
+  @brief Incremental Modbus RTU frame decoder.
+  @n RTUDecoder accepts received bytes in chunks of any size and finds the frame boundaries from the function code rules,
+  @n the expected slave, function code and length, and the CRC. Bytes which cannot start a frame are skipped one by one
+  @n and reported as noise, so the decoder resynchronizes in a single pass over the buffer without losing a frame which
+  @n follows line noise. The echo of the request produced by some half-duplex adapters can be recognized and skipped.
+  @n It backs both DFRobot_RTU.recv_and_parse_package and the capture analysis of DFRobot_RTU_Capture.
+
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @https://github.com/DFRobot/DFRobot_RTU
+'''
+import sys
+
+def modbus_crc16(data):
+  '''
+    @brief Calculate the Modbus CRC16 of a frame.
+    @param data: The frame bytes without CRC, list, bytes or bytearray.
+    @return The CRC, its low byte is sent first on the wire.
+  '''
+  crc = 0xFFFF
+  for b in bytearray(data):
+    crc ^= b
+    for i in range(8):
+      if crc & 0x0001:
+        crc = (crc >> 1) ^ 0xA001
+      else:
+        crc >>= 1
+  return crc
+
+class RTUDecoder(object):
+  '''Enum constant'''
+  eEVENT_FRAME     = 0   #a response frame with a valid CRC
+  eEVENT_ECHO      = 1   #the echo of the request
+  eEVENT_NOISE     = 2   #bytes which do not belong to any frame
+  eEVENT_CRC_ERROR = 3   #a frame matching the expected response whose CRC is wrong
+
+  _READ_CMDS  = (0x01, 0x02, 0x03, 0x04)
+  _WRITE_CMDS = (0x05, 0x06, 0x0F, 0x10)
+  #other public function codes: fixed response length, or byte count at offset 2
+  _FIXED_CMDS = {0x07: 5, 0x08: 8, 0x0B: 8, 0x16: 10}
+  _COUNT_CMDS = (0x0C, 0x11, 0x14, 0x15, 0x17)
+  _SCAN = -2  #response length unknown: the frame ends where the CRC matches
+
+  def __init__(self):
+    '''
+      @brief Decoder initialization, without expectation any response frame of any slave is accepted.
+    '''
+    self._buf = bytearray()
+    self._stats = [0, 0, 0, 0]
+    self.expect()
+
+  def expect(self, id = None, cmd = None, val = None, echo = None):
+    '''
+      @brief Set the response expected next and drop the buffered bytes.
+      @param id:  The expected slave ID, None for any.
+      @param cmd:  The expected function code, None for any. Exception responses to it are accepted too. The response to a
+      @n           function code without a known length rule is delimited by the first position where the CRC matches.
+      @param val:  For read function codes (0x01~0x04) the expected byte count, for write function codes the expected register
+      @n           address, None for any.
+      @param echo:  The request bytes, if the adapter echoes them back before the response; None if it does not.
+    '''
+    self._id = id
+    self._cmd = cmd
+    self._val = val
+    self._echo = None if echo is None else bytearray(echo)
+    self._buf = bytearray()
+    self._crc_error = None
+
+  def expect_request(self, request, echo = False):
+    '''
+      @brief Set the response expected next from the request frame.
+      @param request:  The request frame bytes, with CRC.
+      @param echo:  True if the adapter echoes the request back before the response.
+    '''
+    request = bytearray(request)
+    if len(request) < 6:
+      self.expect()
+      return
+    id = request[0]
+    cmd = request[1]
+    val = None
+    if cmd in self._READ_CMDS:
+      qty = (request[4] << 8) | request[5]
+      val = ((qty + 7) // 8) if cmd <= 0x02 else qty*2
+    elif cmd in self._WRITE_CMDS:
+      val = (request[2] << 8) | request[3]
+    self.expect(id, cmd, val, request if echo else None)
+
+  def get_stats(self):
+    '''
+      @brief Get the decoder statistics, since the object was created.
+      @return list: format as follow:
+      @n      list[0]: Number of frames.
+      @n      list[1]: Number of echoes skipped.
+      @n      list[2]: Number of noise bytes skipped.
+      @n      list[3]: Number of CRC errors.
+    '''
+    return list(self._stats)
+
+  def feed(self, data, final = False):
+    '''
+      @brief Decode received bytes.
+      @n     A candidate matching the expected slave, function code and length but with a wrong CRC may be line noise
+      @n     followed by the real response, so decoding goes on one byte further; eEVENT_CRC_ERROR is only reported with
+      @n     final, if no valid frame was found since expect.
+      @param data:  The received bytes, bytes, bytearray or list.
+      @param final:  True if no more bytes will follow, e.g. the end of a captured frame or a receive timeout: an incomplete
+      @n             frame is then reported as noise instead of waiting for more bytes.
+      @return list of (event, bytes) tuples, event is eEVENT_FRAME, eEVENT_ECHO, eEVENT_NOISE or eEVENT_CRC_ERROR.
+    '''
+    buf = self._buf
+    buf += bytearray(data)
+    events = []
+    noise = bytearray()
+    pos = 0
+    while pos < len(buf):
+      if self._echo is not None:
+        n = min(len(self._echo), len(buf) - pos)
+        if buf[pos: pos + n] == self._echo[:n]:
+          if n < len(self._echo):
+            if not final:
+              break
+          else:
+            self._emit(events, noise)
+            events.append((self.eEVENT_ECHO, bytes(self._echo)))
+            self._stats[1] += 1
+            pos += n
+            self._echo = None
+            continue
+      length = self._frame_length(buf, pos)
+      if length == self._SCAN:
+        length = self._scan_crc(buf, pos)
+        if length is not None:
+          self._emit(events, noise)
+          events.append((self.eEVENT_FRAME, bytes(buf[pos: pos + length])))
+          self._stats[0] += 1
+          self._crc_error = None
+          pos += length
+          continue
+        if not final:
+          break
+        length = -1
+      if (length is not None) and (length > 0) and (len(buf) - pos < length):
+        length = None
+      if length is None:
+        if not final:
+          break
+        length = -1
+      if length < 0:
+        noise.append(buf[pos])
+        pos += 1
+        continue
+      frame = buf[pos: pos + length]
+      crc = modbus_crc16(frame[:-2])
+      if (frame[-2] == (crc & 0xFF)) and (frame[-1] == ((crc >> 8) & 0xFF)):
+        self._emit(events, noise)
+        events.append((self.eEVENT_FRAME, bytes(frame)))
+        self._stats[0] += 1
+        self._crc_error = None
+        pos += length
+        continue
+      if (self._id is not None) and (self._crc_error is None):
+        #the slave, function code and length all match the expected response: either the frame itself is corrupt or
+        #this is noise looking like a header, which a valid frame may still follow
+        self._crc_error = bytes(frame)
+      noise.append(buf[pos])
+      pos += 1
+    self._emit(events, noise)
+    if final and (self._crc_error is not None):
+      events.append((self.eEVENT_CRC_ERROR, self._crc_error))
+      self._stats[3] += 1
+      self._crc_error = None
+    del buf[:pos]
+    return events
+
+  def _emit(self, events, noise):
+    if len(noise):
+      events.append((self.eEVENT_NOISE, bytes(noise)))
+      self._stats[2] += len(noise)
+      del noise[:]
+
+  def _frame_length(self, buf, pos):
+    #None: more bytes are needed, -1: no frame can start at pos, otherwise the frame length
+    if len(buf) - pos < 2:
+      return None
+    id = buf[pos]
+    cmd = buf[pos + 1]
+    if self._id is None:
+      if (id < 1) or (id > 0xF7):
+        return -1
+    elif id != self._id:
+      return -1
+    if (self._cmd is not None) and ((cmd & 0x7F) != self._cmd):
+      return -1
+    if cmd & 0x80:
+      if (self._cmd is not None) or ((cmd & 0x7F) in self._READ_CMDS + self._WRITE_CMDS):
+        return 5
+      return -1
+    if cmd in self._READ_CMDS:
+      if len(buf) - pos < 3:
+        return None
+      if ((self._val is not None) and (buf[pos + 2] != (self._val & 0xFF))) or (buf[pos + 2] > 250):
+        return -1
+      return 5 + buf[pos + 2]
+    if cmd in self._WRITE_CMDS:
+      if self._val is not None:
+        if len(buf) - pos < 4:
+          return None
+        if ((buf[pos + 2] << 8) | buf[pos + 3]) != self._val:
+          return -1
+      return 8
+    if cmd in self._FIXED_CMDS:
+      return self._FIXED_CMDS[cmd]
+    if cmd in self._COUNT_CMDS:
+      if len(buf) - pos < 3:
+        return None
+      return 5 + buf[pos + 2]
+    if self._cmd is not None:
+      return self._SCAN
+    return -1
+
+  def _scan_crc(self, buf, pos):
+    #length of the shortest frame starting at pos whose CRC matches, None if there is none yet
+    for length in range(4, min(len(buf) - pos, 256) + 1):
+      crc = modbus_crc16(buf[pos: pos + length - 2])
+      if (buf[pos + length - 2] == (crc & 0xFF)) and (buf[pos + length - 1] == ((crc >> 8) & 0xFF)):
+        return length
+    return None
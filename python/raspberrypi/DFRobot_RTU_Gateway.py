@@ -0,0 +1,315 @@
+# -*- coding:utf-8 -*-
+
+'''
+  @file DFRobot_RTU_Gateway.py
+  @brief Modbus RTU-over-TCP and Modbus TCP (MBAP) gateway for a DFRobot_RTU bus.
+  @n Many TCP clients share the single serial bus: every connection is served by its own thread and has at most one
+  @n request on the bus at a time, and the bus lock of DFRobot_RTU serves waiting requests in arrival order, so clients
+  @n take turns on the bus. Concurrent reads of the same or a contained register range are coalesced into one bus
+  @n transaction, and optionally (cache_ttl_s) repeated register reads are answered from a short-TTL register cache; both
+  @n settings apply to the whole bus.
+  @n SimulatedSerial is a serial-like object simulating slaves, so that the gateway can be tested with local sockets only.
+
+  @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  @license     The MIT License (MIT)
+  @author [Arya](xue.peng@dfrobot.com)
+  @version  V1.0
+  @date  2026-10-19
+  @https://github.com/DFRobot/DFRobot_RTU
+'''
+import sys
+import time
+import struct
+import socket
+import threading
+from DFRobot_RTU import *
+
+_MBAP = struct.Struct(">HHHB")  #transaction id, protocol id, length, unit id
+
+def _recv_exact(conn, n):
+  data = bytearray()
+  while len(data) < n:
+    chunk = conn.recv(n - len(data))
+    if not chunk:
+      return None
+    data += bytearray(chunk)
+  return data
+
+
+class RTUGateway(object):
+  '''Enum constant'''
+  eMODE_RTU_OVER_TCP = 0
+  eMODE_MBAP         = 1
+
+  eEXCEPTION_GATEWAY_TARGET_FAILED = 0x0B
+
+  def __init__(self, rtu, host = "0.0.0.0", port = 502, mode = eMODE_MBAP, cache_ttl_s = 0, max_registers = 4096):
+    '''
+      @brief Gateway initialization.
+      @param rtu:  The DFRobot_RTU object (or subclass object) of the bus.
+      @param host:  The address to listen on, default "0.0.0.0".
+      @param port:  The TCP port to listen on, default 502, 0 to pick a free port (see get_address).
+      @param mode:  eMODE_MBAP: Modbus TCP frames, eMODE_RTU_OVER_TCP: raw RTU frames with CRC over TCP.
+      @param cache_ttl_s:  Time to live of cached registers, unit s, default 0 (no cache). A value above 0 enables the register
+      @n                   cache of the whole bus (enable_register_cache): every object on the same bus, e.g. DFRobot_18B20_RS485
+      @n                   temperature and alarm reads in this process, then gets cached values too. Registers with a TTL set
+      @n                   by set_cache_ttl_s keep their own TTL.
+      @param max_registers:  Maximum number of cached registers, default 4096.
+      @n     Read coalescing (enable_single_flight) is always enabled for the whole bus: a read of the same or a contained
+      @n     register range as a read still waiting for the bus shares its transaction. Partially overlapping reads are not
+      @n     merged. A read which has already been sent takes no new callers, so no caller gets a value older than its request.
+    '''
+    self._rtu = rtu
+    self._mode = mode
+    self._rtu.enable_single_flight()
+    if cache_ttl_s > 0:
+      self._rtu.enable_register_cache(max_registers, cache_ttl_s)
+    self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self._server.bind((host, port))
+    self._server.listen(16)
+    self._running = False
+    self._stats = [0, 0, 0]
+
+  def start(self):
+    '''
+      @brief Start accepting connections in a background thread.
+    '''
+    self._running = True
+    t = threading.Thread(target = self._accept_loop)
+    t.daemon = True
+    t.start()
+
+  def serve_forever(self):
+    '''
+      @brief Start the gateway and block until stop is called.
+    '''
+    self.start()
+    while self._running:
+      time.sleep(0.5)
+
+  def stop(self):
+    '''
+      @brief Stop accepting connections, the open connections are closed after their current request.
+    '''
+    self._running = False
+    try:
+      self._server.close()
+    except Exception:
+      pass
+
+  def get_address(self):
+    '''
+      @brief Get the address the gateway listens on.
+      @return (host, port) tuple.
+    '''
+    return self._server.getsockname()
+
+  def get_stats(self):
+    '''
+      @brief Get the gateway statistics. See get_cache_stats and get_single_flight_stats of the rtu object for the cache
+      @n     and coalescing statistics.
+      @return list: format as follow:
+      @n      list[0]: Number of accepted connections.
+      @n      list[1]: Number of requests.
+      @n      list[2]: Number of requests answered with an exception.
+    '''
+    return list(self._stats)
+
+  def _accept_loop(self):
+    while self._running:
+      try:
+        conn, _ = self._server.accept()
+      except Exception:
+        return
+      self._stats[0] += 1
+      t = threading.Thread(target = self._client_loop, args = (conn,))
+      t.daemon = True
+      t.start()
+
+  def _client_loop(self, conn):
+    try:
+      while self._running:
+        if self._mode == self.eMODE_MBAP:
+          request = self._recv_mbap(conn)
+        else:
+          request = self._recv_rtu(conn)
+        if request is None:
+          break
+        header, id, pdu = request
+        if pdu is None:
+          continue
+        self._stats[1] += 1
+        pdu = self._execute(id, pdu)
+        if pdu is None:
+          continue
+        if pdu[0] & 0x80:
+          self._stats[2] += 1
+        if self._mode == self.eMODE_MBAP:
+          frame = bytearray(_MBAP.pack(header[0], header[1], len(pdu) + 1, id)) + bytearray(pdu)
+        else:
+          frame = bytearray([id] + pdu)
+          crc = modbus_crc16(frame)
+          frame += bytearray([crc & 0xFF, (crc >> 8) & 0xFF])
+        conn.sendall(bytes(frame))
+    except Exception:
+      pass
+    conn.close()
+
+  def _recv_mbap(self, conn):
+    header = _recv_exact(conn, _MBAP.size)
+    if header is None:
+      return None
+    tid, pid, length, id = _MBAP.unpack(bytes(header))
+    pdu = _recv_exact(conn, length - 1)
+    if pdu is None:
+      return None
+    if (pid != 0) or (len(pdu) == 0):
+      return [(tid, pid), id, None]
+    return [(tid, pid), id, list(pdu)]
+
+  def _recv_rtu(self, conn):
+    frame = _recv_exact(conn, 2)
+    if frame is None:
+      return None
+    cmd = frame[1]
+    if cmd <= DFRobot_RTU.eCMD_WRITE_HOLDING:
+      rest = _recv_exact(conn, 6)
+    elif (cmd == DFRobot_RTU.eCMD_WRITE_MULTI_COILS) or (cmd == DFRobot_RTU.eCMD_WRITE_MULTI_HOLDING):
+      rest = _recv_exact(conn, 5)
+      if rest is not None:
+        tail = _recv_exact(conn, rest[4] + 2)
+        rest = None if tail is None else rest + tail
+    else:
+      #unknown function code, the frame length is unknown: take what has arrived
+      conn.settimeout(0.05)
+      try:
+        rest = bytearray(conn.recv(256))
+      except socket.timeout:
+        rest = bytearray()
+      conn.settimeout(None)
+      if len(rest) < 2:
+        return [None, frame[0], None]
+    if rest is None:
+      return None
+    frame += rest
+    crc = modbus_crc16(frame[:-2])
+    if (frame[-2] != (crc & 0xFF)) or (frame[-1] != ((crc >> 8) & 0xFF)):
+      return [None, frame[0], None]  #a corrupt frame is dropped without an answer, as a slave would do
+    return [None, frame[0], list(frame[1:-2])]
+
+  def _execute(self, id, pdu):
+    cmd = pdu[0]
+    data = pdu[1:]
+    if (id != 0) and ((cmd == DFRobot_RTU.eCMD_READ_HOLDING) or (cmd == DFRobot_RTU.eCMD_READ_INPUT)) and (len(data) == 4):
+      reg = (data[0] << 8) | data[1]
+      size = (data[2] << 8) | data[3]
+      if (size < 1) or (size > 125):
+        return [cmd | 0x80, DFRobot_RTU.eRTU_EXCEPTION_ILLEGAL_DATA_VALUE]
+      if cmd == DFRobot_RTU.eCMD_READ_HOLDING:
+        l = self._rtu.read_holding_registers(id, reg, size)
+      else:
+        l = self._rtu.read_input_registers(id, reg, size)
+      if l[0] == 0:
+        return [cmd, size*2] + l[1:]
+      return self._exception(cmd, l[0])
+    l = self._rtu.raw_transaction(id, cmd, data)
+    if id == 0:
+      return None
+    if len(l) > 1:
+      return l[2: len(l) - 2]
+    return self._exception(cmd, l[0])
+
+  def _exception(self, cmd, code):
+    if (code < DFRobot_RTU.eRTU_EXCEPTION_ILLEGAL_FUNCTION) or (code > DFRobot_RTU.eRTU_EXCEPTION_SLAVE_FAILURE):
+      code = self.eEXCEPTION_GATEWAY_TARGET_FAILED
+    return [cmd | 0x80, code]
+
+
+class SimulatedSerial(object):
+  '''
+    @brief Serial-like object simulating Modbus RTU slaves, pass it as the port of DFRobot_RTU.
+    @n     It answers function codes 0x01~0x06, 0x0F and 0x10; holding and input registers share one register table.
+  '''
+  def __init__(self, baudrate = 9600):
+    '''
+      @brief Simulated bus initialization.
+      @param baudrate:  The baudrate reported to DFRobot_RTU, default 9600.
+    '''
+    self.baudrate = baudrate
+    self._slaves = {}
+    self._rx = bytearray()
+    self.frames = 0
+
+  def add_slave(self, id, size = 0x100):
+    '''
+      @brief Add a simulated slave.
+      @param id:  modbus device ID. Range: 0x01 ~ 0xF7(1~247).
+      @param size:  Number of registers and coils, default 256.
+      @return list: The register table of the slave, it can be modified to change the values the slave answers.
+    '''
+    self._slaves[id] = [[0]*size, [0]*size]
+    return self._slaves[id][0]
+
+  def inWaiting(self):
+    return len(self._rx)
+
+  def read(self, n = 1):
+    data = bytes(self._rx[:n])
+    del self._rx[:n]
+    return data
+
+  def write(self, data):
+    frame = bytearray(data)
+    self.frames += 1
+    if len(frame) < 4:
+      return len(data)
+    crc = modbus_crc16(frame[:-2])
+    if (frame[-2] != (crc & 0xFF)) or (frame[-1] != ((crc >> 8) & 0xFF)):
+      return len(data)
+    id = frame[0]
+    for slave_id in self._slaves:
+      if (id == 0) or (id == slave_id):
+        pdu = self._answer(self._slaves[slave_id], list(frame[1:-2]))
+        if id != 0:
+          frame = bytearray([id] + pdu)
+          crc = modbus_crc16(frame)
+          self._rx += frame + bytearray([crc & 0xFF, (crc >> 8) & 0xFF])
+    return len(data)
+
+  def _answer(self, slave, pdu):
+    regs, coils = slave
+    cmd = pdu[0]
+    if len(pdu) < 5:
+      return [cmd | 0x80, DFRobot_RTU.eRTU_EXCEPTION_ILLEGAL_DATA_VALUE]
+    addr = (pdu[1] << 8) | pdu[2]
+    qty = (pdu[3] << 8) | pdu[4]
+    if (cmd == DFRobot_RTU.eCMD_WRITE_COILS) or (cmd == DFRobot_RTU.eCMD_WRITE_HOLDING):
+      qty = 1
+    table = coils if cmd in (DFRobot_RTU.eCMD_READ_COILS, DFRobot_RTU.eCMD_READ_DISCRETE, DFRobot_RTU.eCMD_WRITE_COILS, DFRobot_RTU.eCMD_WRITE_MULTI_COILS) else regs
+    if cmd not in (1, 2, 3, 4, 5, 6, 15, 16):
+      return [cmd | 0x80, DFRobot_RTU.eRTU_EXCEPTION_ILLEGAL_FUNCTION]
+    if addr + qty > len(table):
+      return [cmd | 0x80, DFRobot_RTU.eRTU_EXCEPTION_ILLEGAL_DATA_ADDRESS]
+    if (cmd == DFRobot_RTU.eCMD_READ_COILS) or (cmd == DFRobot_RTU.eCMD_READ_DISCRETE):
+      data = [0]*((qty + 7) // 8)
+      for i in range(qty):
+        if table[addr + i]:
+          data[i >> 3] |= 1 << (i & 7)
+      return [cmd, len(data)] + data
+    if (cmd == DFRobot_RTU.eCMD_READ_HOLDING) or (cmd == DFRobot_RTU.eCMD_READ_INPUT):
+      data = []
+      for r in table[addr: addr + qty]:
+        data += [(r >> 8) & 0xFF, r & 0xFF]
+      return [cmd, len(data)] + data
+    if cmd == DFRobot_RTU.eCMD_WRITE_COILS:
+      table[addr] = 1 if ((pdu[3] << 8) | pdu[4]) == 0xFF00 else 0
+    elif cmd == DFRobot_RTU.eCMD_WRITE_HOLDING:
+      table[addr] = (pdu[3] << 8) | pdu[4]
+    elif cmd == DFRobot_RTU.eCMD_WRITE_MULTI_COILS:
+      for i in range(qty):
+        table[addr + i] = (pdu[6 + (i >> 3)] >> (i & 7)) & 1
+    else:
+      for i in range(qty):
+        table[addr + i] = (pdu[6 + 2*i] << 8) | pdu[7 + 2*i]
+    return pdu[:5]
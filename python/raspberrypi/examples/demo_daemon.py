@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+from __future__ import print_function
+
+'''
+  # demo_daemon.py
+  #
+  # @brief 总线守护进程示例。以"server"参数运行时独占串口，轮询总线上的协议转换板并通过Unix域套接字提供数据；
+  # @n 不带参数运行时作为客户端连接守护进程，打印最新快照后订阅每个周期的读数，客户端不会访问总线，可以同时运行任意多个。
+  # @n 例: python3 demo_daemon.py server &
+  # @n     python3 demo_daemon.py
+  #
+  # @n connected
+  # -----------------------------------------------------------------------------
+  #    board   |             MCU                |         raspberry pi          |
+  #     VCC    |            3.3V/5V             |            5V/3V3             |
+  #     GND    |              GND               |             GND               |
+  #     RX     |              TX                |          (BCM)14 TX           |
+  #     TX     |              RX                |          (BCM)15 RX           |
+  # -----------------------------------------------------------------------------
+  #
+  # @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  # @license     The MIT License (MIT)
+  # @author [Arya](xue.peng@dfrobot.com)
+  # @version  V1.0
+  # @date  2026-10-19
+  # @https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from DFRobot_18B20_Daemon import *
+
+modbus_device_addr = [32]#定义列表，存放需要采集的协议转换板的设备地址
+
+if __name__ == "__main__":
+  if (len(sys.argv) > 1) and (sys.argv[1] == "server"):
+    daemon = BusDaemon(modbus_device_addr, path = DAEMON_SOCKET_PATH, interval_s = 1.0, baud = 9600)
+    for b in daemon.get_poller().get_boards():
+      print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+      while b.begin() != 0:
+        print("failed.")
+        time.sleep(1)
+        print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+      print("done.")
+    print("serving on %s"%DAEMON_SOCKET_PATH)
+    daemon.serve_forever()
+  else:
+    client = DaemonClient(DAEMON_SOCKET_PATH)
+    for r in client.get_snapshot():
+      print("snapshot board(%d) D%d id%d ROM: %s temperature: %.4f C"%(r.addr, r.io, r.id, r.rom, r.temperature_c))
+    for readings in client.readings():
+      for r in readings:
+        print("%.3f board(%d) D%d id%d ROM: %s temperature: %.4f C alarm: %s"%(r.timestamp, r.addr, r.io, r.id, r.rom, r.temperature_c, r.alarm))
@@ -0,0 +1,65 @@
+# -*- coding:utf-8 -*-
+from __future__ import print_function
+
+'''
+  # demo_export.py
+  #
+  # @brief 将总线上多个协议转换板上所有18B20传感器的温度读数记录到CSV文件，代替复制print语句记录数据。
+  # @n 文件在后台线程中批量写入，磁盘写入不会推迟总线轮询；文件超过10MB时轮转，最多保留5个旧文件。
+  #
+  # @n connected
+  # -----------------------------------------------------------------------------
+  #    board   |             MCU                |         raspberry pi          |
+  #     VCC    |            3.3V/5V             |            5V/3V3             |
+  #     GND    |              GND               |             GND               |
+  #     RX     |              TX                |          (BCM)14 TX           |
+  #     TX     |              RX                |          (BCM)15 RX           |
+  # -----------------------------------------------------------------------------
+  #
+  # @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  # @license     The MIT License (MIT)
+  # @author [Arya](xue.peng@dfrobot.com)
+  # @version  V1.0
+  # @date  2026-10-19
+  # @https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from DFRobot_18B20_Exporter import *
+
+modbus_device_addr = [32]#定义列表，存放需要采集的协议转换板的设备地址
+board = [DFRobot_18B20_RS485(addr = addr, baud = 9600) for addr in modbus_device_addr]
+
+if __name__ == "__main__":
+  for b in board:
+    print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    while b.begin() != 0:
+      print("failed.")
+      time.sleep(1)
+      print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    print("done.")
+
+  '''
+    @brief ReadingExporter类参数初始化列表。
+    @param path: 输出文件路径，已存在时追加写入。
+    @param format: 输出格式:
+    @n     eFORMAT_CSV   or 0:  CSV
+    @n     eFORMAT_JSONL or 1:  JSON Lines
+    @param fields: 输出的Reading字段名列表，None表示全部字段(timestamp, addr, rom, io, id, temperature_c, alarm, raw)。
+    @param flush_interval_s: 缓存数据写入文件的最长间隔，单位秒，默认1s。
+    @param max_bytes: 文件超过该字节数时轮转，0表示不轮转，默认10MB。
+    @param backup_count: 轮转时保留的旧文件数量，默认5。
+  '''
+  exporter = ReadingExporter("18b20_readings.csv", format = ReadingExporter.eFORMAT_CSV, flush_interval_s = 5)
+  exporter.start()
+  stream = ReadingStream(board, interval_s = 1.0)
+  try:
+    for cycle in exporter.consume(stream):
+      print("%d readings, exported: %d, dropped: %d"%(len(cycle), exporter.get_stats()[0], exporter.get_stats()[1]))
+  except KeyboardInterrupt:
+    pass
+  exporter.stop()
@@ -0,0 +1,72 @@
+# -*- coding:utf-8 -*-
+from __future__ import print_function
+
+'''
+  # demo_fleet_config.py
+  #
+  # @brief 通过声明式的配置描述，一次性配置总线上多个级联的协议转换板上所有18B20传感器的温度阈值和精度。
+  # @n 所有协议板都需要的配置通过广播地址(0x00)只发送一次，各协议板不同的配置合并后单播发送，最后逐个协议板进行一次块读取校验。
+  # @n 注意：使用广播时，board列表必须包含总线上所有的TEL0144设备。
+  #
+  # @n connected
+  # -----------------------------------------------------------------------------
+  #    board   |             MCU                |         raspberry pi          |
+  #     VCC    |            3.3V/5V             |            5V/3V3             |
+  #     GND    |              GND               |             GND               |
+  #     RX     |              TX                |          (BCM)14 TX           |
+  #     TX     |              RX                |          (BCM)15 RX           |
+  # -----------------------------------------------------------------------------
+  #
+  # @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  # @license     The MIT License (MIT)
+  # @author [Arya](xue.peng@dfrobot.com)
+  # @version  V1.0
+  # @date  2026-10-19
+  # @https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from DFRobot_18B20_Fleet import *
+
+modbus_device_addr = [16,32]#定义列表，存放总线上所有协议转换板的设备地址
+broadcast = DFRobot_18B20_RS485(addr = 0, baud = 9600) #创建一个广播地址的对象，用来发送所有协议板共同的配置
+board = [DFRobot_18B20_RS485(addr = addr, baud = 9600) for addr in modbus_device_addr]
+
+'''
+  @brief 配置描述，优先级从低到高：
+  @n "default": 所有协议板上所有传感器的配置
+  @n "boards":  以协议板设备地址为键，"default"项为该协议板上所有传感器的配置，(io, id)项为单个传感器的配置
+  @n "roms":    以18B20传感器的ROM码16进制字符串为键，为指定传感器的配置
+'''
+spec = {
+  "default": {"th": 30, "tl": 10, "accuracy": DFRobot_18B20_RS485.e18B20_ACCURACY_12_BIT},
+  "boards": {
+    32: {(DFRobot_18B20_RS485.eD2, DFRobot_18B20_RS485.eID0): {"th": 80, "tl": 40}},
+  },
+  "roms": {
+    "28AAAD385414016A": {"accuracy": DFRobot_18B20_RS485.e18B20_ACCURACY_9_BIT},
+  },
+}
+
+if __name__ == "__main__":
+  for b in board:
+    print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    while b.begin() != 0:
+      print("failed.")
+      time.sleep(1)
+      print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    print("done.")
+  broadcast.begin()
+
+  fleet = FleetConfig(board, broadcast)
+  t = time.time()
+  if fleet.apply(spec):
+    print("apply fleet config sucess.")
+  else:
+    print("apply fleet config failed, boards: ", fleet.get_failed_boards())
+  frames = fleet.get_frame_count()
+  print("broadcast frames: %d, unicast frames: %d, time: %.3fs"%(frames[0], frames[1], time.time() - t))
@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+from __future__ import print_function
+
+'''
+  # demo_reading_stream.py
+  #
+  # @brief 以数据流的方式获取总线上多个协议转换板上所有18B20传感器的温度读数，代替手写while True循环逐个读取传感器。
+  # @n 每个协议板每个周期只需一次报警标志读取和一次温度块读取，采样周期按单调时钟对齐，不会累积漂移。
+  #
+  # @n connected
+  # -----------------------------------------------------------------------------
+  #    board   |             MCU                |         raspberry pi          |
+  #     VCC    |            3.3V/5V             |            5V/3V3             |
+  #     GND    |              GND               |             GND               |
+  #     RX     |              TX                |          (BCM)14 TX           |
+  #     TX     |              RX                |          (BCM)15 RX           |
+  # -----------------------------------------------------------------------------
+  #
+  # @copyright   Copyright (c) 2010 DFRobot Co.Ltd (http://www.dfrobot.com)
+  # @license     The MIT License (MIT)
+  # @author [Arya](xue.peng@dfrobot.com)
+  # @version  V1.0
+  # @date  2026-10-19
+  # @https://github.com/DFRobot/DFRobot_18B20_RS485
+'''
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from DFRobot_18B20_Stream import *
+
+modbus_device_addr = [32]#定义列表，存放需要采集的协议转换板的设备地址
+board = [DFRobot_18B20_RS485(addr = addr, baud = 9600) for addr in modbus_device_addr]
+
+if __name__ == "__main__":
+  for b in board:
+    print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    while b.begin() != 0:
+      print("failed.")
+      time.sleep(1)
+      print("Initialization board(%d)..."%b.get_device_address(), end = " ")
+    print("done.")
+
+  '''
+    @brief ReadingStream类参数初始化列表。
+    @param boards: DFRobot_18B20_RS485对象列表，对象需已调用begin初始化成功。
+    @param interval_s: 采样周期，单位秒，默认1s。
+    @param batch: 产生数据的方式:
+    @n     eBATCH_CYCLE   or 0:  每个周期产生一个Reading列表
+    @n     eBATCH_READING or 1:  每次产生一个Reading
+  '''
+  stream = ReadingStream(board, interval_s = 1.0, batch = ReadingStream.eBATCH_READING)
+  for r in stream:
+    print("%.3f board(%d) D%d id%d ROM: %s temperature: %.4f C alarm: %s"%(r.timestamp, r.addr, r.io, r.id, r.rom, r.temperature_c, r.alarm))